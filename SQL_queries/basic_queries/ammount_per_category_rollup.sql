@@ -0,0 +1,8 @@
+# Same totals as ammount_per_cateogry.sql, read from the hourly rollup: no scan of raw sales and no catalog join
+SELECT
+  date,
+  category_name,
+SUM(units_sold) AS units_sold,
+SUM(total_ammount_paid) AS total_ammount_paid
+FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_managed`
+GROUP BY 1,2
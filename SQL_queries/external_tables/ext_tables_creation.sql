@@ -30,6 +30,8 @@ OPTIONS (
 );
 
 # Sales Data External Table
+# High-volume hours (VOLUME_PROFILE=high/extreme) are split into sales_data_for_<date>-<hour>-00000-of-0000N.csv shards,
+# each with its own header row; they are still matched by the *.csv wildcard and skip_leading_rows applies per file.
 
 CREATE EXTERNAL TABLE IF NOT EXISTS `bigquery-dataflow-460522.retail_ds.sales_data_ext` (
 
@@ -77,3 +79,31 @@ OPTIONS (
   hive_partition_uri_prefix = 'gs://retail_data_v1/inventory_data/',
   skip_leading_rows = 1
 );
+
+# Sales Rollup External Table
+# One row per product and order country with sales in the hour, written next to each new sales partition (SALES_ROLLUP)
+
+CREATE EXTERNAL TABLE IF NOT EXISTS `bigquery-dataflow-460522.retail_ds.sales_rollup_ext` (
+
+  rollup_date STRING,
+  rollup_hour STRING,
+  product_id STRING,
+  category_id STRING,
+  category_name STRING,
+  order_country STRING,
+  transactions INT64,
+  units_sold INT64,
+  gross_amount FLOAT64,
+  discount_amount FLOAT64,
+  total_ammount_paid FLOAT64
+)
+WITH PARTITION COLUMNS (
+  date DATE,
+  hour STRING
+)
+OPTIONS (
+  format = 'csv',
+  uris = ['gs://retail_data_v1/sales_rollup/*.csv'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/sales_rollup/',
+  skip_leading_rows = 1
+);
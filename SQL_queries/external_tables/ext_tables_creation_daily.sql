@@ -0,0 +1,234 @@
+# Days compacted by compact.py: daily/<dataset>/date=YYYY-MM-DD/<dataset>_for_<date>.parquet, sorted by product_id.
+# The hourly files of a compacted day are deleted once its _manifest.json is written, so the hour partition column
+# becomes a regular `hour` column in the daily files. Each <dataset>_all view reads compacted days from the daily table
+# and every other day from the hourly one, skipping hourly leftovers of a day that has already been compacted.
+
+CREATE SCHEMA IF NOT EXISTS `bigquery-dataflow-460522.retail_ds`;
+
+# Product Catalog Daily External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.product_catalog_daily_ext` (
+
+  ingestion_date STRING,
+  ingestion_hour STRING,
+  product_id STRING,
+  product_name STRING,
+  category_id STRING,
+  category_name STRING,
+  brand STRING,
+  description STRING,
+  unit_price FLOAT64,
+  supplier_name STRING,
+  tags STRING,
+  hour STRING
+)
+WITH PARTITION COLUMNS (
+  date DATE
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/daily/product_catalog/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/daily/product_catalog/'
+);
+
+CREATE OR REPLACE VIEW `bigquery-dataflow-460522.retail_ds.product_catalog_all` AS
+SELECT
+  ingestion_date,
+  ingestion_hour,
+  product_id,
+  product_name,
+  category_id,
+  category_name,
+  brand,
+  description,
+  unit_price,
+  supplier_name,
+  tags,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.product_catalog_daily_ext`
+UNION ALL
+SELECT
+  ingestion_date,
+  ingestion_hour,
+  product_id,
+  product_name,
+  category_id,
+  category_name,
+  brand,
+  description,
+  unit_price,
+  supplier_name,
+  tags,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.product_catalog_ext`
+WHERE date NOT IN (SELECT DISTINCT date FROM `bigquery-dataflow-460522.retail_ds.product_catalog_daily_ext`);
+
+# Sales Data Daily External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.sales_data_daily_ext` (
+
+  transaction_date STRING,
+  transaction_hour STRING,
+  transaction_id STRING,
+  customer_id STRING,
+  order_country STRING,
+  product_id STRING,
+  unit_price FLOAT64,
+  units_sold INT64,
+  discount_applied FLOAT64,
+  total_ammount_paid FLOAT64,
+  hour STRING
+)
+WITH PARTITION COLUMNS (
+  date DATE
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/daily/sales_data/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/daily/sales_data/'
+);
+
+CREATE OR REPLACE VIEW `bigquery-dataflow-460522.retail_ds.sales_data_all` AS
+SELECT
+  transaction_date,
+  transaction_hour,
+  transaction_id,
+  customer_id,
+  order_country,
+  product_id,
+  unit_price,
+  units_sold,
+  discount_applied,
+  total_ammount_paid,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.sales_data_daily_ext`
+UNION ALL
+SELECT
+  transaction_date,
+  transaction_hour,
+  transaction_id,
+  customer_id,
+  order_country,
+  product_id,
+  unit_price,
+  units_sold,
+  discount_applied,
+  total_ammount_paid,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.sales_data_ext`
+WHERE date NOT IN (SELECT DISTINCT date FROM `bigquery-dataflow-460522.retail_ds.sales_data_daily_ext`);
+
+# Inventory Updates Daily External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.inventory_data_daily_ext` (
+
+  inventory_date STRING,
+  inventory_hour STRING,
+  product_id STRING,
+  in_stock INT64,
+  new_product INT64,
+  returned_product INT64,
+  units_sold INT64,
+  final_stock INT64,
+  hour STRING
+)
+WITH PARTITION COLUMNS (
+  date DATE
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/daily/inventory_data/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/daily/inventory_data/'
+);
+
+CREATE OR REPLACE VIEW `bigquery-dataflow-460522.retail_ds.inventory_data_all` AS
+SELECT
+  inventory_date,
+  inventory_hour,
+  product_id,
+  in_stock,
+  new_product,
+  returned_product,
+  units_sold,
+  final_stock,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.inventory_data_daily_ext`
+UNION ALL
+SELECT
+  inventory_date,
+  inventory_hour,
+  product_id,
+  in_stock,
+  new_product,
+  returned_product,
+  units_sold,
+  final_stock,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.inventory_data_ext`
+WHERE date NOT IN (SELECT DISTINCT date FROM `bigquery-dataflow-460522.retail_ds.inventory_data_daily_ext`);
+
+# Sales Rollup Daily External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.sales_rollup_daily_ext` (
+
+  rollup_date STRING,
+  rollup_hour STRING,
+  product_id STRING,
+  category_id STRING,
+  category_name STRING,
+  order_country STRING,
+  transactions INT64,
+  units_sold INT64,
+  gross_amount FLOAT64,
+  discount_amount FLOAT64,
+  total_ammount_paid FLOAT64,
+  hour STRING
+)
+WITH PARTITION COLUMNS (
+  date DATE
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/daily/sales_rollup/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/daily/sales_rollup/'
+);
+
+CREATE OR REPLACE VIEW `bigquery-dataflow-460522.retail_ds.sales_rollup_all` AS
+SELECT
+  rollup_date,
+  rollup_hour,
+  product_id,
+  category_id,
+  category_name,
+  order_country,
+  transactions,
+  units_sold,
+  gross_amount,
+  discount_amount,
+  total_ammount_paid,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_daily_ext`
+UNION ALL
+SELECT
+  rollup_date,
+  rollup_hour,
+  product_id,
+  category_id,
+  category_name,
+  order_country,
+  transactions,
+  units_sold,
+  gross_amount,
+  discount_amount,
+  total_ammount_paid,
+  date,
+  hour
+FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext`
+WHERE date NOT IN (SELECT DISTINCT date FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_daily_ext`);
@@ -0,0 +1,106 @@
+# Variant for partitions written with OUTPUT_FORMATS=<dataset>=parquet (objects named *.parquet).
+# Parquet columns are typed and matched by name. Run only the statements for the datasets that use this format.
+
+CREATE SCHEMA IF NOT EXISTS `bigquery-dataflow-460522.retail_ds`;
+
+
+#Product Catalog External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.product_catalog_ext` (
+
+  ingestion_date STRING,
+  ingestion_hour STRING,
+  product_id STRING,
+  product_name STRING,
+  category_id STRING,
+  category_name STRING,
+  brand STRING,
+  description STRING,
+  unit_price FLOAT64,
+  supplier_name STRING,
+  tags STRING
+
+)
+WITH PARTITION COLUMNS (
+  date DATE,
+  hour STRING
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/product_catalog/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/product_catalog/'
+);
+
+# Sales Data External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.sales_data_ext` (
+
+  transaction_date STRING,
+  transaction_hour STRING,
+  transaction_id STRING,
+  customer_id STRING,
+  order_country STRING,
+  product_id STRING,
+  unit_price FLOAT64,
+  units_sold INT64,
+  discount_applied FLOAT64,
+  total_ammount_paid FLOAT64
+)
+WITH PARTITION COLUMNS (
+  date DATE,
+  hour STRING
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/sales_data/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/sales_data/'
+);
+
+# Inventory Updates External Table
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.inventory_data_ext` (
+  inventory_date STRING,
+  inventory_hour STRING,
+  product_id STRING,
+  in_stock INT64,
+  new_product INT64,
+  returned_product INT64,
+  units_sold INT64,
+  final_stock INT64
+)
+WITH PARTITION COLUMNS (
+  date DATE,
+  hour STRING
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/inventory_data/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/inventory_data/'
+);
+
+# Sales Rollup External Table
+# One row per product and order country with sales in the hour, written next to each new sales partition (SALES_ROLLUP)
+
+CREATE OR REPLACE EXTERNAL TABLE `bigquery-dataflow-460522.retail_ds.sales_rollup_ext` (
+
+  rollup_date STRING,
+  rollup_hour STRING,
+  product_id STRING,
+  category_id STRING,
+  category_name STRING,
+  order_country STRING,
+  transactions INT64,
+  units_sold INT64,
+  gross_amount FLOAT64,
+  discount_amount FLOAT64,
+  total_ammount_paid FLOAT64
+)
+WITH PARTITION COLUMNS (
+  date DATE,
+  hour STRING
+)
+OPTIONS (
+  format = 'PARQUET',
+  uris = ['gs://retail_data_v1/sales_rollup/*.parquet'],
+  hive_partition_uri_prefix = 'gs://retail_data_v1/sales_rollup/'
+);
@@ -34,7 +34,7 @@ IF backfill_flag THEN
 --SELECT DISTINCT date FROM `bigquery-dataflow-460522.retail_ds.inventory_data_ext` LIMIT 10
 CREATE SCHEMA IF NOT EXISTS `bigquery-dataflow-460522.retail_ds`;
 
-CREATE OR REPLACE TABLE `bigquery-dataflow-460522.retail_ds.inventory_data_managed`(
+CREATE TABLE IF NOT EXISTS `bigquery-dataflow-460522.retail_ds.inventory_data_managed`(
 
   inventory_date STRING,
   inventory_hour STRING,
@@ -34,7 +34,7 @@ IF backfill_flag THEN
 
 CREATE SCHEMA IF NOT EXISTS `bigquery-dataflow-460522.retail_ds`;
 
-CREATE OR REPLACE TABLE `bigquery-dataflow-460522.retail_ds.product_catalog_managed` (
+CREATE TABLE IF NOT EXISTS `bigquery-dataflow-460522.retail_ds.product_catalog_managed` (
 
   ingestion_date STRING,
   ingestion_hour STRING,
@@ -34,7 +34,7 @@ IF backfill_flag THEN
 
 CREATE SCHEMA IF NOT EXISTS `bigquery-dataflow-460522.retail_ds`;
 
-CREATE OR REPLACE TABLE `bigquery-dataflow-460522.retail_ds.sales_data_managed` (
+CREATE TABLE IF NOT EXISTS `bigquery-dataflow-460522.retail_ds.sales_data_managed` (
 
   transaction_date STRING,
   transaction_hour STRING,
@@ -0,0 +1,87 @@
+DECLARE backfill_flag BOOL DEFAULT TRUE; 
+
+DECLARE dates_to_process ARRAY<DATE>;
+DECLARE hours_to_process ARRAY<STRING>;
+
+-- Conditionally populate the dates_to_process array
+IF backfill_flag THEN
+  SET dates_to_process = (
+    SELECT ARRAY_AGG(DISTINCT date ORDER BY date)
+    FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext`
+    WHERE date IS NOT NULL 
+  );
+ELSE
+  SET dates_to_process = (
+    SELECT [MAX(date)]
+    FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext`
+    WHERE date IS NOT NULL
+  );
+END IF;
+-- Conditionally populate the hours_to_process array
+IF backfill_flag THEN
+  SET hours_to_process = (
+      SELECT ARRAY_AGG(DISTINCT hour ORDER BY hour)
+      FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext`
+      WHERE hour IS NOT NULL 
+    );
+  ELSE
+    SET hours_to_process = (
+      SELECT [MAX(hour)]
+      FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext`
+      WHERE date = (SELECT MAX(date) FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext`)
+    );
+  END IF;
+
+CREATE SCHEMA IF NOT EXISTS `bigquery-dataflow-460522.retail_ds`;
+
+CREATE TABLE IF NOT EXISTS `bigquery-dataflow-460522.retail_ds.sales_rollup_managed` (
+
+  rollup_date STRING,
+  rollup_hour STRING,
+  product_id STRING,
+  category_id STRING,
+  category_name STRING,
+  order_country STRING,
+  transactions INT64,
+  units_sold INT64,
+  gross_amount FLOAT64,
+  discount_amount FLOAT64,
+  total_ammount_paid FLOAT64,
+  date STRING,
+  hour STRING,
+  date_tmsp TIMESTAMP
+
+)
+PARTITION BY DATE(date_tmsp)
+CLUSTER BY category_id, order_country, product_id
+OPTIONS (
+  description = "Hourly sales totals by product, category and order country - Managed Table. This comes from Ext. Hive Partitioned table",
+  labels = [('env', 'dev'), ('source', 'csv')],
+  require_partition_filter = FALSE
+);
+
+# Delete rows before processing --> OVERWRITING NEW DATA IN CASE IT EXISTS
+DELETE 
+FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_managed`
+WHERE CAST(date AS DATE) IN UNNEST(dates_to_process) AND hour IN UNNEST(hours_to_process);
+
+INSERT INTO `bigquery-dataflow-460522.retail_ds.sales_rollup_managed`
+SELECT
+    ext.rollup_date,
+    ext.rollup_hour,
+    ext.product_id,
+    ext.category_id,
+    ext.category_name,
+    ext.order_country,
+    ext.transactions,
+    ext.units_sold,
+    ext.gross_amount,
+    ext.discount_amount,
+    ext.total_ammount_paid,
+    CAST(date AS STRING),
+    hour,
+    TIMESTAMP(date)
+FROM `bigquery-dataflow-460522.retail_ds.sales_rollup_ext` AS ext
+WHERE 
+  ext.date IN UNNEST(dates_to_process) 
+  AND ext.hour IN UNNEST(hours_to_process)
@@ -1,27 +1,107 @@
 # Regular imports 
+import os
 import random
 import datetime
 import io
 import csv
-from faker import Faker
+import json
+import hashlib
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from flask import Request
 
-# Import Cloud Storage 
-from google.cloud import storage
-
 PROJECT_ID  = "bigquery-dataflow-460522"
 
 # Google Cloud Storage Bucket
 STORAGE_BUCKET = 'retail_data_v1'
-storage_client = storage.Client()
-bucket_instance = storage_client.bucket(STORAGE_BUCKET)
+# Where files are checked and written: 'gs://<bucket>' or a local directory ('file:///path') for offline runs
+STORAGE_URI = os.environ.get('STORAGE_URI', f'gs://{STORAGE_BUCKET}')
+# Injected per-request latency (seconds) and write bandwidth (bytes/s) for the local backend
+STORAGE_LATENCY = float(os.environ.get('STORAGE_LATENCY', 0))
+STORAGE_BANDWIDTH = float(os.environ.get('STORAGE_BANDWIDTH', 0)) or None
+
+
+class GcsStorageBackend:
+    # Same interface as utils/storage_backends.py in the v1 function (this function deploys standalone)
+
+    def __init__(self, bucket_name):
+        from google.cloud import storage
+        self.bucket_instance = storage.Client().bucket(bucket_name)
+        self.uri = f'gs://{bucket_name}'
+
+    def exists(self, name):
+        return self.bucket_instance.blob(name).exists()
+
+    def write_bytes(self, name, payload, content_type=None):
+        self.bucket_instance.blob(name).upload_from_string(payload, content_type=content_type)
+
+
+class LocalDirStorageBackend:
+    # Objects are files under root with the same date= layout; optional latency and bandwidth limits
+
+    def __init__(self, root, latency=0.0, bandwidth=None):
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.uri = f'file://{self.root}'
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def exists(self, name):
+        time.sleep(self.latency)
+        return os.path.isfile(self._path(name))
+
+    def write_bytes(self, name, payload, content_type=None):
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        time.sleep(self.latency + (len(payload) / self.bandwidth if self.bandwidth else 0))
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as local_file:
+            local_file.write(payload)
+        os.replace(f'{path}.tmp', path)  # readers never see a partial file
+
 
-# Faker for dat generation
-fake = Faker()
+# Storage backend is created on first use and kept for warm invocations, so cold start stays cheap
+storage_backend = None
+
+def get_storage_backend():
+    global storage_backend
+    if storage_backend is None:
+        if STORAGE_URI.startswith('gs://'):
+            storage_backend = GcsStorageBackend(STORAGE_URI[len('gs://'):].strip('/'))
+        else:
+            storage_backend = LocalDirStorageBackend(STORAGE_URI.replace('file://', '', 1), STORAGE_LATENCY, STORAGE_BANDWIDTH)
+    return storage_backend
+
+# Uploads run on a bounded thread pool; at most UPLOAD_MAX_PENDING payloads are held in memory
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 8))
+UPLOAD_MAX_PENDING = UPLOAD_WORKERS * 2
 
 # --- Configuration ---
-NUM_PRODUCTS = random.randint(50,100)
-NUM_CATEGORIES = random.randint(5,10)
+# Root seed; each (dataset, date) file is generated from its own stream derived from it, so any day can be
+# regenerated identically. A fresh seed is drawn per instance (and logged) when SEED is not set
+SEED = int(os.environ.get('SEED') or random.SystemRandom().getrandbits(63))
+
+def stream_seed(*key):
+    # 64-bit seed for one named stream; same derivation as utils/seeding.py in the v1 function
+    digest = hashlib.blake2b('/'.join(str(part) for part in (SEED, *key)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+def seed_partition(dataset, date):
+    # (random.Random, Faker) of one file, both seeded from its stream; the global random module is never touched
+    from faker import Faker  # imported on first use, so cold start stays cheap
+    seed = stream_seed(dataset, date)
+    fake = Faker()
+    fake.seed_instance(seed)
+    return random.Random(seed), fake
+
+NUM_PRODUCTS = random.Random(stream_seed('num_products')).randint(50,100)
+NUM_CATEGORIES = random.Random(stream_seed('num_categories')).randint(5,10)
+NUM_SALES = int(os.environ.get('NUM_SALES', 0)) or None # Sales per day, random 150-1000 when not set
 TODAY = datetime.date.today().strftime('%Y-%m-%d')
 
 today_date_obj = datetime.datetime.strptime(TODAY, '%Y-%m-%d').date()
@@ -29,7 +109,7 @@ start_date_obj = today_date_obj - datetime.timedelta(days=49)
 START_DATE = start_date_obj.strftime('%Y-%m-%d')
 
 # --- Helper Functions ---
-def generate_categories(num_categories):
+def generate_categories(num_categories, fake):
     categories = []
     for i in range(1, num_categories + 1):
         category_id = f"CAT_{i:03d}"
@@ -60,26 +140,26 @@ def generate_date_list(start_date_str, end_date_str):
     return date_list
 
 
-def generate_product_catalog_data(num_products, ingestion_date):
+def generate_product_catalog_data(num_products, ingestion_date, rng, fake):
     products_data = []
     headers = ('product_id','product_name','category_id','category_name','brand','description','unit_price','supplier_name','tags', 'ingestion_date')
     products_data.append(headers)
-    categories = generate_categories(NUM_CATEGORIES)
+    categories = generate_categories(NUM_CATEGORIES, fake)
     product_adjectives = ["Premium", "Value", "Eco-Friendly", "Smart", "Heavy-Duty", "Compact", "Designer"]
     product_nouns = ["Widget", "Gadget", "Device", "Appliance", "Tool", "Kit", "System"]
 
     for i in range(1, num_products + 1):
         product_id = f"PROD_{i:04d}"
-        chosen_category = random.choice(categories)
+        chosen_category = rng.choice(categories)
         category_id = chosen_category["id"]
         category_name = chosen_category["name"]
 
-        product_name = f"{random.choice(product_adjectives)} {fake.word().capitalize()} {random.choice(product_nouns)}"
+        product_name = f"{rng.choice(product_adjectives)} {fake.word().capitalize()} {rng.choice(product_nouns)}"
         brand = fake.company()
         description = fake.sentence(nb_words=10)
-        unit_price = round(random.uniform(5.99, 799.99), 2)
+        unit_price = round(rng.uniform(5.99, 799.99), 2)
         supplier_name = fake.company_suffix() + " " + fake.last_name() + " Supplies" 
-        tags = random.sample(["new_arrival", "best_seller", "clearance", "eco_friendly", "premium_quality", "limited_edition"], k=random.randint(1, 3))
+        tags = rng.sample(["new_arrival", "best_seller", "clearance", "eco_friendly", "premium_quality", "limited_edition"], k=rng.randint(1, 3))
 
         products_data.append((
             product_id,
@@ -96,24 +176,24 @@ def generate_product_catalog_data(num_products, ingestion_date):
     return products_data
 
 
-def generate_sales_data(product_catalog:list, sales_date):
+def generate_sales_data(product_catalog:list, sales_date, rng, fake):
     sales_data = []
     headers = ('transaction_date', 'transaction_id', 'customer_id', 'order_country', 'product_id', 'unit_price', 'units_sold', 'discount_applied', 'total_ammount_paid')
     sales_data.append(headers)
-    num_sales = random.randint(150,1000) # A random number of sales
+    num_sales = NUM_SALES or rng.randint(150,1000) # A random number of sales
     product_catalog_rows = product_catalog[1:]
     for i in range(num_sales):
         transaction_date = sales_date
         transaction_id = fake.uuid4()
-        customer_id = f"CUST_{random.randint(1001, 5000):04d}"
-        order_country = random.choice(['United States', 'Canada', 'Mexico', 'Brazil', 'Argentina', 'UK', 'France', 'Germany', 'China', 'Spain'])
-        product_sold_index = random.randint(0,len(product_catalog_rows))  # Tupple
+        customer_id = f"CUST_{rng.randint(1001, 5000):04d}"
+        order_country = rng.choice(['United States', 'Canada', 'Mexico', 'Brazil', 'Argentina', 'UK', 'France', 'Germany', 'China', 'Spain'])
+        product_sold_index = rng.randint(0,len(product_catalog_rows))  # Tupple
         product_id = product_catalog_rows[product_sold_index-1][0]
         unit_price = product_catalog_rows[product_sold_index-1][6]
-        units_sold = random.randint(1, 10)
+        units_sold = rng.randint(1, 10)
 
         if units_sold > 5:
-            discount_applied = random.randint(5, 20) / 100
+            discount_applied = rng.randint(5, 20) / 100
         else:
             discount_applied = 0 
 
@@ -138,10 +218,8 @@ def upload_tuples_to_gcs_as_csv(
     destination_blob_name: str,
     data_tuples_with_headers: list # Renamed for clarity
 ):
+    # Returns (blob_name, success, error) so the caller can report every failed upload
     try:
-        bucket = bucket_instance # Using global instance
-        blob = bucket.blob(destination_blob_name)
-
         csv_string_buffer = io.StringIO()
         csv_writer = csv.writer(csv_string_buffer)
 
@@ -151,45 +229,99 @@ def upload_tuples_to_gcs_as_csv(
         csv_content = csv_string_buffer.getvalue()
         csv_string_buffer.close()
 
-        blob.upload_from_string(csv_content, content_type='text/csv')
-        print(f"Successfully uploaded data to gs://{STORAGE_BUCKET}/{destination_blob_name}")
+        get_storage_backend().write_bytes(destination_blob_name, csv_content, content_type='text/csv')
+        return (destination_blob_name, True, None)
 
     except Exception as e:
-        print(f"An error occurred while uploading {destination_blob_name}: {e}")
+        return (destination_blob_name, False, repr(e))
+
+
+def submit_upload(upload_pool, upload_slots, destination_blob_name, data_tuples_with_headers):
+    upload_slots.acquire() # Backpressure: block generation while too many payloads are pending
+    future = upload_pool.submit(upload_tuples_to_gcs_as_csv, destination_blob_name, data_tuples_with_headers)
+    future.add_done_callback(lambda _: upload_slots.release())
+    return future
         
+
+def add_span(spans, name, start):
+    # Accumulates (count, seconds) per stage for the invocation summary
+    count, seconds = spans.get(name, (0, 0.0))
+    spans[name] = (count + 1, seconds + time.perf_counter() - start)
+
+
+def emit_summary(spans, counters, **fields):
+    # One structured log line per invocation (Cloud Logging reads severity/message from JSON on stdout)
+    print(json.dumps({'severity': 'INFO' if fields.get('status') == 200 else 'ERROR',
+                      'message': 'genearete_product_and_sales_data summary',
+                      'spans': {name: {'count': count, 'seconds': round(seconds, 4)} for name, (count, seconds) in spans.items()},
+                      'counters': dict(counters),
+                      **fields}))
+
 # Send data to Cloud storage
 
 
 def genearete_product_and_sales_data(request: Request):
     
+    upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+    upload_slots = threading.BoundedSemaphore(UPLOAD_MAX_PENDING)
+    upload_futures = []
+    spans = {}
+    counters = Counter()
+    summary = {'start_date': START_DATE, 'max_date': TODAY, 'seed': SEED}
     try:
+        storage_backend = get_storage_backend()
         dates = generate_date_list(START_DATE,TODAY)
         for date in dates:
 
             catalog_blob_name = f'product_catalog/date={date}/product_catalog_for_{date}.csv'
             sales_blob_name = f'sales_data/date={date}/sales_data_for_{date}.csv'
 
-            catalog_blob = bucket_instance.blob(catalog_blob_name)
-            sales_blob = bucket_instance.blob(sales_blob_name)
+            start = time.perf_counter()
+            catalog_exists = storage_backend.exists(catalog_blob_name)
+            sales_exists = storage_backend.exists(sales_blob_name)
+            add_span(spans, 'existence_check', start)
 
-            if catalog_blob.exists():
-                print(f'{catalog_blob_name}  exist, no taking actions')                
+            if catalog_exists:
+                counters['product_catalog_skipped'] += 1
             else:
-                print(f'{catalog_blob_name} does not exists, creating file')
-                products_catalog = generate_product_catalog_data(NUM_PRODUCTS, date)
+                counters['product_catalog_created'] += 1
+                start = time.perf_counter()
+                products_catalog = generate_product_catalog_data(NUM_PRODUCTS, date, *seed_partition('product_catalog', date))
+                add_span(spans, 'generate_catalog', start)
+                counters['product_catalog_rows'] += len(products_catalog) - 1
                 # Upload Product Catalog
-                upload_tuples_to_gcs_as_csv(catalog_blob_name, products_catalog)
+                upload_futures.append(submit_upload(upload_pool, upload_slots, catalog_blob_name, products_catalog))
             
-            if sales_blob.exists():
-                print(f'{sales_blob_name} exist, no taking actions') 
+            if sales_exists:
+                counters['sales_data_skipped'] += 1
             else:
-                print(f'{sales_blob_name} does not exists, creating file')
-                sales_data = generate_sales_data(products_catalog, date)
+                counters['sales_data_created'] += 1
+                start = time.perf_counter()
+                if catalog_exists:
+                    # Rebuilt in memory from its seeded stream (identical to the stored file when SEED is unchanged)
+                    products_catalog = generate_product_catalog_data(NUM_PRODUCTS, date, *seed_partition('product_catalog', date))
+                sales_data = generate_sales_data(products_catalog, date, *seed_partition('sales_data', date))
+                add_span(spans, 'generate_sales', start)
+                counters['sales_data_rows'] += len(sales_data) - 1
                 # Upload Sales Catalog
-                upload_tuples_to_gcs_as_csv(sales_blob_name, sales_data)
-
-        return 'Succesfully read GCS files and uploaded pending files if any ', 200
+                upload_futures.append(submit_upload(upload_pool, upload_slots, sales_blob_name, sales_data))
+
+        start = time.perf_counter()
+        upload_results = [future.result() for future in upload_futures]
+        add_span(spans, 'upload_wait', start)
+        failed_uploads = [(blob_name, error) for blob_name, success, error in upload_results if not success]
+        counters['files_uploaded'] += len(upload_results) - len(failed_uploads)
+        if failed_uploads:
+            summary['failed_uploads'] = [{'blob_name': blob_name, 'error': error} for blob_name, error in failed_uploads]
+            response = f"❌ {len(failed_uploads)} uploads failed: {', '.join(blob_name for blob_name, _ in failed_uploads)}", 500
+        else:
+            response = 'Succesfully read GCS files and uploaded pending files if any ', 200
     except Exception as e:
-        return  f"❌ Errors encountered plase review, {e} rows", 500
+        summary['error'] = repr(e)
+        response = f"❌ Errors encountered plase review, {e} rows", 500
+    finally:
+        upload_pool.shutdown(wait=True)
+    emit_summary(spans, counters, status=response[1], **summary)
+    return response
         
             
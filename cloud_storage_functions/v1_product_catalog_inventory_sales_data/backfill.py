@@ -0,0 +1,45 @@
+# Backfill entry point, separate from the generate_data HTTP handler.
+#
+#   python backfill.py --start-date 2025-05-01 --end-date 2025-05-31 --workers 8 --seed 42
+import argparse
+import json
+import os
+
+from utils.backfill import run_backfill
+from utils.storage_backends import storage_backend_from_uri
+
+STORAGE_BUCKET = 'retail_data_v1'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Regenerate missing date/hour partitions on a process pool.')
+    parser.add_argument('--start-date', required=True, help='First date to backfill (YYYY-MM-DD)')
+    parser.add_argument('--end-date', required=True, help='Last date to backfill, all 24 hours included (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, default=0, help='Root seed; the same seed reproduces the same partitions')
+    parser.add_argument('--num-products', type=int, default=None, help='Products per catalog (derived from the seed if omitted)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Generator processes, 0 runs serially')
+    parser.add_argument('--unit-size', type=int, default=6, help='Hours per work unit sent to a process')
+    parser.add_argument('--upload-workers', type=int, default=8, help='Concurrent upload threads')
+    parser.add_argument('--output-formats', default=None,
+                        help="Per-dataset formats, e.g. 'sales_data=parquet,inventory_data=csv_gzip' (default csv)")
+    parser.add_argument('--storage', default=f'gs://{STORAGE_BUCKET}',
+                        help="'gs://<bucket>' or a local directory to write partitions to")
+    parser.add_argument('--overwrite', action='store_true', help='Rewrite partitions that already exist')
+    parser.add_argument('--carry-inventory', action='store_true',
+                        help="Open each hour's inventory with the previous hour's checkpointed final stock")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    storage_backend = storage_backend_from_uri(args.storage)
+    summary = run_backfill(storage_backend, args.start_date, args.end_date,
+                           seed=args.seed, num_products=args.num_products, workers=args.workers,
+                           unit_size=args.unit_size, upload_workers=args.upload_workers,
+                           overwrite=args.overwrite, output_formats=args.output_formats,
+                           carry_inventory=args.carry_inventory)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
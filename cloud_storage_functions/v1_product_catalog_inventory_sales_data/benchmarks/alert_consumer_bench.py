@@ -0,0 +1,96 @@
+# Alerts per second and publish-to-sink latency of the streaming AlertConsumer
+# (utils/alert_consumer.py) against the fake publisher/subscriber. Every
+# alert is published twice, as when generate_data rewrites an inventory
+# partition, so half the messages must be dropped by the dedup window. Runs
+# per sink and micro-batch size; 'flaky' fails every 5th sink write, whose
+# alerts are nacked and must arrive on redelivery.
+#
+#   python -m benchmarks.alert_consumer_bench
+import os
+import tempfile
+import time
+
+from google.cloud.pubsub_v1.types import BatchSettings
+
+from benchmarks.fakes import FakePublisher, FakeSubscriber
+from utils.alert_publisher import AlertPublisher
+from utils.alert_consumer import AlertConsumer, SqliteAlertSink, JsonLinesAlertSink
+
+HOURS = 24
+PRODUCTS = 100
+MAX_BATCHES = (1, 50, 500)
+TOPIC_PATH = 'projects/bigquery-dataflow-460522/topics/inventory-updates-streaming'
+
+
+class FlakySink:
+    # Fails every `every`-th write before it reaches the wrapped sink
+
+    def __init__(self, sink, every=5):
+        self.sink = sink
+        self.every = every
+        self.writes = 0
+
+    def write(self, alerts, received_at):
+        self.writes += 1
+        if self.writes % self.every == 0:
+            raise OSError('disk I/O error')
+        self.sink.write(alerts, received_at)
+
+    def count(self):
+        return self.sink.count()
+
+    def close(self):
+        self.sink.close()
+
+
+def inventory_hours():
+    headers = ('inventory_date', 'inventory_hour', 'product_id', 'in_stock', 'new_product', 'returned_product', 'units_sold', 'final_stock')
+    return [[headers] + [('2025-06-30', f'{hour:02d}', f'PROD_{i:04d}', 10, 0, 0, -20, -10) for i in range(1, PRODUCTS + 1)]
+            for hour in range(HOURS)]
+
+
+def count_lines(path):
+    with open(path) as sink_file:
+        return sum(1 for _ in sink_file)
+
+
+def run(sink_name, max_batch, hours, directory):
+    path = os.path.join(directory, f'{sink_name}-{max_batch}' + ('.jsonl' if sink_name == 'jsonl' else '.sqlite'))
+    sink = JsonLinesAlertSink(path) if sink_name == 'jsonl' else SqliteAlertSink(path)
+    if sink_name == 'flaky':
+        sink = FlakySink(sink)
+    consumer = AlertConsumer(sink, max_batch=max_batch, max_latency=0.05)
+    publisher = FakePublisher(BatchSettings(max_bytes=1000000, max_latency=0.01, max_messages=100), latency=0.005)
+    subscriber = FakeSubscriber(publisher, consumer.handle)
+    expected = 2 * HOURS * PRODUCTS
+    start = time.perf_counter()
+    for _ in range(2):  # the second pass re-publishes every alert
+        alert_publisher = AlertPublisher(publisher, TOPIC_PATH)
+        for product_inventory in hours:
+            alert_publisher.publish_negative_stock(product_inventory)
+        alert_publisher.wait()
+    while consumer.stats['written'] + consumer.stats['duplicates'] < expected:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    consumer.close()
+    subscriber.shutdown()
+    stored = count_lines(path) if sink_name == 'jsonl' else sink.count()
+    sink.close()
+    return consumer.summary(), subscriber.calls['nack'], stored, elapsed
+
+
+def main():
+    hours = inventory_hours()
+    print(f"{'sink':>6} {'batch':>6} {'received':>9} {'dups':>6} {'stored':>7} {'nacked':>7} {'batches':>8} "
+          f"{'msg/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for sink_name in ('sqlite', 'jsonl', 'flaky'):
+            for max_batch in MAX_BATCHES:
+                summary, nacked, stored, elapsed = run(sink_name, max_batch, hours, directory)
+                print(f"{sink_name:>6} {max_batch:>6} {summary['received']:>9} {summary['duplicates']:>6} {stored:>7} {nacked:>7} "
+                      f"{summary['batches']:>8} {summary['received'] / elapsed:>8.0f} {summary['latency_p50'] * 1000:>7.1f} "
+                      f"{summary['latency_p95'] * 1000:>7.1f} {summary['latency_p99'] * 1000:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Negative-stock alerts per second when waiting on every publish (the
+# blocking publish_message_to_pub_sub) versus batched publishing with the
+# AlertPublisher, against a fake publisher with per-request latency. Alerts of
+# FAILING_PRODUCTS fail in the fake publisher; every run asserts that all other
+# alerts were delivered exactly once, and the batched runs that each failed
+# alert is reported with its own message.
+#
+#   python -m benchmarks.alert_publisher_bench
+import time
+import contextlib
+import io
+import json
+
+from google.cloud.pubsub_v1.types import BatchSettings
+
+from benchmarks.fakes import FakePublisher
+from utils.supporting_functions import publish_message_to_pub_sub
+from utils.alert_publisher import AlertPublisher
+
+HOURS = 4
+PRODUCTS = 100
+LATENCY = 0.02
+TOPIC_PATH = 'projects/bigquery-dataflow-460522/topics/inventory-updates-streaming'
+FAILING_PRODUCTS = ('PROD_0007', 'PROD_0042')
+FAIL_MARKERS = tuple(f'"product_id": "{product_id}"'.encode('utf-8') for product_id in FAILING_PRODUCTS)
+
+
+def inventory_hours():
+    # Every product ends the hour below zero so each row is an alert
+    headers = ('inventory_date', 'inventory_hour', 'product_id', 'in_stock', 'new_product', 'returned_product', 'units_sold', 'final_stock')
+    return [[headers] + [('2025-06-30', f'{hour:02d}', f'PROD_{i:04d}', 10, 0, 0, -20, -10) for i in range(1, PRODUCTS + 1)]
+            for hour in range(HOURS)]
+
+
+def run_blocking(publisher, hours):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for product_inventory in hours:
+            publish_message_to_pub_sub(product_inventory, publisher, TOPIC_PATH)
+    return None  # failures are only printed
+
+
+def run_batched(publisher, hours, flush_every_hour):
+    alert_publisher = AlertPublisher(publisher, TOPIC_PATH)
+    for product_inventory in hours:
+        alert_publisher.publish_negative_stock(product_inventory)
+        if flush_every_hour:
+            alert_publisher.wait()
+    alert_publisher.wait()
+    return alert_publisher
+
+
+def check_delivery(label, publisher, hours, alert_publisher):
+    alerts = {(row[1], row[2]) for product_inventory in hours for row in product_inventory[1:]}
+    failing = {(hour, product_id) for hour, product_id in alerts if product_id in FAILING_PRODUCTS}
+    delivered = [json.loads(data) for data in publisher.messages]
+    delivered_keys = [(message['inventory_hour'], message['product_id']) for message in delivered]
+    assert len(delivered_keys) == len(set(delivered_keys)), f'{label}: alerts delivered twice'
+    assert set(delivered_keys) == alerts - failing, f'{label}: {len(alerts - failing - set(delivered_keys))} alerts not delivered'
+    if alert_publisher is not None:
+        failed_keys = [(failure.message['inventory_hour'], failure.message['product_id']) for failure in alert_publisher.failures]
+        assert sorted(failed_keys) == sorted(failing), f'{label}: failures reported {sorted(failed_keys)}'
+        assert all('503' in failure.error for failure in alert_publisher.failures), f'{label}: failure without its error'
+        assert alert_publisher.published == len(alerts - failing), f'{label}: published count {alert_publisher.published}'
+
+
+def main():
+    hours = inventory_hours()
+    settings = BatchSettings(max_bytes=1000000, max_latency=0.05, max_messages=100)
+    runs = [('blocking', lambda publisher: run_blocking(publisher, hours)),
+            ('batched/hour', lambda publisher: run_batched(publisher, hours, True)),
+            ('batched/run', lambda publisher: run_batched(publisher, hours, False))]
+    print(f"{'mode':>13} {'alerts':>7} {'requests':>9} {'seconds':>8} {'alerts/s':>9} {'failed':>7}")
+    for label, run in runs:
+        publisher = FakePublisher(settings, latency=LATENCY, fail_markers=FAIL_MARKERS)
+        start = time.perf_counter()
+        alert_publisher = run(publisher)
+        elapsed = time.perf_counter() - start
+        check_delivery(label, publisher, hours, alert_publisher)
+        failed = len(alert_publisher.failures) if alert_publisher is not None else '-'
+        print(f'{label:>13} {len(publisher.messages):>7} {publisher.calls["publish"]:>9} {elapsed:>8.2f} '
+              f'{len(publisher.messages) / elapsed:>9.0f} {failed:>7}')
+
+
+if __name__ == '__main__':
+    main()
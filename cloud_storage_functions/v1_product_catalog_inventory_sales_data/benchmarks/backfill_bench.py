@@ -0,0 +1,37 @@
+# Backfill throughput (partitions per second) for the serial path and for
+# process pools of increasing size, checking that every pool writes exactly
+# the same bytes as the serial run for the same seed.
+#
+#   python -m benchmarks.backfill_bench
+import hashlib
+import os
+
+from benchmarks.fakes import FakeBucket
+from utils.storage_backends import GcsStorageBackend
+from utils.backfill import run_backfill
+
+START_DATE = '2025-05-01'
+END_DATE = '2025-05-14'
+SEED = 42
+
+
+def bucket_digest(bucket):
+    return {name: hashlib.sha256(data).hexdigest() for name, data in bucket.objects.items()}
+
+
+def main():
+    print(f"{'workers':>8} {'partitions':>11} {'seconds':>8} {'part/s':>8} {'matches serial':>15}")
+    serial_digest = None
+    for workers in [0] + sorted({2, 4, os.cpu_count() or 1}):
+        bucket = FakeBucket()
+        summary = run_backfill(GcsStorageBackend(bucket), START_DATE, END_DATE, seed=SEED, workers=workers)
+        digest = bucket_digest(bucket)
+        if serial_digest is None:
+            serial_digest = digest
+        label = 'serial' if workers == 0 else workers
+        print(f"{label:>8} {summary['partitions']:>11} {summary['seconds']:>8.2f} "
+              f"{summary['partitions_per_second']:>8.1f} {str(digest == serial_digest):>15}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# Rows per second of the per-row generate_sales_data versus the NumPy
+# columnar generator, both for raw columns and for materialized rows.
+#
+#   python -m benchmarks.batch_generator_bench
+import time
+
+import numpy as np
+
+from utils.supporting_functions import generate_static_products, create_static_product_catalog, generate_sales_data
+from utils.batch_generators import generate_sales_columns, generate_sales_data_batch
+
+ROW_COUNTS = (1_000, 100_000, 1_000_000)
+ROW_GENERATOR_LIMIT = 100_000  # the per-row generator is too slow to time at a million rows
+
+
+def timed(generate):
+    start = time.perf_counter()
+    generate()
+    return time.perf_counter() - start
+
+
+def main():
+    product_catalog = create_static_product_catalog(100, generate_static_products(), '2025-06-30', '12')
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'generator':>16} {'seconds':>8} {'rows/s':>12}")
+    for rows in ROW_COUNTS:
+        runs = [('batch columns', lambda: generate_sales_columns(product_catalog, rows, rng)),
+                ('batch rows', lambda: generate_sales_data_batch(product_catalog, '2025-06-30', '12', rows, rng))]
+        if rows <= ROW_GENERATOR_LIMIT:
+            runs.insert(0, ('row', lambda: generate_sales_data(product_catalog, '2025-06-30', '12', rows)))
+        for label, generate in runs:
+            elapsed = timed(generate)
+            print(f'{rows:>10} {label:>16} {elapsed:>8.3f} {rows / elapsed:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Cold-start cost of both Cloud Functions: `python -X importtime` of main.py
+# and time to first response of the HTTP handler with the storage and
+# Pub/Sub clients replaced by local fakes. Every measurement is taken in a
+# fresh interpreter.
+#
+#   python -m benchmarks.cold_start_bench
+import json
+import os
+import re
+import subprocess
+import sys
+
+V1_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = {'v1_product_catalog_inventory_sales_data': (V1_DIR, 'generate_data'),
+             'product_sales_csv_gen': (os.path.join(os.path.dirname(V1_DIR), 'product_sales_csv_gen'),
+                                       'genearete_product_and_sales_data')}
+
+# Runs in a fresh interpreter: stub the clients, import main, seed the bucket, call the handler once
+FIRST_RESPONSE_DRIVER = '''
+import time
+start = time.perf_counter()
+import json, sys
+from datetime import date, timedelta
+sys.path[:0] = [{function_dir!r}, {v1_dir!r}]
+from benchmarks.fakes import FakeBucket, FakeStorageClient, FakePublisher
+from google.cloud import storage
+bucket = FakeBucket()
+storage.Client = lambda *args, **kwargs: FakeStorageClient(bucket)
+if {missing_hour}:
+    from google.cloud import pubsub_v1
+    pubsub_v1.PublisherClient = lambda batch_settings=None, **kwargs: FakePublisher(batch_settings, latency=0)
+stubbed = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+days = [(date.today() + timedelta(days=offset)).isoformat() for offset in range(-60, 2)]
+if {handler!r} == 'generate_data':
+    for day in days:
+        for hour in range(24):
+            for prefix in ('product_catalog', 'sales_data', 'inventory_data'):
+                bucket.objects[f'{{prefix}}/date={{day}}/hour={{hour:02d}}/{{prefix}}.csv'] = b''
+    if {missing_hour}:
+        yesterday = days[-3]
+        for prefix in ('product_catalog', 'sales_data', 'inventory_data'):
+            del bucket.objects[f'{{prefix}}/date={{yesterday}}/hour=12/{{prefix}}.csv']
+else:
+    for day in days:
+        for prefix in ('product_catalog', 'sales_data'):
+            bucket.objects[f'{{prefix}}/date={{day}}/{{prefix}}_for_{{day}}.csv'] = b''
+seeded = time.perf_counter()
+
+body, status = main.{handler}(None)
+done = time.perf_counter()
+print(json.dumps({{'status': status, 'import_main': imported - stubbed,
+                  'first_response': (done - seeded) + (imported - start)}}))
+'''
+
+SCENARIOS = [('v1_product_catalog_inventory_sales_data', 'nothing missing', False),
+             ('v1_product_catalog_inventory_sales_data', 'one hour missing', True),
+             ('product_sales_csv_gen', 'nothing missing', False)]
+
+
+def import_time_ms(function_dir):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=function_dir,
+                            capture_output=True, text=True, check=True)
+    match = re.search(r'\|\s*(\d+)\s*\|\s*main$', result.stderr, re.MULTILINE)
+    return int(match.group(1)) / 1000
+
+
+def first_response(function_dir, handler, missing_hour):
+    driver = FIRST_RESPONSE_DRIVER.format(function_dir=function_dir, v1_dir=V1_DIR, handler=handler,
+                                          missing_hour=missing_hour)
+    result = subprocess.run([sys.executable, '-c', driver], cwd=function_dir, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'function':>40} {'import main ms':>15}")
+    for name, (function_dir, _) in FUNCTIONS.items():
+        print(f'{name:>40} {import_time_ms(function_dir):>15.1f}')
+    print()
+    print(f"{'function':>40} {'scenario':>17} {'status':>7} {'first response ms':>18}")
+    for name, scenario, missing_hour in SCENARIOS:
+        function_dir, handler = FUNCTIONS[name]
+        timing = first_response(function_dir, handler, missing_hour)
+        print(f"{name:>40} {scenario:>17} {timing['status']:>7} {timing['first_response'] * 1000:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Object count, bytes and local scan time of the hourly layout versus the
+# same days after daily compaction (utils/compaction.py), for CSV and Parquet
+# hourly files. Scans are the utils/local_query.py queries over every day and
+# over one day; results must be unchanged by compaction. Days are only
+# compacted once recorded as loaded in a plan_partitions load state, which is
+# checked first.
+#
+#   python -m benchmarks.compaction_bench [--days N] [--repeat N]
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from utils.backfill import run_backfill
+from utils.compaction import compact_days
+from utils.local_query import LocalLake, amount_per_category, negative_stock_by_hour
+from utils.partition_planner import PartitionLoadState, PartitionPlanner, PLANNED_DATASETS
+from utils.storage_backends import LocalDirStorageBackend
+
+START_DATE = '2025-04-01'
+FORMATS = ('csv', 'parquet')
+
+
+def count_objects(root):
+    files = [os.path.join(directory, file_name) for directory, _, file_names in os.walk(root) for file_name in file_names]
+    return len(files), sum(os.path.getsize(path) for path in files)
+
+
+def scan_ms(storage_root, predicate, repeat):
+    # Fastest of `repeat` runs of both queries, with a fresh listing each time
+    best = None
+    for _ in range(repeat):
+        lake = LocalLake(storage_root)
+        category = amount_per_category(lake, **predicate)
+        negative = negative_stock_by_hour(lake, **predicate)
+        seconds = category.seconds + negative.seconds
+        best = seconds if best is None else min(best, seconds)
+    return best * 1000, category.table, negative.table
+
+
+def same_results(before, after):
+    # Sums of floats change in the last digits with row order
+    category_before, negative_before = before
+    category_after, negative_after = after
+    return (negative_before.equals(negative_after)
+            and category_before.column('units_sold').equals(category_after.column('units_sold'))
+            and all(abs(a - b) < 1e-3 for a, b in zip(category_before.column('total_ammount_paid').to_pylist(),
+                                                      category_after.column('total_ammount_paid').to_pylist())))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=7, help='Days of partitions to backfill and compact')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scan; the fastest is reported')
+    args = parser.parse_args()
+    end_date = (datetime.strptime(START_DATE, '%Y-%m-%d') + timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+    predicates = (('all', {}), ('1 day', {'start_date': end_date, 'end_date': end_date}))
+
+    print(f"{'format':>8} {'layout':>8} {'objects':>8} {'MiB':>7} {'scan':>6} {'ms':>8} {'same':>5}")
+    for format_name in FORMATS:
+        with tempfile.TemporaryDirectory() as storage_root:
+            storage_backend = LocalDirStorageBackend(storage_root)
+            run_backfill(storage_backend, START_DATE, end_date, workers=0,
+                         output_formats=','.join(f'{dataset}={format_name}' for dataset in PLANNED_DATASETS))
+            hourly = {label: scan_ms(storage_root, predicate, args.repeat) for label, predicate in predicates}
+            objects, size = count_objects(storage_root)
+            for label, (ms, *_) in hourly.items():
+                print(f'{format_name:>8} {"hourly":>8} {objects:>8} {size / 2**20:>7.2f} {label:>6} {ms:>8.1f} {"":>5}')
+
+            # Nothing loaded yet: every day is refused and the hourly objects stay
+            load_state = PartitionLoadState(os.path.join(storage_root, 'load_state.json'))
+            results = compact_days(storage_backend, START_DATE, end_date, load_state)
+            assert all(result.status == 'not_loaded' for result in results)
+            assert count_objects(storage_root) == (objects, size)
+            for plan in PartitionPlanner(storage_backend, load_state).plan_all():
+                load_state.mark_loaded(plan.dataset, plan.versions)  # as plan_partitions.py mark-loaded after the MERGEs ran
+
+            results = compact_days(storage_backend, START_DATE, end_date, load_state)
+            assert all(result.status == 'compacted' for result in results)
+            compaction_seconds = sum(result.seconds for result in results)
+            objects, size = count_objects(storage_root)  # manifests included
+            for label, predicate in predicates:
+                ms, *tables = scan_ms(storage_root, predicate, args.repeat)
+                print(f'{format_name:>8} {"daily":>8} {objects:>8} {size / 2**20:>7.2f} {label:>6} {ms:>8.1f} '
+                      f'{str(same_results(hourly[label][1:], tables)):>5}')
+            print(f'{"":>8} compaction of {len(results)} dataset-days took {compaction_seconds:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Time and peak memory per million sales rows written as CSV and Parquet,
+# materializing every string per row versus keeping them as integer codes
+# into the value pools until the Arrow dictionary columns are written. Each
+# case runs in its own process so peak RSS is not shared between cases.
+#
+#   python -m benchmarks.dictionary_bench [--rows N] [--batch-size N]
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from utils.batch_generators import CUSTOMER_IDS, ORDER_COUNTRIES, generate_sales_columns, iter_sales_data_batch, uuid4_chars
+from utils.output_formats import OUTPUT_FORMATS
+from utils.supporting_functions import generate_static_products, create_static_product_catalog
+
+CASES = {
+    # label: (output format, write the SalesBatches as rows even when the format could take tables)
+    'rows -> csv': ('csv', True),
+    'rows -> parquet': ('parquet', True),
+    'codes -> parquet': ('parquet', False),
+}
+
+
+class CountingWriter(io.RawIOBase):
+    # Keeps only the byte count, so the file itself takes no memory
+    def __init__(self):
+        super().__init__()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+
+def run_case(label, rows, batch_size):
+    import pyarrow as pa
+    import pyarrow.parquet  # noqa: F401 - imported before the baseline so its memory is not counted
+
+    format_name, as_rows = CASES[label]
+    product_catalog = create_static_product_catalog(1_000, generate_static_products(), '2025-06-30', '12')
+    generate_sales_columns(product_catalog, 1_000, np.random.default_rng(1))  # warm up imports and the catalog arrays
+    baseline = peak_rss()
+    sales = iter_sales_data_batch(product_catalog, '2025-06-30', '12', rows, np.random.default_rng(0), batch_size)
+    writer = CountingWriter()
+    start = time.perf_counter()
+    OUTPUT_FORMATS[format_name].write_stream(iter(sales) if as_rows else sales, writer)
+    elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'peak': peak_rss() - baseline, 'arrow_peak': pa.default_memory_pool().max_memory(),
+            'size': writer.size}
+
+
+def column_bytes(rows):
+    # In-memory size of one batch's string columns: formatted NumPy strings versus codes and raw UUID bytes
+    product_catalog = create_static_product_catalog(1_000, generate_static_products(), '2025-06-30', '12')
+    columns = generate_sales_columns(product_catalog, rows, np.random.default_rng(0))
+    strings = (uuid4_chars(columns['transaction_uuid']).view('S36').ravel().astype('U36').nbytes
+               + CUSTOMER_IDS[columns['customer_index']].nbytes + ORDER_COUNTRIES[columns['country_index']].nbytes
+               + columns['product_ids'][columns['product_index']].nbytes)
+    codes = sum(columns[name].nbytes for name in ('transaction_uuid', 'customer_index', 'country_index', 'product_index'))
+    return strings, codes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    parser.add_argument('--case', choices=sorted(CASES), help=argparse.SUPPRESS)  # one case, run in a child process
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.rows, args.batch_size)))
+        return
+
+    per_million = 1_000_000 / args.rows
+    print(f'{args.rows:,} rows in batches of {args.batch_size:,}; seconds and MiB per million rows')
+    print(f"{'case':>17} {'seconds':>8} {'rows/s':>11} {'peak MiB':>9} {'arrow MiB':>10} {'file MiB':>9}")
+    for label in CASES:
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.dictionary_bench', '--rows', str(args.rows),
+                                 '--batch-size', str(args.batch_size), '--case', label],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(f"{label:>17} {result['seconds'] * per_million:>8.2f} {args.rows / result['seconds']:>11,.0f} "
+              f"{result['peak'] / 2**20:>9.1f} {result['arrow_peak'] / 2**20:>10.1f} {result['size'] * per_million / 2**20:>9.1f}")
+
+    strings, codes = column_bytes(args.batch_size)
+    print(f'string columns of one {args.batch_size:,}-row batch: {strings / 2**20:.1f} MiB as strings, '
+          f'{codes / 2**20:.1f} MiB as codes')
+
+
+if __name__ == '__main__':
+    main()
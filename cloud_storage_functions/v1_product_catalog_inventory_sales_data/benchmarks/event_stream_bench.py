@@ -0,0 +1,75 @@
+# Drives the load generator (utils.event_stream) against the in-memory
+# benchmarks.fakes.FakePublisher with constant, ramp and burst profiles, and
+# one constant rate above what this machine can generate: achieved versus
+# target rate, drift, publish latency percentiles and the event mix. Checks
+# that each hour's per-transaction stock ends at update_inventory's final stock.
+#
+#   python -m benchmarks.event_stream_bench [--seconds N] [--rate N] [--latency S]
+import argparse
+import json
+from collections import namedtuple
+from itertools import islice
+
+from benchmarks.fakes import FakePublisher
+from utils.catalog_cache import CatalogCache
+from utils.event_stream import LoadGenerator, iter_events, rate_profile
+from utils.supporting_functions import generate_random_pre_sales_inventory, generate_sales_data, generate_static_products, update_inventory
+from utils.seeding import partition_random
+
+BatchSettings = namedtuple('BatchSettings', ['max_messages', 'max_latency'])
+SEED = 5
+DATE = '2025-06-30'
+
+
+def profiles(rate, seconds):
+    return [
+        ('constant', rate_profile('constant', rate)),
+        ('ramp', rate_profile('ramp', rate / 4, rate, ramp_seconds=seconds)),
+        ('burst', rate_profile('burst', rate / 2, rate * 2, burst_every=1.0, burst_seconds=0.25)),
+        ('saturated', rate_profile('constant', rate * 50)),
+    ]
+
+
+def stock_matches(product_catalog):
+    # Last 'inventory' event per product in the first hour against update_inventory's final_stock
+    sales = generate_sales_data(product_catalog, DATE, '00', None, partition_random(SEED, 'sales_data', DATE, '00'))
+    pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, DATE, '00',
+                                                              partition_random(SEED, 'inventory_data', DATE, '00'))
+    final_stock = {row[2]: row[7] for row in update_inventory(sales, pre_sales_inventory)[1:] if row[6]}
+    streamed = {}
+    for event_type, message in islice(iter_events(product_catalog, DATE, '00', SEED), 2 * (len(sales) - 1)):
+        if event_type == 'inventory':
+            streamed[message['product_id']] = message['stock']
+    return streamed == final_stock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each profile')
+    parser.add_argument('--rate', type=float, default=2000.0, help='Events per second')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds per fake publish request')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--json', action='store_true', help='Also print each summary with its per-second intervals')
+    args = parser.parse_args()
+
+    product_catalog = CatalogCache().catalog_for(args.products, generate_static_products(), DATE, '00')
+    print(f'{args.products:,} products, {args.seconds:.0f} s per profile, publish latency {args.latency * 1000:.0f} ms; '
+          f'stock events match update_inventory: {stock_matches(product_catalog)}')
+    print(f"{'profile':>10} {'target/s':>9} {'achieved/s':>11} {'drift %':>8} {'max 1s drift %':>15} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'p99 ms':>7} {'outstanding':>12} {'sale/inventory/alert':>21} {'failed':>7}")
+    for label, profile in profiles(args.rate, args.seconds):
+        publisher = FakePublisher(BatchSettings(max_messages=500, max_latency=0.01), latency=args.latency)
+        load_generator = LoadGenerator(publisher, {'default': publisher.topic_path('load-test', 'inventory-events')}, profile)
+        summary = load_generator.run(iter_events(product_catalog, DATE, '00', SEED), duration=args.seconds)
+        by_type = summary['by_type']
+        mix = f"{by_type.get('sale', 0)}/{by_type.get('inventory', 0)}/{by_type.get('alert', 0)}"
+        print(f"{label:>10} {summary['target_rate']:>9.0f} {summary['achieved_rate']:>11.0f} {summary['drift_pct']:>8.2f} "
+              f"{summary.get('max_interval_drift_pct', 0):>15.2f} {summary.get('latency_p50_ms', 0):>7.1f} "
+              f"{summary.get('latency_p95_ms', 0):>7.1f} {summary.get('latency_p99_ms', 0):>7.1f} "
+              f"{summary['max_outstanding']:>12} {mix:>21} {summary['failed']:>7}")
+        if args.json:
+            print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
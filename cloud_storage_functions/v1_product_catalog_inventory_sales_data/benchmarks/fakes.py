@@ -0,0 +1,304 @@
+# Local stand-ins for the Google Cloud clients used by the benchmarks.
+# They implement only the subset of the client API the functions touch.
+import io
+import random
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class FakeBlob:
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def exists(self):
+        self.bucket.record_call('exists')
+        return self.name in self.bucket.objects
+
+    def upload_from_string(self, data, content_type='text/plain', if_generation_match=None, retry=None):
+        self.bucket.record_call('upload')
+        if if_generation_match == 0 and self.name in self.bucket.sizes:
+            raise FakeHttpError(412, 'Precondition Failed')
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bucket.store(self.name, data)
+
+    def open(self, mode='r', chunk_size=None, content_type=None, **kwargs):
+        if 'w' not in mode:
+            raise NotImplementedError('FakeBlob only supports writing')
+        return FakeBlobWriter(self, chunk_size or 40 * 1024 * 1024)
+
+
+class FakeBlobWriter(io.RawIOBase):
+    # Buffers up to chunk_size bytes and "sends" each full chunk as one request, like a resumable upload
+
+    def __init__(self, blob, chunk_size):
+        self.blob = blob
+        self.chunk_size = chunk_size
+        self.pending = bytearray()
+        self.sent = []
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return sum(len(chunk) if isinstance(chunk, bytes) else chunk for chunk in self.sent) + len(self.pending)
+
+    def write(self, data):
+        self.pending.extend(data)
+        while len(self.pending) >= self.chunk_size:
+            self._send(bytes(self.pending[:self.chunk_size]))
+            del self.pending[:self.chunk_size]
+        return len(data)
+
+    def _send(self, chunk):
+        self.blob.bucket.record_call('upload_chunk')
+        self.sent.append(chunk if self.blob.bucket.keep_data else len(chunk))
+
+    def close(self):
+        if not self.closed:
+            self._send(bytes(self.pending))
+            self.pending = bytearray()
+            if self.blob.bucket.keep_data:
+                self.blob.bucket.store(self.blob.name, b''.join(self.sent))
+            else:
+                self.blob.bucket.sizes[self.blob.name] = sum(self.sent)
+        super().close()
+
+
+class FakeBucket:
+    """In-memory bucket that counts storage round-trips.
+
+    `list_blobs` pages like GCS (1000 names per page, one call per page) and
+    every call can be delayed by `latency` seconds to mimic network time.
+    With keep_data=False only object sizes are kept, for memory benchmarks.
+    """
+
+    page_size = 1000
+
+    def __init__(self, name='retail_data_v1', latency=0.0, keep_data=True):
+        self.name = name
+        self.latency = latency
+        self.keep_data = keep_data
+        self.objects = {}
+        self.sizes = {}
+        self.calls = Counter()
+
+    def store(self, blob_name, data):
+        self.sizes[blob_name] = len(data)
+        self.objects[blob_name] = data if self.keep_data else b''
+
+    def record_call(self, operation):
+        self.calls[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def blob(self, blob_name):
+        return FakeBlob(self, blob_name)
+
+    def list_blobs(self, prefix='', start_offset=None):
+        names = sorted(name for name in self.objects
+                       if name.startswith(prefix) and (start_offset is None or name >= start_offset))
+        # An empty listing still costs one request
+        for page_start in range(0, max(len(names), 1), self.page_size):
+            self.record_call('list')
+            for name in names[page_start:page_start + self.page_size]:
+                yield FakeBlob(self, name)
+
+
+class FakePublisher:
+    """In-memory Pub/Sub publisher that batches like PublisherClient.
+
+    Messages accumulate until `max_messages` are pending or `max_latency`
+    seconds pass, then the batch is "sent" as one request taking `latency`
+    seconds. Messages whose payload contains any of `fail_markers` fail.
+    """
+
+    def __init__(self, batch_settings=None, latency=0.02, fail_markers=()):
+        self.max_messages = batch_settings.max_messages if batch_settings else 100
+        self.max_latency = batch_settings.max_latency if batch_settings else 0.01
+        self.latency = latency
+        self.fail_markers = tuple(fail_markers)
+        self.messages = []
+        self.subscribers = []
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._batch = []
+        self._timer = None
+        self._sender = ThreadPoolExecutor(max_workers=4, thread_name_prefix='fake-pubsub')
+
+    def topic_path(self, project, topic):
+        return f'projects/{project}/topics/{topic}'
+
+    def publish(self, topic, data, **attrs):
+        future = Future()
+        with self._lock:
+            self._batch.append((data, future))
+            if len(self._batch) >= self.max_messages:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_latency, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future
+
+    def _flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            self._sender.submit(self._send, batch)
+
+    def _send(self, batch):
+        self.calls['publish'] += 1
+        time.sleep(self.latency)
+        for data, future in batch:
+            if any(marker in data for marker in self.fail_markers):
+                future.set_exception(RuntimeError('503 Service Unavailable'))
+            else:
+                self.messages.append(data)
+                future.set_result(str(len(self.messages)))
+                publish_time = datetime.now(timezone.utc)
+                for subscriber in self.subscribers:
+                    subscriber.deliver(data, publish_time)
+
+
+class FakeMessage:
+    # Received message as passed to a streaming-pull callback
+
+    def __init__(self, subscriber, data, publish_time, delivery_attempt=1):
+        self.subscriber = subscriber
+        self.data = data
+        self.publish_time = publish_time
+        self.delivery_attempt = delivery_attempt
+
+    def ack(self):
+        self.subscriber.record('ack')
+
+    def nack(self):
+        self.subscriber.record('nack')
+        self.subscriber.redeliver(self)
+
+
+class FakeSubscriber:
+    """Streaming pull on a FakePublisher: every message the publisher sends is
+    handed to `callback` on a pool of `workers` threads, as the Pub/Sub
+    client does, and nacked messages are delivered again after `redelivery_delay`.
+    """
+
+    def __init__(self, publisher, callback, workers=4, redelivery_delay=0.05):
+        self.callback = callback
+        self.redelivery_delay = redelivery_delay
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fake-subscriber')
+        publisher.subscribers.append(self)
+
+    def record(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+
+    def deliver(self, data, publish_time, delivery_attempt=1):
+        self._pool.submit(self.callback, FakeMessage(self, data, publish_time, delivery_attempt))
+
+    def redeliver(self, message):
+        timer = threading.Timer(self.redelivery_delay, self.deliver,
+                                (message.data, message.publish_time, message.delivery_attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+class FakeStorageClient:
+    # Stands in for storage.Client(); every bucket name maps to the same FakeBucket
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, bucket_name):
+        return self._bucket
+
+
+class FakeHttpError(Exception):
+    # Carries the HTTP status as `code`, like google.api_core.exceptions.GoogleAPICallError
+
+    def __init__(self, code, message=''):
+        super().__init__(f'{code} {message}'.strip())
+        self.code = code
+
+
+class FaultyStorageBackend:
+    """Wraps a storage backend with the failures of a busy bucket.
+
+    A write arriving while `capacity` writes are already in flight is
+    rejected with 429. Other writes fail with 503 at `error_rate`, and
+    during `outage` (start, end seconds after creation) every write does.
+    At `lost_response_rate` a write lands but its response is lost, so the
+    caller sees a 503 for an object that exists. Accepted writes take
+    `latency` seconds plus their size over `bandwidth`. Reads and listings
+    go straight to the wrapped backend.
+    """
+
+    def __init__(self, storage_backend, capacity=8, latency=0.02, bandwidth=None, error_rate=0.0,
+                 lost_response_rate=0.0, outage=None, seed=0):
+        self.storage_backend = storage_backend
+        self.capacity = capacity
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.lost_response_rate = lost_response_rate
+        self.outage = outage
+        self.uri = storage_backend.uri
+        self.stats = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self.storage_backend, name)
+
+    def write_bytes(self, name, payload, content_type=None, content_encoding=None, if_generation_match=None):
+        elapsed = time.monotonic() - self._start
+        with self._lock:
+            self.stats['requests'] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.in_flight > self.capacity:
+                outcome = 'throttled'
+            elif self._rng.random() < self.error_rate or (self.outage and self.outage[0] <= elapsed < self.outage[1]):
+                outcome = 'errors'
+            elif self._rng.random() < self.lost_response_rate:
+                outcome = 'lost_responses'
+            else:
+                outcome = 'accepted'
+            self.stats[outcome] += 1
+        try:
+            if outcome == 'throttled':
+                time.sleep(self.latency / 4)  # rejected before the body is read
+                raise FakeHttpError(429, 'Too Many Requests')
+            if outcome == 'errors':
+                time.sleep(self.latency / 4)
+                raise FakeHttpError(503, 'Service Unavailable')
+            time.sleep(self.latency + (len(payload) / self.bandwidth if self.bandwidth else 0))
+            precondition = {} if if_generation_match is None else {'if_generation_match': if_generation_match}
+            self.storage_backend.write_bytes(name, payload, content_type, content_encoding, **precondition)
+            with self._lock:
+                self.stats['stored'] += 1  # writes that reached the bucket, whatever the caller heard back
+            if outcome == 'lost_responses':
+                raise FakeHttpError(503, 'Service Unavailable (response lost)')
+        finally:
+            with self._lock:
+                self.in_flight -= 1
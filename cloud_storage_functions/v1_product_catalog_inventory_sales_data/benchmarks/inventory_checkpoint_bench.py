@@ -0,0 +1,90 @@
+# Cost of producing one inventory hour whose opening stock is the previous
+# hour's final stock: from the previous hour's checkpoint (load, apply the
+# hour's sales, save) versus replaying every hour since the chain started.
+# Checkpoints are read memory-mapped from a local directory and, as from
+# GCS, as a whole object.
+#
+#   python -m benchmarks.inventory_checkpoint_bench [--products N] [--sales N]
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from utils.batch_generators import generate_sales_columns
+from utils.catalog_cache import CatalogCache
+from utils.inventory_checkpoint import InventoryCarryOver, InventoryCheckpointStore, checkpoint_blob_name, decode_checkpoint
+from utils.inventory_engine import InventoryState
+from utils.seeding import partition_rng
+from utils.storage_backends import LocalDirStorageBackend
+from utils.supporting_functions import generate_static_products
+
+HISTORY_HOURS = (1, 24, 168)
+SEED = 11
+
+
+def date_hour(index):
+    return f'2025-06-{1 + index // 24:02d}', f'{index % 24:02d}'
+
+
+def build_hour(product_catalog, index, sales):
+    # Random opening/restock draws for the hour with its sales applied, opening stock not yet carried over
+    date, hour = date_hour(index)
+    state = InventoryState.random_pre_sales(product_catalog, date, hour, partition_rng(SEED, 'inventory_data', date, hour))
+    state.apply_sales_columns(generate_sales_columns(product_catalog, sales, partition_rng(SEED, 'sales_data', date, hour)))
+    return state
+
+
+def replay(product_catalog, hours, sales):
+    # Final stock of the last hour without checkpoints: every hour of the chain is regenerated
+    previous = None
+    for index in range(hours):
+        state = build_hour(product_catalog, index, sales)
+        if previous is not None:
+            state.carry_over(previous.snapshot())
+        previous = state
+    return previous.final_stock
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--sales', type=int, default=1_000, help='Sales per hour')
+    args = parser.parse_args()
+
+    product_catalog = CatalogCache().catalog_for(args.products, generate_static_products(), '2025-06-01', '00')
+    with tempfile.TemporaryDirectory() as root:
+        storage_backend = LocalDirStorageBackend(root)
+        checkpoint_store = InventoryCheckpointStore(storage_backend)
+        carry_over = InventoryCarryOver(checkpoint_store)
+        for index in range(max(HISTORY_HOURS)):
+            state = build_hour(product_catalog, index, args.sales)
+            carry_over.open(state)
+            carry_over.close(state)
+        size = len(storage_backend.read_bytes(checkpoint_blob_name(*date_hour(0))))
+        print(f'{args.products:,} products, {args.sales:,} sales per hour; checkpoint {size / 2**20:.2f} MiB')
+        print(f"{'history hours':>14} {'replay ms':>10} {'checkpoint ms':>14} {'gcs-style ms':>13} {'same':>5}")
+
+        for hours in HISTORY_HOURS:
+            start = time.perf_counter()
+            replayed = replay(product_catalog, hours + 1, args.sales)
+            replay_ms = (time.perf_counter() - start) * 1000
+
+            # A fresh InventoryCarryOver has nothing in memory, so the previous hour comes from its checkpoint
+            start = time.perf_counter()
+            state = build_hour(product_catalog, hours, args.sales)
+            InventoryCarryOver(checkpoint_store).open(state)
+            checkpoint_store.save(*date_hour(hours), state.snapshot())
+            checkpoint_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            gcs_state = build_hour(product_catalog, hours, args.sales)
+            gcs_state.carry_over(decode_checkpoint(storage_backend.read_bytes(checkpoint_blob_name(*date_hour(hours - 1)))))
+            gcs_ms = (time.perf_counter() - start) * 1000
+
+            same = np.array_equal(replayed, state.final_stock) and np.array_equal(replayed, gcs_state.final_stock)
+            print(f'{hours:>14} {replay_ms:>10.1f} {checkpoint_ms:>14.1f} {gcs_ms:>13.1f} {str(same):>5}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Time to build pre-sales inventory, apply an hour of sales and emit the
+# inventory rows: dict-of-dicts (generate_random_pre_sales_inventory +
+# update_inventory) versus the array-backed InventoryState.
+#
+#   python -m benchmarks.inventory_engine_bench
+import time
+
+import numpy as np
+
+from utils.supporting_functions import (generate_static_products, create_static_product_catalog,
+                                        generate_random_pre_sales_inventory, update_inventory)
+from utils.batch_generators import generate_sales_columns, sales_columns_to_rows
+from utils.inventory_engine import InventoryState
+
+SCENARIOS = ((1_000, 10_000), (100_000, 1_000_000), (250_000, 2_000_000))  # (products, sales rows)
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main():
+    archetypes = generate_static_products()
+    print(f"{'products':>9} {'sales':>10} {'engine':>20} {'seconds':>8} {'products/s':>12}")
+    for num_products, num_sales in SCENARIOS:
+        product_catalog = create_static_product_catalog(num_products, archetypes, '2025-06-30', '12')
+        columns = generate_sales_columns(product_catalog, num_sales, np.random.default_rng(0))
+        product_sales = list(sales_columns_to_rows(columns, '2025-06-30', '12'))
+
+        def dict_of_dicts():
+            pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, '2025-06-30', '12')
+            update_inventory(product_sales, pre_sales_inventory)
+
+        def arrays_from_rows():
+            inventory = InventoryState.random_pre_sales(product_catalog, '2025-06-30', '12')
+            inventory.apply_sales_rows(product_sales)
+            inventory.to_rows()
+
+        def arrays_from_columns():
+            inventory = InventoryState.random_pre_sales(product_catalog, '2025-06-30', '12')
+            inventory.apply_sales_columns(columns)
+            inventory.to_rows()
+
+        for label, run in (('dict-of-dicts', dict_of_dicts), ('arrays (rows)', arrays_from_rows),
+                           ('arrays (columns)', arrays_from_columns)):
+            elapsed = timed(run)
+            print(f'{num_products:>9,} {num_sales:>10,} {label:>20} {elapsed:>8.3f} {num_products / elapsed:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
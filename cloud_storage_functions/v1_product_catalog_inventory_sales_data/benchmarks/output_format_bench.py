@@ -0,0 +1,44 @@
+# Bytes written and encode time per output format for one typical hour
+# (catalog, sales and inventory partitions).
+#
+#   python -m benchmarks.output_format_bench [--sales N]
+import argparse
+import time
+
+import numpy as np
+
+from utils.supporting_functions import (generate_static_products, create_static_product_catalog,
+                                        generate_random_pre_sales_inventory, update_inventory)
+from utils.batch_generators import generate_sales_data_batch
+from utils.output_formats import OUTPUT_FORMATS
+
+
+def typical_hour(num_sales):
+    product_catalog = create_static_product_catalog(100, generate_static_products(), '2025-06-30', '12')
+    pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, '2025-06-30', '12')
+    product_sales = generate_sales_data_batch(product_catalog, '2025-06-30', '12', num_sales, np.random.default_rng(0))
+    product_inventory = update_inventory(product_sales, pre_sales_inventory)
+    return {'product_catalog': product_catalog, 'sales_data': product_sales, 'inventory_data': product_inventory}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sales', type=int, default=1000, help='Sales rows in the hour')
+    args = parser.parse_args()
+
+    datasets = typical_hour(args.sales)
+    for output_format in OUTPUT_FORMATS.values():
+        output_format.encode(datasets['inventory_data'])  # warm up so lazy imports are not timed
+    print(f"{'dataset':>15} {'format':>9} {'bytes':>11} {'vs csv':>7} {'encode ms':>10}")
+    for dataset, rows in datasets.items():
+        csv_size = None
+        for name, output_format in OUTPUT_FORMATS.items():
+            start = time.perf_counter()
+            size = len(output_format.encode(rows))
+            elapsed = time.perf_counter() - start
+            csv_size = csv_size or size
+            print(f'{dataset:>15} {name:>9} {size:>11,} {size / csv_size:>7.2f} {elapsed * 1000:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
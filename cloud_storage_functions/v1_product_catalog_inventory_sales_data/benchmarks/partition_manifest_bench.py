@@ -0,0 +1,63 @@
+# Counts storage calls needed to find missing partitions with per-blob
+# exists() probing versus a PartitionManifest built from prefix listings.
+#
+#   python -m benchmarks.partition_manifest_bench
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import FakeBucket
+from utils.storage_backends import GcsStorageBackend
+from utils.partition_manifest import PartitionManifest, DATASET_PREFIXES
+
+SIMULATED_ROUND_TRIP = 0.03  # seconds, typical GCS metadata call from Cloud Functions
+
+
+def blob_name(prefix, date, hour):
+    return f'{prefix}/date={date}/hour={hour}/{prefix}_for_{date}-{hour}.csv'
+
+
+def window(end, hours):
+    date_hours = []
+    for offset in range(hours):
+        moment = end - timedelta(hours=offset)
+        date_hours.append((moment.strftime('%Y-%m-%d'), moment.strftime('%H')))
+    return sorted(date_hours)
+
+
+def seeded_bucket(date_hours, history_hours=24 * 60):
+    # Everything but the latest hour already exists, plus older history outside the window
+    bucket = FakeBucket()
+    end = datetime.strptime(f'{date_hours[-1][0]} {date_hours[-1][1]}', '%Y-%m-%d %H')
+    for date, hour in window(end, len(date_hours) + history_hours)[:-1]:
+        for prefix in DATASET_PREFIXES:
+            bucket.objects[blob_name(prefix, date, hour)] = b''
+    return bucket
+
+
+def probe_with_exists(bucket, date_hours):
+    missing = 0
+    for date, hour in date_hours:
+        for prefix in DATASET_PREFIXES:
+            if not bucket.blob(blob_name(prefix, date, hour)).exists():
+                missing += 1
+    return missing
+
+
+def probe_with_manifest(bucket, date_hours):
+    manifest = PartitionManifest(GcsStorageBackend(bucket)).load(date_hours[0][0])
+    return sum(len(manifest.missing(prefix, date_hours)) for prefix in DATASET_PREFIXES)
+
+
+def main():
+    end = datetime(2025, 6, 30, 23)
+    print(f"{'window':>10} {'strategy':>10} {'calls':>7} {'missing':>8} {'est. wait (s)':>14}")
+    for label, hours in (('72h', 72), ('30d', 24 * 30)):
+        date_hours = window(end, hours)
+        for strategy, probe in (('exists', probe_with_exists), ('manifest', probe_with_manifest)):
+            bucket = seeded_bucket(date_hours)
+            missing = probe(bucket, date_hours)
+            calls = sum(bucket.calls.values())
+            print(f'{label:>10} {strategy:>10} {calls:>7} {missing:>8} {calls * SIMULATED_ROUND_TRIP:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# Offline check of the incremental load planner (utils/partition_planner.py and
+# plan_partitions.py) against a local directory: the plan -> mark-loaded -> plan
+# workflow, with asserts on the planned partition sets, the exact MERGE SQL and
+# its @partition_dates/@partition_keys parameters. Then times planning of a
+# long history with and without --lookback-hours.
+#
+#   python -m benchmarks.partition_planner_bench [--days N]
+import argparse
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from plan_partitions import mark_loaded, write_plan
+from utils.partition_planner import PartitionLoadState, PartitionPlanner
+from utils.storage_backends import LocalDirStorageBackend
+
+EXPECTED_INVENTORY_SQL = """MERGE `bigquery-dataflow-460522.retail_ds.inventory_data_managed` AS target
+USING (
+  SELECT
+    ext.inventory_date,
+    ext.inventory_hour,
+    ext.product_id,
+    ext.in_stock,
+    ext.new_product,
+    ext.returned_product,
+    ext.units_sold,
+    ext.final_stock,
+    CAST(ext.date AS STRING) AS date,
+    ext.hour AS hour,
+    TIMESTAMP(ext.date) AS date_tmsp
+  FROM `bigquery-dataflow-460522.retail_ds.inventory_data_ext` AS ext
+  WHERE ext.date IN UNNEST(@partition_dates)
+    AND CONCAT(CAST(ext.date AS STRING), '/', ext.hour) IN UNNEST(@partition_keys)
+) AS source
+ON FALSE
+WHEN NOT MATCHED BY SOURCE
+  AND DATE(target.date_tmsp) IN UNNEST(@partition_dates)
+  AND CONCAT(target.date, '/', target.hour) IN UNNEST(@partition_keys) THEN
+  DELETE
+WHEN NOT MATCHED THEN
+  INSERT ROW;
+"""
+
+
+def write_hour(storage_backend, dataset, date, hour, payload=b'header\nrow\n', shard=None):
+    file_name = f'{dataset}_for_{date}-{hour}' + (f'-{shard:05d}-of-00002' if shard is not None else '') + '.csv'
+    storage_backend.write_bytes(f'{dataset}/date={date}/hour={hour}/{file_name}', payload)
+
+
+def expected_parameters(partitions):
+    dates = sorted({date for date, _ in partitions})
+    return [{'name': 'partition_dates',
+             'parameterType': {'type': 'ARRAY', 'arrayType': {'type': 'DATE'}},
+             'parameterValue': {'arrayValues': [{'value': date} for date in dates]}},
+            {'name': 'partition_keys',
+             'parameterType': {'type': 'ARRAY', 'arrayType': {'type': 'STRING'}},
+             'parameterValue': {'arrayValues': [{'value': f'{date}/{hour}'} for date, hour in sorted(partitions)]}}]
+
+
+def run_command(command, root, out, state):
+    args = SimpleNamespace(command=command, state=state, out=out, storage=root, datasets='inventory_data,sales_data',
+                           lookback_hours=None)
+    load_state = PartitionLoadState.load(state)
+    return write_plan(args, load_state) if command == 'plan' else mark_loaded(args, load_state)
+
+
+def read_plan(out, dataset):
+    sql_path, params_path = os.path.join(out, f'{dataset}.sql'), os.path.join(out, f'{dataset}.params.json')
+    if not os.path.exists(sql_path):
+        assert not os.path.exists(params_path), f'{dataset}: parameters without a statement'
+        return None, None
+    with open(sql_path) as sql_file, open(params_path) as params_file:
+        return sql_file.read(), json.load(params_file)
+
+
+def check_workflow():
+    with tempfile.TemporaryDirectory() as root:
+        storage_backend = LocalDirStorageBackend(os.path.join(root, 'bucket'))
+        out, state = os.path.join(root, 'merge_plan'), os.path.join(root, 'load_state.json')
+        first = [('2025-06-29', '23'), ('2025-06-30', '00'), ('2025-06-30', '01')]
+        for date, hour in first:
+            write_hour(storage_backend, 'inventory_data', date, hour)
+        write_hour(storage_backend, 'sales_data', '2025-06-30', '00', shard=0)
+        write_hour(storage_backend, 'sales_data', '2025-06-30', '00', shard=1)
+        write_hour(storage_backend, 'sales_data', '2025-06-30', '01', shard=1)  # shard 0 is written last: not complete yet
+
+        # Nothing loaded: every complete partition is new
+        summary = run_command('plan', storage_backend.root, out, state)
+        assert summary == {'inventory_data': {'new': 3, 'changed': 0}, 'sales_data': {'new': 1, 'changed': 0}}, summary
+        sql, parameters = read_plan(out, 'inventory_data')
+        assert sql == EXPECTED_INVENTORY_SQL, sql
+        assert parameters == expected_parameters(first), parameters
+        assert read_plan(out, 'sales_data')[1] == expected_parameters([('2025-06-30', '00')])
+
+        # Once marked loaded, planning again finds no work and leaves no statement to re-run
+        assert run_command('mark-loaded', storage_backend.root, out, state) == {'inventory_data': {'marked_loaded': 3},
+                                                                                'sales_data': {'marked_loaded': 1}}
+        summary = run_command('plan', storage_backend.root, out, state)
+        assert summary == {'inventory_data': {'new': 0, 'changed': 0}, 'sales_data': {'new': 0, 'changed': 0}}, summary
+        assert read_plan(out, 'inventory_data') == (None, None) and read_plan(out, 'sales_data') == (None, None)
+
+        # A rewritten hour (new version and size), a new hour and a sharded hour completed by its shard 0
+        time.sleep(0.01)
+        write_hour(storage_backend, 'inventory_data', '2025-06-30', '00', payload=b'header\nrow\nrow\n')
+        write_hour(storage_backend, 'inventory_data', '2025-06-30', '02')
+        write_hour(storage_backend, 'sales_data', '2025-06-30', '01', shard=0)
+        planner = PartitionPlanner(storage_backend, PartitionLoadState.load(state), ('inventory_data', 'sales_data'))
+        plans = {plan.dataset: plan for plan in planner.plan_all()}
+        assert plans['inventory_data'].new == {('2025-06-30', '02')}, plans['inventory_data']
+        assert plans['inventory_data'].changed == {('2025-06-30', '00')}, plans['inventory_data']
+        assert plans['sales_data'].new == {('2025-06-30', '01')} and not plans['sales_data'].changed, plans['sales_data']
+        run_command('plan', storage_backend.root, out, state)
+        sql, parameters = read_plan(out, 'inventory_data')
+        assert sql == EXPECTED_INVENTORY_SQL
+        assert parameters == expected_parameters([('2025-06-30', '00'), ('2025-06-30', '02')]), parameters
+
+        # Only what was planned is recorded; the next plan is empty again
+        run_command('mark-loaded', storage_backend.root, out, state)
+        summary = run_command('plan', storage_backend.root, out, state)
+        assert all(counts == {'new': 0, 'changed': 0} for counts in summary.values()), summary
+        assert not [name for name in os.listdir(out) if name.endswith(('.sql', '.params.json'))], os.listdir(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=90, help='Days of hourly history to plan against')
+    args = parser.parse_args()
+
+    check_workflow()
+    print('plan -> mark-loaded -> plan workflow: partition sets, SQL and parameters as expected')
+    with tempfile.TemporaryDirectory() as root:
+        storage_backend = LocalDirStorageBackend(root)
+        hours = [(f'2025-{1 + day // 28:02d}-{1 + day % 28:02d}', f'{hour:02d}') for day in range(args.days) for hour in range(24)]
+        for date, hour in hours:
+            write_hour(storage_backend, 'inventory_data', date, hour)
+        load_state = PartitionLoadState(os.path.join(root, 'load_state.json'))
+        load_state.mark_loaded('inventory_data', PartitionPlanner(storage_backend, load_state, ('inventory_data',))
+                               .plan('inventory_data').versions)
+        write_hour(storage_backend, 'inventory_data', *hours[-1], payload=b'rewritten\n')
+        print(f"{len(hours):,} loaded hours, the last one rewritten")
+        print(f"{'lookback':>9} {'plan ms':>8} {'changed':>8}")
+        for lookback_hours in (None, 48):
+            start = time.perf_counter()
+            plan = PartitionPlanner(storage_backend, load_state, ('inventory_data',)).plan('inventory_data', lookback_hours)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            assert plan.changed == {hours[-1]} and not plan.new, plan
+            print(f"{'all' if lookback_hours is None else lookback_hours:>9} {elapsed_ms:>8.1f} {len(plan.changed):>8}")
+
+
+if __name__ == '__main__':
+    main()
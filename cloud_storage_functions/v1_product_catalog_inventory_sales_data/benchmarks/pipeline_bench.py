@@ -0,0 +1,291 @@
+# End-to-end benchmark of generation -> serialization -> upload -> alerts.
+#
+# For every (products per hour, sales per hour) pair the stages of one hourly
+# partition are timed in isolation: catalog, sales, inventory, encode, upload
+# and publish. Each stage reports seconds, peak traced memory and rows/s.
+# Both Cloud Function handlers are then driven end to end against a local
+# directory backend and the fake publisher, over a window of pending hours
+# (v1) or days (product_sales_csv_gen); the span timings from each handler's
+# invocation summary are stored with the case.
+#
+# Each run is appended to a JSON-lines results file keyed by git commit.
+# --compare prints the change against an earlier commit.
+#
+#   python -m benchmarks.pipeline_bench [--quick] [--generator row|batch] [--formats SPEC]
+#                                       [--latency S] [--bandwidth B] [--results PATH] [--compare REV]
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytz
+
+from benchmarks.fakes import FakePublisher
+from utils.storage_backends import LocalDirStorageBackend
+from utils.supporting_functions import generate_static_products, generate_sales_data
+from utils.batch_generators import generate_sales_data_batch
+from utils.catalog_cache import CatalogCache
+from utils.inventory_engine import InventoryState
+from utils.alert_publisher import AlertPublisher
+from utils.output_formats import parse_dataset_formats
+from utils.partition_manifest import DATASET_PREFIXES, partition_blob_names
+
+FUNCTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_GEN_MAIN = os.path.join(os.path.dirname(FUNCTION_DIR), 'product_sales_csv_gen', 'main.py')
+DEFAULT_RESULTS = os.path.join(FUNCTION_DIR, 'benchmarks', 'results', 'pipeline_bench.jsonl')
+TOPIC_PATH = 'projects/bench/topics/inventory-updates-streaming'
+
+PRODUCTS = (100, 1_000)
+SALES = (1_000, 10_000)
+WINDOW_HOURS = (1, 6, 24)
+CSV_GEN_DAYS = (1, 7)
+QUICK = {'products': (100,), 'sales': (1_000,), 'window_hours': (1, 6), 'csv_gen_days': (1,)}
+
+
+def measure(function, *args):
+    # Timed run, then a second traced run for peak memory (tracing slows the code it watches)
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def case_result(kind, name, params, rows, seconds, peak):
+    return {'kind': kind, 'name': name, **params, 'rows': rows, 'seconds': round(seconds, 4),
+            'peak_mib': round(peak / 2**20, 2), 'rows_per_second': round(rows / seconds) if seconds else 0}
+
+
+def run_stages(num_products, num_sales, generator, dataset_formats, storage_root, latency, bandwidth):
+    date, hour = '2025-06-30', '12'
+    archetypes = generate_static_products()
+    params = {'products': num_products, 'sales': num_sales}
+    results = []
+
+    random.seed(0)
+    catalog, seconds, peak = measure(lambda: list(CatalogCache().catalog_for(num_products, archetypes, date, hour)))
+    results.append(case_result('stage', 'catalog', params, num_products, seconds, peak))
+
+    if generator == 'batch':
+        generate_sales = lambda: generate_sales_data_batch(catalog, date, hour, num_sales, np.random.default_rng(0))
+    else:
+        generate_sales = lambda: generate_sales_data(catalog, date, hour, num_sales)
+    sales, seconds, peak = measure(generate_sales)
+    results.append(case_result('stage', 'sales', params, num_sales, seconds, peak))
+
+    def update_inventory():
+        inventory_state = InventoryState.random_pre_sales(catalog, date, hour, np.random.default_rng(0))
+        inventory_state.apply_sales_rows(sales)
+        return inventory_state.to_rows()
+    inventory, seconds, peak = measure(update_inventory)
+    results.append(case_result('stage', 'inventory', params, num_products, seconds, peak))
+
+    datasets = {'product_catalog': catalog, 'sales_data': sales, 'inventory_data': inventory}
+    total_rows = sum(len(rows) - 1 for rows in datasets.values())
+    payloads, seconds, peak = measure(lambda: {dataset: dataset_formats[dataset].encode(rows) for dataset, rows in datasets.items()})
+    results.append(case_result('stage', 'encode', params, total_rows, seconds, peak))
+
+    storage_backend = LocalDirStorageBackend(storage_root, latency, bandwidth)
+    extensions = {dataset: output_format.extension for dataset, output_format in dataset_formats.items()}
+    blob_names = partition_blob_names(date, hour, extensions)
+    def upload():
+        for dataset, payload in payloads.items():
+            storage_backend.write_bytes(blob_names[dataset], payload, dataset_formats[dataset].content_type)
+    _, seconds, peak = measure(upload)
+    results.append(case_result('stage', 'upload', params, total_rows, seconds, peak))
+
+    def publish():
+        alert_publisher = AlertPublisher(FakePublisher(latency=0), TOPIC_PATH)
+        alert_publisher.publish_negative_stock(inventory)
+        alert_publisher.wait()
+        return alert_publisher.published
+    alerts, seconds, peak = measure(publish)
+    results.append(case_result('stage', 'publish', params, alerts, seconds, peak))
+    return results
+
+
+def latest_full_hour():
+    # Same cut-off as generate_data: the previous complete hour, Pacific time
+    pacific_now = datetime.now(pytz.utc).astimezone(pytz.timezone('America/Los_Angeles')) - timedelta(hours=1)
+    return pacific_now.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def seed_existing_partitions(storage_backend, window_days, window_hours, extensions):
+    # Every hour in the handler's window exists except the latest `window_hours`
+    latest = latest_full_hour()
+    start = datetime.combine(latest.date() - timedelta(days=window_days), datetime.min.time())
+    hour = start
+    while hour <= latest - timedelta(hours=window_hours):
+        for blob_name in partition_blob_names(hour.strftime('%Y-%m-%d'), hour.strftime('%H'), extensions).values():
+            storage_backend.write_bytes(blob_name, b'')
+        hour += timedelta(hours=1)
+
+
+def run_generate_data(main_module, num_products, num_sales, window_hours, generator, formats, latency, bandwidth):
+    window_days = window_hours // 24 + 1
+    request = SimpleNamespace(args={'products': num_products, 'sales': num_sales, 'window_days': window_days,
+                                    'generator': generator, 'formats': formats})
+    extensions = {dataset: output_format.extension
+                  for dataset, output_format in parse_dataset_formats(formats, DATASET_PREFIXES).items()}
+
+    def run():
+        with tempfile.TemporaryDirectory() as storage_root:
+            storage_backend = LocalDirStorageBackend(storage_root)
+            seed_existing_partitions(storage_backend, window_days, window_hours, extensions)
+            storage_backend.latency, storage_backend.bandwidth = latency, bandwidth
+            main_module.storage_backend = storage_backend
+            main_module.publisher = FakePublisher(latency=0)
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                body, status = main_module.generate_data(request)
+        if status != 200:
+            raise RuntimeError(f'generate_data returned {status}: {body}')
+        return json.loads(log.getvalue().splitlines()[-1])  # the invocation summary
+
+    summary, seconds, peak = measure(run)
+    rows = window_hours * (2 * num_products + num_sales)
+    params = {'products': num_products, 'sales': num_sales, 'window_hours': window_hours}
+    return {**case_result('handler', 'generate_data', params, rows, seconds, peak), 'spans': summary['spans']}
+
+
+def run_csv_gen(csv_gen_module, num_products, num_sales, window_days, latency, bandwidth):
+    csv_gen_module.NUM_PRODUCTS = num_products
+    csv_gen_module.NUM_SALES = num_sales
+    today = datetime.strptime(csv_gen_module.TODAY, '%Y-%m-%d')
+    csv_gen_module.START_DATE = (today - timedelta(days=window_days - 1)).strftime('%Y-%m-%d')
+
+    def run():
+        with tempfile.TemporaryDirectory() as storage_root:
+            csv_gen_module.storage_backend = csv_gen_module.LocalDirStorageBackend(storage_root, latency, bandwidth)
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                body, status = csv_gen_module.genearete_product_and_sales_data(None)
+        if status != 200:
+            raise RuntimeError(f'genearete_product_and_sales_data returned {status}: {body}')
+        return json.loads(log.getvalue().splitlines()[-1])  # the invocation summary
+
+    summary, seconds, peak = measure(run)
+    params = {'products': num_products, 'sales': num_sales, 'window_days': window_days}
+    rows = window_days * (num_products + num_sales)
+    return {**case_result('handler', 'genearete_product_and_sales_data', params, rows, seconds, peak), 'spans': summary['spans']}
+
+
+def load_csv_gen_module():
+    # Both functions name their entry module main.py; load this one under a distinct name
+    spec = importlib.util.spec_from_file_location('product_sales_csv_gen_main', CSV_GEN_MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=FUNCTION_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=FUNCTION_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f'{commit}-dirty' if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def case_key(case):
+    return tuple(case.get(field) for field in ('kind', 'name', 'products', 'sales', 'window_hours', 'window_days'))
+
+
+def load_results(results_path):
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path) as results_file:
+        return [json.loads(line) for line in results_file if line.strip()]
+
+
+def find_baseline(records, record, compare):
+    # Latest earlier run of the requested commit, or of the most recent other commit
+    for previous in reversed(records):
+        if compare and previous['commit'].startswith(compare):
+            return previous
+        if not compare and previous['commit'] != record['commit']:
+            return previous
+    return None
+
+
+def change(new, old):
+    return f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+
+
+def print_cases(cases, baseline=None):
+    baseline_cases = {case_key(case): case for case in baseline['cases']} if baseline else {}
+    header = f"{'kind':>8} {'name':>34} {'products':>8} {'sales':>7} {'window':>7} {'seconds':>9} {'peak MiB':>9} {'rows/s':>11}"
+    if baseline:
+        header += f" {'Δ seconds':>10} {'Δ peak':>8}"
+    print(header)
+    for case in cases:
+        window = f"{case['window_hours']}h" if 'window_hours' in case else f"{case['window_days']}d" if 'window_days' in case else ''
+        line = (f"{case['kind']:>8} {case['name']:>34} {case['products']:>8} {case['sales']:>7} {window:>7} "
+                f"{case['seconds']:>9.4f} {case['peak_mib']:>9.2f} {case['rows_per_second']:>11,}")
+        previous = baseline_cases.get(case_key(case))
+        if previous:
+            line += f" {change(case['seconds'], previous['seconds']):>10} {change(case['peak_mib'], previous['peak_mib']):>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true', help='Smallest volumes only')
+    parser.add_argument('--generator', choices=('row', 'batch'), default='batch', help='Sales generator for stages and generate_data')
+    parser.add_argument('--formats', default='', help="Per-dataset output formats, e.g. 'sales_data=parquet'")
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected storage latency per request (seconds)')
+    parser.add_argument('--bandwidth', type=float, default=None, help='Storage write bandwidth limit (bytes/s)')
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help='JSON-lines file the run is appended to')
+    parser.add_argument('--compare', default=None, help='Commit to compare against (default: latest other commit)')
+    args = parser.parse_args()
+
+    grid = QUICK if args.quick else {'products': PRODUCTS, 'sales': SALES, 'window_hours': WINDOW_HOURS, 'csv_gen_days': CSV_GEN_DAYS}
+    dataset_formats = parse_dataset_formats(args.formats, DATASET_PREFIXES)
+    import main as v1_main
+    csv_gen_main = load_csv_gen_module()
+
+    cases = []
+    for num_products in grid['products']:
+        for num_sales in grid['sales']:
+            with tempfile.TemporaryDirectory() as storage_root:
+                cases += run_stages(num_products, num_sales, args.generator, dataset_formats, storage_root,
+                                    args.latency, args.bandwidth)
+            for window_hours in grid['window_hours']:
+                cases.append(run_generate_data(v1_main, num_products, num_sales, window_hours, args.generator,
+                                               args.formats, args.latency, args.bandwidth))
+            for window_days in grid['csv_gen_days']:
+                cases.append(run_csv_gen(csv_gen_main, num_products, num_sales, window_days, args.latency, args.bandwidth))
+
+    record = {'commit': git_commit(), 'timestamp': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'generator': args.generator, 'formats': args.formats,
+              'latency': args.latency, 'bandwidth': args.bandwidth, 'cases': cases}
+    previous_records = load_results(args.results)
+    baseline = find_baseline(previous_records, record, args.compare)
+    if baseline:
+        print(f"Compared with {baseline['commit']} ({baseline['timestamp']})")
+    print_cases(cases, baseline)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, 'a') as results_file:
+        results_file.write(json.dumps(record) + '\n')
+    print(f'Results appended to {args.results}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Local analytics over the Hive-partitioned layout (utils/local_query.py): the
+# same days are backfilled as CSV, gzip CSV and Parquet, then each query runs
+# over the whole range, one day and one hour. Reports files and rows scanned
+# and pruned by the date/hour predicate and the query latency, and checks
+# that the raw-sales and rollup versions of the category query agree.
+#
+#   python -m benchmarks.query_bench [--days N] [--repeat N]
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from utils.backfill import run_backfill
+from utils.local_query import LocalLake, amount_per_category, amount_per_category_rollup, negative_stock_by_hour
+from utils.partition_planner import PLANNED_DATASETS
+from utils.storage_backends import LocalDirStorageBackend
+
+START_DATE = '2025-03-01'
+FORMATS = ('csv', 'csv_gzip', 'parquet')
+QUERIES = (('category', amount_per_category), ('category_rollup', amount_per_category_rollup),
+           ('negative_stock', negative_stock_by_hour))
+
+
+def predicates(end_date):
+    return (('all', {}), ('1 day', {'start_date': end_date, 'end_date': end_date}),
+            ('1 hour', {'start_date': end_date, 'end_date': end_date, 'hours': ['12']}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=7, help='Days of partitions to backfill')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per query; the fastest is reported')
+    args = parser.parse_args()
+    end_date = (datetime.strptime(START_DATE, '%Y-%m-%d') + timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+
+    print(f"{'format':>9} {'query':>16} {'range':>7} {'files':>6} {'pruned':>7} {'rows':>9} {'rows pruned':>12} {'ms':>8} {'match':>6}")
+    for format_name in FORMATS:
+        with tempfile.TemporaryDirectory() as storage_root:
+            run_backfill(LocalDirStorageBackend(storage_root), START_DATE, end_date, workers=0,
+                         output_formats=','.join(f'{dataset}={format_name}' for dataset in PLANNED_DATASETS))
+            for label, predicate in predicates(end_date):
+                results = {}
+                for query_name, query in QUERIES:
+                    # A fresh lake per run so the file listing is part of the measured latency
+                    runs = [query(LocalLake(storage_root), **predicate) for _ in range(args.repeat)]
+                    results[query_name] = min(runs, key=lambda result: result.seconds)
+                    pruned_rows = sum(stats.rows_pruned for stats in query(LocalLake(storage_root, count_pruned=True), **predicate).scans)
+                    best = results[query_name]
+                    match = ''
+                    if query_name == 'category_rollup':
+                        match = str(best.table.column('units_sold').to_pylist()
+                                    == results['category'].table.column('units_sold').to_pylist())
+                    print(f"{format_name:>9} {query_name:>16} {label:>7} {sum(s.files_scanned for s in best.scans):>6} "
+                          f"{sum(s.files_pruned for s in best.scans):>7} {sum(s.rows_scanned for s in best.scans):>9,} "
+                          f"{pruned_rows:>12,} {best.seconds * 1000:>8.1f} {match:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Checks that seeded partitions are reproducible and measures what verifying
+# them costs. One day of partitions is generated in order, in reverse, in a
+# random order and one partition at a time on a process pool; every run must
+# produce the same bytes. generate_data is then run twice with the same seed
+# (identical files expected) and once with another seed (different files).
+#
+#   python -m benchmarks.seeding_bench
+import contextlib
+import hashlib
+import io
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from benchmarks.fakes import FakePublisher
+from utils.backfill import build_hour_grid, generate_partition
+from utils.output_formats import parse_dataset_formats
+from utils.partition_manifest import DATASET_PREFIXES
+from utils.sales_rollup import ROLLUP_PREFIX
+from utils.seeding import num_products_for
+from utils.storage_backends import LocalDirStorageBackend
+
+DATE = '2025-05-01'
+SEED = 42
+
+
+def partition_digest(date_hour, num_products, dataset_formats):
+    date, hour = date_hour
+    payloads = generate_partition(date, hour, num_products, SEED, dataset_formats)
+    return (date, hour), {dataset: hashlib.sha256(payload).hexdigest() for dataset, payload in payloads.items()}
+
+
+def digests_in_order(date_hours, num_products, dataset_formats):
+    return dict(partition_digest(date_hour, num_products, dataset_formats) for date_hour in date_hours)
+
+
+def digests_on_pool(date_hours, num_products, dataset_formats):
+    with ProcessPoolExecutor(max_workers=2) as process_pool:
+        return dict(process_pool.map(partition_digest, date_hours, [num_products] * len(date_hours),
+                                     [dataset_formats] * len(date_hours)))
+
+
+def directory_digest(root):
+    digests = {}
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            with open(path, 'rb') as stored_file:
+                digests[os.path.relpath(path, root)] = hashlib.sha256(stored_file.read()).hexdigest()
+    return digests
+
+
+def run_generate_data(seed, generator):
+    import main
+    with tempfile.TemporaryDirectory() as storage_root:
+        main.storage_backend = LocalDirStorageBackend(storage_root)
+        main.publisher = FakePublisher(latency=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.generate_data(SimpleNamespace(args={'seed': seed, 'generator': generator, 'window_days': 0}))
+        return directory_digest(storage_root)
+
+
+def main():
+    dataset_formats = parse_dataset_formats('', DATASET_PREFIXES + (ROLLUP_PREFIX,))
+    date_hours = build_hour_grid(DATE, DATE)
+    num_products = num_products_for(SEED)
+    shuffled = date_hours[:]
+    random.Random(0).shuffle(shuffled)
+
+    print(f"{'order':>12} {'partitions':>11} {'seconds':>8} {'part/s':>8} {'identical':>10}")
+    reference = None
+    runs = [('in order', lambda: digests_in_order(date_hours, num_products, dataset_formats)),
+            ('reversed', lambda: digests_in_order(date_hours[::-1], num_products, dataset_formats)),
+            ('shuffled', lambda: digests_in_order(shuffled, num_products, dataset_formats)),
+            ('pool', lambda: digests_on_pool(shuffled, num_products, dataset_formats))]
+    for label, run in runs:
+        start = time.perf_counter()
+        digests = run()
+        elapsed = time.perf_counter() - start
+        reference = reference or digests
+        print(f'{label:>12} {len(digests):>11} {elapsed:>8.2f} {len(digests) / elapsed:>8.1f} {str(digests == reference):>10}')
+
+    print()
+    print(f"{'generator':>10} {'files':>6} {'same seed identical':>20} {'other seed differs':>19}")
+    for generator in ('row', 'batch'):
+        first = run_generate_data(SEED, generator)
+        second = run_generate_data(SEED, generator)
+        other = run_generate_data(SEED + 1, generator)
+        differs = all(other.get(name) != digest for name, digest in first.items() if 'sales_data' in name)
+        print(f'{generator:>10} {len(first):>6} {str(first == second):>20} {str(differs):>19}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Wall time of writing one high-volume sales hour as a single object versus
+# sharded by target size, against a local-directory backend whose bandwidth
+# is limited per upload stream (as a single GCS resumable upload is).
+# Shards upload on parallel streams, so the limit applies per shard. First
+# checks that rewriting an interrupted hour at another shard count (as after
+# a volume profile change) leaves only the new shards.
+#
+#   python -m benchmarks.sharding_bench [--sales N] [--bandwidth BYTES_PER_S] [--workers N]
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.storage_backends import LocalDirStorageBackend
+from utils.supporting_functions import generate_static_products
+from utils.catalog_cache import CatalogCache
+from utils.batch_generators import generate_sales_data_batch
+from utils.output_formats import OUTPUT_FORMATS
+from utils.partition_manifest import partition_blob_names, shard_blob_names
+from utils.upload_executor import UploadExecutor
+from utils.volume_profiles import estimate_row_bytes, plan_shards, upload_sales_shards, ROW_SIZE_SAMPLE
+
+DATE, HOUR = '2025-06-30', '12'
+TARGET_SHARD_MIB = (None, 32, 8)
+
+
+def write_hour(product_catalog, num_sales, target_shard_bytes, row_bytes, bandwidth, workers):
+    output_format = OUTPUT_FORMATS['csv']
+    with tempfile.TemporaryDirectory() as storage_root:
+        storage_backend = LocalDirStorageBackend(storage_root, bandwidth=bandwidth)
+        shard_rows = plan_shards(num_sales, row_bytes, target_shard_bytes)
+        blob_names = shard_blob_names(partition_blob_names(DATE, HOUR)['sales_data'], output_format.extension, len(shard_rows))
+        start = time.perf_counter()
+        with UploadExecutor(storage_backend, max_workers=workers) as upload_executor:
+            results, units_sold_totals = upload_sales_shards(upload_executor, product_catalog, DATE, HOUR, shard_rows,
+                                                             blob_names, output_format, 0, 100_000)
+        elapsed = time.perf_counter() - start
+        sizes = [os.path.getsize(os.path.join(storage_root, *name.split('/'))) for name in blob_names]
+    assert all(result.success for result in results) and int(units_sold_totals.sum()) > 0
+    return len(shard_rows), max(sizes), sum(sizes), elapsed
+
+
+def check_reshard(product_catalog, row_bytes):
+    # An hour interrupted before shard 0 at 8 shards, rewritten at 6, then unsharded: nothing of an earlier run survives
+    output_format = OUTPUT_FORMATS['csv']
+    blob_name = partition_blob_names(DATE, HOUR)['sales_data']
+    with tempfile.TemporaryDirectory() as storage_root:
+        storage_backend = LocalDirStorageBackend(storage_root)
+        with UploadExecutor(storage_backend, max_workers=4) as upload_executor:
+            for num_shards in (8, 6, 1):
+                shard_rows = plan_shards(num_shards * 1000, row_bytes, 1000 * row_bytes if num_shards > 1 else None)
+                assert len(shard_rows) == num_shards, shard_rows
+                blob_names = shard_blob_names(blob_name, output_format.extension, num_shards)
+                results, _ = upload_sales_shards(upload_executor, product_catalog, DATE, HOUR, shard_rows, blob_names,
+                                                 output_format, 0, 10_000)
+                assert all(result.success for result in results)
+                stored = sorted(storage_backend.list_prefix('sales_data/'))
+                assert stored == sorted(blob_names), f'{num_shards} shards: stale {sorted(set(stored) - set(blob_names))}'
+                if num_shards > 1:
+                    storage_backend.delete(blob_names[0])  # interrupted before shard 0 landed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sales', type=int, default=500_000, help='Sales rows in the hour')
+    parser.add_argument('--bandwidth', type=float, default=20e6, help='Bytes/s per upload stream')
+    parser.add_argument('--workers', type=int, default=8, help='Upload threads')
+    args = parser.parse_args()
+
+    product_catalog = CatalogCache().catalog_for(100, generate_static_products(), DATE, HOUR)
+    sample = generate_sales_data_batch(product_catalog, DATE, HOUR, ROW_SIZE_SAMPLE, np.random.default_rng(0))
+    row_bytes = estimate_row_bytes(OUTPUT_FORMATS['csv'], sample)
+    check_reshard(product_catalog, row_bytes)
+    print('rewriting an interrupted hour at another shard count leaves only the new shards')
+
+    print(f"{'target':>8} {'shards':>7} {'max MiB':>8} {'total MiB':>10} {'seconds':>8} {'rows/s':>10}")
+    for target_mib in TARGET_SHARD_MIB:
+        target_bytes = target_mib * 2**20 if target_mib else None
+        shards, largest, total, elapsed = write_hour(product_catalog, args.sales, target_bytes, row_bytes,
+                                                     args.bandwidth, args.workers)
+        label = f'{target_mib} MiB' if target_mib else 'single'
+        print(f'{label:>8} {shards:>7} {largest / 2**20:>8.1f} {total / 2**20:>10.1f} {elapsed:>8.2f} {args.sales / elapsed:>10,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Peak traced memory (tracemalloc) of writing one sales partition with the
+# in-memory path (list of tuples -> StringIO -> upload_from_string) versus
+# streaming lazily generated rows through a resumable blob writer.
+#
+#   python -m benchmarks.streaming_memory_bench [--max-rows N]
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.fakes import FakeBucket
+from utils.storage_backends import GcsStorageBackend
+from utils.supporting_functions import generate_static_products, create_static_product_catalog, upload_tuples_to_gcs_as_csv
+from utils.batch_generators import generate_sales_data_batch, iter_sales_data_batch
+from utils.csv_stream import stream_rows_to_blob
+
+ROW_COUNTS = (10_000, 1_000_000, 10_000_000)
+IN_MEMORY_LIMIT = 1_000_000  # the in-memory path needs several GB beyond this
+BLOB_NAME = 'sales_data/date=2025-06-30/hour=12/sales_data_for_2025-06-30-12.csv'
+
+
+def write_in_memory(bucket, product_catalog, rows):
+    sales = generate_sales_data_batch(product_catalog, '2025-06-30', '12', rows, np.random.default_rng(0))
+    upload_tuples_to_gcs_as_csv(GcsStorageBackend(bucket), BLOB_NAME, sales)
+
+
+def write_streaming(bucket, product_catalog, rows):
+    sales = iter_sales_data_batch(product_catalog, '2025-06-30', '12', rows, np.random.default_rng(0), batch_size=50_000)
+    stream_rows_to_blob(GcsStorageBackend(bucket), BLOB_NAME, sales)
+
+
+def measure(write, product_catalog, rows):
+    bucket = FakeBucket(keep_data=False)
+    tracemalloc.start()
+    start = time.perf_counter()
+    write(bucket, product_catalog, rows)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, bucket.sizes[BLOB_NAME]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-rows', type=int, default=max(ROW_COUNTS))
+    args = parser.parse_args()
+
+    product_catalog = create_static_product_catalog(100, generate_static_products(), '2025-06-30', '12')
+    print(f"{'rows':>11} {'writer':>10} {'peak MiB':>9} {'file MiB':>9} {'seconds':>8}")
+    for rows in (count for count in ROW_COUNTS if count <= args.max_rows):
+        writers = [('streaming', write_streaming)]
+        if rows <= IN_MEMORY_LIMIT:
+            writers.insert(0, ('in-memory', write_in_memory))
+        for label, write in writers:
+            peak, elapsed, size = measure(write, product_catalog, rows)
+            print(f'{rows:>11,} {label:>10} {peak / 2**20:>9.1f} {size / 2**20:>9.1f} {elapsed:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
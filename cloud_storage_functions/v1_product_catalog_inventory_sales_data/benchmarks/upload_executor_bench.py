@@ -0,0 +1,60 @@
+# Wall time to generate and upload a day of partitions (24 hours x 3 datasets)
+# serially versus through the UploadExecutor, against a fake bucket that
+# injects per-request latency.
+#
+#   python -m benchmarks.upload_executor_bench
+import time
+
+from benchmarks.fakes import FakeBucket
+from utils.storage_backends import GcsStorageBackend
+from utils.supporting_functions import (generate_static_products, create_static_product_catalog,
+                                        generate_random_pre_sales_inventory, generate_sales_data,
+                                        update_inventory, upload_tuples_to_gcs_as_csv)
+from utils.upload_executor import UploadExecutor
+
+LATENCY = 0.05  # seconds per upload request
+NUM_PRODUCTS = 100
+DATE = '2025-06-30'
+
+
+def generate_hour(archetypes, hour):
+    product_catalog = create_static_product_catalog(NUM_PRODUCTS, archetypes, DATE, hour)
+    pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, DATE, hour)
+    product_sales = generate_sales_data(product_catalog, DATE, hour)
+    product_inventory = update_inventory(product_sales, pre_sales_inventory)
+    return [(f'product_catalog/date={DATE}/hour={hour}/product_catalog_for_{DATE}-{hour}.csv', product_catalog),
+            (f'sales_data/date={DATE}/hour={hour}/sales_data_for_{DATE}-{hour}.csv', product_sales),
+            (f'inventory_data/date={DATE}/hour={hour}/sales_data_for_{DATE}-{hour}.csv', product_inventory)]
+
+
+def run_serial(bucket, archetypes):
+    for hour in (f'{h:02d}' for h in range(24)):
+        for blob_name, rows in generate_hour(archetypes, hour):
+            upload_tuples_to_gcs_as_csv(GcsStorageBackend(bucket), blob_name, rows)
+    return 0
+
+
+def run_executor(bucket, archetypes, workers):
+    with UploadExecutor(GcsStorageBackend(bucket), max_workers=workers) as upload_executor:
+        for hour in (f'{h:02d}' for h in range(24)):
+            for blob_name, rows in generate_hour(archetypes, hour):
+                upload_executor.submit(blob_name, rows)
+        return len(upload_executor.failures())
+
+
+def main():
+    archetypes = generate_static_products()
+    print(f"{'strategy':>12} {'seconds':>8} {'uploads':>8} {'failed':>7}")
+    runs = [('serial', lambda bucket: run_serial(bucket, archetypes))]
+    runs += [(f'{workers} workers', lambda bucket, workers=workers: run_executor(bucket, archetypes, workers))
+             for workers in (1, 4, 8, 16)]
+    for label, run in runs:
+        bucket = FakeBucket(latency=LATENCY)
+        start = time.perf_counter()
+        failed = run(bucket)
+        elapsed = time.perf_counter() - start
+        print(f'{label:>12} {elapsed:>8.2f} {bucket.calls["upload"]:>8} {failed:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# Uploads through a fault-injecting local bucket (benchmarks.fakes.FaultyStorageBackend)
+# that throttles writes beyond its capacity with 429, fails some with 503 and
+# loses some responses after the object landed. Compares no retries, retries
+# with backoff and a retry budget, and retries plus the AIMD concurrency
+# limiter: throughput, errors seen, uploads recovered and objects missing at
+# the end (holes the next run would have to find); after the outage, a rerun
+# fills them. Asserts that the AIMD runs end with every object stored exactly
+# once and intact, that retries stay within the budget, that 429s decrease
+# the limit and that writes in flight never exceed it.
+#
+#   python -m benchmarks.upload_policy_bench [--objects N] [--workers N]
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeHttpError, FaultyStorageBackend
+from utils.storage_backends import LocalDirStorageBackend
+from utils.upload_executor import UploadExecutor
+from utils.upload_policy import (AdaptiveConcurrencyLimiter, NO_RETRY_POLICY, RetryBudget, RetryPolicy,
+                                 UploadPolicy)
+
+OBJECT_BYTES = 256 * 1024
+# Backoff scaled down from the production defaults (0.5 s .. 32 s) so a run takes seconds
+BENCH_RETRY_POLICY = RetryPolicy(max_attempts=6, initial_backoff=0.05, max_backoff=2.0, multiplier=2.0, jitter='full')
+
+
+def policies(workers):
+    return [
+        ('no retry', lambda: UploadPolicy(NO_RETRY_POLICY, create_only=True), None),
+        ('retry', lambda: UploadPolicy(BENCH_RETRY_POLICY, RetryBudget(), create_only=True), None),
+        ('retry + AIMD', lambda: UploadPolicy(BENCH_RETRY_POLICY, RetryBudget(), create_only=True,
+                                              limiter=AdaptiveConcurrencyLimiter(4, max_limit=workers,
+                                                                                 latency_target=0.2, cooldown=0.1)), None),
+        ('retry + AIMD, outage', lambda: UploadPolicy(BENCH_RETRY_POLICY, RetryBudget(), create_only=True,
+                                                      limiter=AdaptiveConcurrencyLimiter(4, max_limit=workers,
+                                                                                         latency_target=0.2, cooldown=0.1)),
+         (0.5, 1.5)),
+    ]
+
+
+def check_limiter():
+    # Fast failures must never raise the limit: a 503 halves it, other errors leave it alone, only successes grow it
+    for error in (FakeHttpError(503, 'Service Unavailable'), FakeHttpError(500, 'Internal Server Error'), ConnectionError()):
+        limiter = AdaptiveConcurrencyLimiter(4, max_limit=64, latency_target=1.0, cooldown=0.0)
+        policy = UploadPolicy(BENCH_RETRY_POLICY, limiter=limiter, sleep=lambda seconds: None)
+
+        def fail(if_generation_match, error=error):
+            raise error
+
+        for _ in range(20):
+            try:
+                policy.call(fail)
+            except type(error):
+                pass
+        assert limiter.max_seen == 4, f'{error!r} grew the limit to {limiter.max_seen}'
+    limiter = AdaptiveConcurrencyLimiter(4, max_limit=64, latency_target=1.0)
+    UploadPolicy(limiter=limiter).call(lambda if_generation_match: None)
+    assert limiter.limit > 4, 'a fast success did not grow the limit'
+
+
+def run(policy, root, payloads, workers, outage, args):
+    storage_backend = FaultyStorageBackend(LocalDirStorageBackend(root), capacity=args.capacity, latency=args.latency,
+                                           error_rate=args.error_rate, lost_response_rate=args.lost_rate, outage=outage)
+    start = time.perf_counter()
+    with UploadExecutor(storage_backend, max_workers=workers, max_pending=len(payloads), policy=policy) as upload_executor:
+        for name, payload in payloads.items():
+            upload_executor.submit(name, payload)
+        results = upload_executor.wait()
+    return time.perf_counter() - start, results, storage_backend
+
+
+def check_run(label, policy, storage_backend, payloads, stored, intact, complete):
+    summary = policy.summary()
+    stats = storage_backend.stats
+    assert stats['requests'] == summary['attempts'], f'{label}: the bucket saw requests the policy did not count'
+    assert stored <= set(payloads) and intact == len(stored), f'{label}: stored objects differ from their payloads'
+    if policy.retry_budget is not None:
+        budget = policy.retry_budget
+        assert summary['retries'] <= budget.min_retries + budget.ratio * budget.requests, f'{label}: retries exceeded the budget'
+    if policy.limiter is not None:
+        assert not stats['throttled'] or summary['concurrency_decreases'], f'{label}: 429s did not decrease the limit'
+        assert storage_backend.max_in_flight <= int(summary['concurrency_max']), f'{label}: more writes in flight than the limit'
+    if complete:
+        assert stored == set(payloads) and intact == len(payloads), f'{label}: {len(payloads) - len(stored)} objects missing'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--objects', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--capacity', type=int, default=8, help='Concurrent writes the fake bucket accepts')
+    parser.add_argument('--latency', type=float, default=0.03, help='Seconds per accepted write')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='Share of writes failing with 503')
+    parser.add_argument('--lost-rate', type=float, default=0.01, help='Share of writes that land but answer 503')
+    args = parser.parse_args()
+
+    check_limiter()
+    payloads = {f'sales_data/date=2025-06-30/hour={i % 24:02d}/part-{i:05d}.csv': os.urandom(OBJECT_BYTES)
+                for i in range(args.objects)}
+    print(f'{args.objects} objects of {OBJECT_BYTES // 1024} KiB, {args.workers} upload workers, bucket capacity {args.capacity}')
+    print(f"{'policy':>21} {'seconds':>8} {'obj/s':>7} {'MiB/s':>6} {'requests':>9} {'429s':>5} {'503s':>5} "
+          f"{'recovered':>10} {'existed':>8} {'failed':>7} {'no budget':>10} {'missing':>8} {'intact':>7} {'limit min/end':>14}")
+    for label, make_policy, outage in policies(args.workers):
+        with tempfile.TemporaryDirectory() as root:
+            # After an outage the next run re-submits everything: missing objects are created, the others answer 412
+            passes = [(label, outage)] + ([(label.replace('outage', 'rerun'), None)] if outage else [])
+            writes = 0
+            for index, (pass_label, pass_outage) in enumerate(passes):
+                policy = make_policy()
+                elapsed, results, storage_backend = run(policy, root, payloads, args.workers, pass_outage, args)
+                writes += storage_backend.stats['stored']
+                stored = set(storage_backend.list_prefix('sales_data/'))
+                intact = sum(storage_backend.read_bytes(name) == payloads[name] for name in stored)
+                summary = policy.summary()
+                stats = storage_backend.stats
+                succeeded = sum(result.success for result in results)
+                limits = f"{summary['concurrency_min']:.1f}/{summary['concurrency_limit']:.1f}" if policy.limiter else '-'
+                print(f'{pass_label:>21} {elapsed:>8.2f} {succeeded / elapsed:>7.1f} {succeeded * OBJECT_BYTES / 2**20 / elapsed:>6.1f} '
+                      f"{stats['requests']:>9} {stats['throttled']:>5} {stats['errors'] + stats['lost_responses']:>5} "
+                      f"{summary['recovered']:>10} {summary['already_exists']:>8} {summary['failed']:>7} {summary['budget_exhausted']:>10} "
+                      f'{args.objects - len(stored):>8} {intact:>7} {limits:>14}')
+                complete = policy.limiter is not None and index == len(passes) - 1
+                check_run(pass_label, policy, storage_backend, payloads, stored, intact, complete)
+            # Create-only writes land once: a lost response's retry or a rerun never writes the object again
+            assert writes == len(stored), f'{label}: {writes} writes for {len(stored)} objects'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Daily compaction, run once the days' 24 hours have been generated and loaded
+# into the managed tables (plan_partitions.py mark-loaded).
+#
+#   python compact.py --start-date 2025-05-01 --end-date 2025-05-31 --state load_state.json
+import argparse
+import json
+
+from utils.compaction import compact_days, MAX_ROWS_PER_FILE
+from utils.partition_planner import PartitionLoadState, PLANNED_DATASETS
+from utils.storage_backends import storage_backend_from_uri
+
+STORAGE_BUCKET = 'retail_data_v1'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Roll complete days of hourly partitions into sorted daily Parquet files.')
+    parser.add_argument('--start-date', required=True, help='First day to compact (YYYY-MM-DD)')
+    parser.add_argument('--end-date', required=True, help='Last day to compact (YYYY-MM-DD)')
+    parser.add_argument('--state', required=True,
+                        help='Load state of plan_partitions.py: only days whose every hour is loaded at its current version are compacted')
+    parser.add_argument('--datasets', default=','.join(PLANNED_DATASETS), help='Comma-separated datasets to compact')
+    parser.add_argument('--max-rows-per-file', type=int, default=MAX_ROWS_PER_FILE, help='Rows per daily file')
+    parser.add_argument('--storage', default=f'gs://{STORAGE_BUCKET}',
+                        help="'gs://<bucket>' or a local directory holding the partitions")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = compact_days(storage_backend_from_uri(args.storage), args.start_date, args.end_date,
+                           PartitionLoadState.load(args.state), args.datasets.split(','), args.max_rows_per_file)
+    compacted = [result for result in results if result.status == 'compacted']
+    summary = {'compacted': len(compacted),
+               'already_compacted': sum(result.status == 'already_compacted' for result in results),
+               'incomplete': [f'{result.dataset}/{result.date}' for result in results if result.status == 'incomplete'],
+               'not_loaded': [f'{result.dataset}/{result.date}' for result in results if result.status == 'not_loaded'],
+               'objects_before': sum(result.objects_before for result in compacted),
+               'objects_after': sum(result.objects_after for result in compacted),
+               'bytes_before': sum(result.bytes_before for result in compacted),
+               'bytes_after': sum(result.bytes_after for result in compacted),
+               'seconds': round(sum(result.seconds for result in results), 3)}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
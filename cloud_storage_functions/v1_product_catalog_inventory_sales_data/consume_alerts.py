@@ -0,0 +1,50 @@
+# Streaming consumer for the negative-stock alerts published by generate_data,
+# a local alternative to the Dataflow Pub/Sub-to-BigQuery template.
+#
+#   python consume_alerts.py --subscription inventory-updates-streaming-sub --sink alerts.sqlite
+import argparse
+import json
+import os
+
+from utils.alert_consumer import AlertConsumer, SqliteAlertSink, JsonLinesAlertSink
+
+PROJECT_ID = "bigquery-dataflow-460522"
+SUBSCRIPTION_ID = os.environ.get('ALERT_SUBSCRIPTION', 'inventory-updates-streaming-sub')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Deduplicate negative-stock alerts from Pub/Sub into a local sink.')
+    parser.add_argument('--subscription', default=SUBSCRIPTION_ID, help='Subscription on the inventory-updates-streaming topic')
+    parser.add_argument('--sink', default='alerts.sqlite', help="SQLite database, or a .jsonl file for JSON lines")
+    parser.add_argument('--max-batch', type=int, default=500, help='Alerts per sink write')
+    parser.add_argument('--max-latency', type=float, default=0.5, help='Seconds an alert may wait for its batch')
+    parser.add_argument('--dedup-window', type=float, default=6 * 3600,
+                        help='Seconds during which a repeated (date, hour, product) alert is dropped')
+    parser.add_argument('--max-messages', type=int, default=1000, help='Outstanding messages allowed by flow control')
+    parser.add_argument('--timeout', type=float, default=None, help='Stop after this many seconds (default: run until interrupted)')
+    return parser.parse_args()
+
+
+def main():
+    from google.cloud import pubsub_v1
+
+    args = parse_args()
+    sink = JsonLinesAlertSink(args.sink) if args.sink.endswith('.jsonl') else SqliteAlertSink(args.sink)
+    consumer = AlertConsumer(sink, max_batch=args.max_batch, max_latency=args.max_latency, dedup_window=args.dedup_window)
+    subscriber = pubsub_v1.SubscriberClient()
+    subscription_path = subscriber.subscription_path(PROJECT_ID, args.subscription)
+    streaming_pull = subscriber.subscribe(subscription_path, callback=consumer.handle,
+                                          flow_control=pubsub_v1.types.FlowControl(max_messages=args.max_messages))
+    with subscriber:
+        try:
+            streaming_pull.result(timeout=args.timeout)
+        except (TimeoutError, KeyboardInterrupt):
+            streaming_pull.cancel()
+            streaming_pull.result()
+    consumer.close()
+    sink.close()
+    print(json.dumps(consumer.summary(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
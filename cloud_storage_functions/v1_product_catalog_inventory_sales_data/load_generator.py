@@ -0,0 +1,63 @@
+# Continuous event stream for load testing the streaming side: per-transaction
+# sale and inventory events, plus the hourly negative-stock alerts, published
+# at a target rate instead of the handful of alerts each generate_data run emits.
+#
+#   python load_generator.py --topic inventory-events-load-test --rate 2000 --profile ramp --peak-rate 10000 --duration 300
+import argparse
+import json
+import os
+from datetime import datetime
+
+from utils.catalog_cache import CatalogCache
+from utils.event_stream import LoadGenerator, RATE_PROFILE_KINDS, iter_events, rate_profile
+from utils.seeding import new_root_seed
+from utils.supporting_functions import generate_static_products
+
+PROJECT_ID = "bigquery-dataflow-460522"
+TOPIC_ID = os.environ.get('LOAD_TEST_TOPIC', 'inventory-events-load-test')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Publish sale, inventory and alert events to Pub/Sub at a target rate.')
+    parser.add_argument('--topic', default=TOPIC_ID, help='Topic for all events')
+    parser.add_argument('--alert-topic', default=None,
+                        help='Send alert events here instead, e.g. inventory-updates-streaming to load the alert consumer')
+    parser.add_argument('--profile', choices=RATE_PROFILE_KINDS, default='constant')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Events per second (the starting/base rate for ramp and burst)')
+    parser.add_argument('--peak-rate', type=float, default=None, help='Rate reached by the ramp, or during bursts')
+    parser.add_argument('--ramp-seconds', type=float, default=60.0)
+    parser.add_argument('--burst-every', type=float, default=10.0, help='Seconds between the starts of two bursts')
+    parser.add_argument('--burst-seconds', type=float, default=1.0)
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds (default: run until interrupted)')
+    parser.add_argument('--max-events', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=500, help='Most events handed to the publisher per scheduler tick')
+    parser.add_argument('--max-outstanding', type=int, default=10_000, help='Unacknowledged publishes before the generator blocks')
+    parser.add_argument('--max-messages', type=int, default=1000, help='Publisher batch size (BatchSettings.max_messages)')
+    parser.add_argument('--max-latency', type=float, default=0.05, help='Publisher batch latency (BatchSettings.max_latency)')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None, help='Root seed of the simulated sales (default: random)')
+    parser.add_argument('--start-date', default=datetime.now().strftime('%Y-%m-%d'))
+    return parser.parse_args()
+
+
+def main():
+    from google.cloud import pubsub_v1
+
+    args = parse_args()
+    seed = args.seed if args.seed is not None else new_root_seed()
+    product_catalog = CatalogCache().catalog_for(args.products, generate_static_products(), args.start_date, '00')
+    profile = rate_profile(args.profile, args.rate, args.peak_rate, args.ramp_seconds, args.burst_every, args.burst_seconds)
+    publisher = pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(max_messages=args.max_messages, max_latency=args.max_latency))
+    topics = {'default': publisher.topic_path(PROJECT_ID, args.topic)}
+    if args.alert_topic:
+        topics['alert'] = publisher.topic_path(PROJECT_ID, args.alert_topic)
+    load_generator = LoadGenerator(publisher, topics, profile, batch_size=args.batch_size, max_outstanding=args.max_outstanding)
+    summary = load_generator.run(iter_events(product_catalog, args.start_date, '00', seed),
+                                 duration=args.duration, max_events=args.max_events)
+    summary['seed'] = seed
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
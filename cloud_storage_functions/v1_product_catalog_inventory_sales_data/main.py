@@ -1,34 +1,101 @@
-import math
-import random
+import os
 import pytz
-from io import StringIO
-import csv
 from datetime import datetime, timedelta
-from faker import Faker
 from flask import Request
 
-# Supporting Functions imports
+# Supporting Functions imports (NumPy-backed generators are imported in generate_data, only when needed)
 from utils.supporting_functions import *
-
-# Import Cloud Libraries 
-from google.cloud import storage
-from google.cloud import pubsub_v1
-
-fake = Faker()
+from utils.partition_manifest import PartitionManifest, DATASET_PREFIXES, partition_blob_names, shard_blob_names
+from utils.upload_executor import UploadExecutor
+from utils.upload_policy import UploadPolicy, RetryPolicy, RetryBudget, AdaptiveConcurrencyLimiter
+from utils.csv_stream import tally_units_sold
+from utils.output_formats import parse_dataset_formats
+from utils.alert_publisher import AlertPublisher
+from utils.catalog_cache import CatalogCache
+from utils.storage_backends import storage_backend_from_uri
+from utils.instrumentation import RunMetrics, profiled
+from utils.seeding import new_root_seed, num_products_for, partition_random, partition_rng
+from utils.volume_profiles import (get_volume_profile, sales_for_hour, estimate_row_bytes, plan_shards, upload_sales_shards,
+                                   ROW_SIZE_SAMPLE)
 
 # Google Cloud project
 PROJECT_ID  = "bigquery-dataflow-460522"
 
 # Google Cloud Storage Bucket 
 STORAGE_BUCKET = 'retail_data_v1'
-storage_client = storage.Client()
-bucket_instance = storage_client.bucket(STORAGE_BUCKET)
+# Where partitions are read and written: 'gs://<bucket>' or a local directory ('file:///path') for offline runs
+STORAGE_URI = os.environ.get('STORAGE_URI', f'gs://{STORAGE_BUCKET}')
+# Injected per-request latency (seconds) and write bandwidth (bytes/s) for the local backend
+STORAGE_LATENCY = float(os.environ.get('STORAGE_LATENCY', 0))
+STORAGE_BANDWIDTH = float(os.environ.get('STORAGE_BANDWIDTH', 0)) or None
 
 # ----- PUB/SUB TOPIC CONFIGURATION ----
 
 TOPIC_ID = 'inventory-updates-streaming'
-publisher = pubsub_v1.PublisherClient()
-topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
+TOPIC_PATH = f'projects/{PROJECT_ID}/topics/{TOPIC_ID}'
+# Alerts are batched by the client and acknowledged together at the end of each hour or of the run
+PUBSUB_MAX_MESSAGES = int(os.environ.get('PUBSUB_MAX_MESSAGES', 100))
+PUBSUB_MAX_BYTES = int(os.environ.get('PUBSUB_MAX_BYTES', 1000000))
+PUBSUB_MAX_LATENCY = float(os.environ.get('PUBSUB_MAX_LATENCY', 0.05))
+ALERT_FLUSH = os.environ.get('ALERT_FLUSH', 'run')  # 'hour' or 'run'
+
+# ----- CLOUD CLIENTS ----
+# Created on first use and kept for warm invocations, so cold start does not pay for clients it may not need
+storage_backend = None
+publisher = None
+
+def get_storage_backend():
+    global storage_backend
+    if storage_backend is None:
+        storage_backend = storage_backend_from_uri(STORAGE_URI, STORAGE_LATENCY, STORAGE_BANDWIDTH)
+    return storage_backend
+
+def get_publisher():
+    global publisher
+    if publisher is None:
+        from google.cloud import pubsub_v1
+        batch_settings = pubsub_v1.types.BatchSettings(max_messages=PUBSUB_MAX_MESSAGES,
+                                                       max_bytes=PUBSUB_MAX_BYTES,
+                                                       max_latency=PUBSUB_MAX_LATENCY)
+        publisher = pubsub_v1.PublisherClient(batch_settings=batch_settings)
+    return publisher
+
+# Product bodies are reused across hours and across warm invocations
+catalog_cache = CatalogCache()
+
+# ----- UPLOAD CONFIGURATION ----
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 8))
+# Attempts per upload (1 disables retries) with exponential backoff and full jitter between them, see utils/upload_policy.py
+UPLOAD_MAX_ATTEMPTS = int(os.environ.get('UPLOAD_MAX_ATTEMPTS', 5))
+UPLOAD_INITIAL_BACKOFF = float(os.environ.get('UPLOAD_INITIAL_BACKOFF', 0.5))
+UPLOAD_MAX_BACKOFF = float(os.environ.get('UPLOAD_MAX_BACKOFF', 32))
+# Retries per run as a fraction of uploads (plus 10), so a failing bucket is not hit max_attempts times per file
+UPLOAD_RETRY_BUDGET = float(os.environ.get('UPLOAD_RETRY_BUDGET', 0.2))
+# AIMD limit on concurrent writes (at most UPLOAD_WORKERS): halved on 429/503, grown while uploads stay fast
+UPLOAD_ADAPTIVE_CONCURRENCY = os.environ.get('UPLOAD_ADAPTIVE_CONCURRENCY', 'true').lower() == 'true'
+
+# ----- GENERATION CONFIGURATION ----
+# 'row' uses the per-row Python generator, 'batch' the vectorized NumPy generator
+SALES_GENERATOR = os.environ.get('SALES_GENERATOR', 'row')
+# Stream sales rows straight into a resumable upload instead of building the file in memory
+STREAM_UPLOADS = os.environ.get('STREAM_UPLOADS', 'false').lower() == 'true'
+# Sales per hour and sharding, see utils/volume_profiles.py: 'standard' (150-1000, one file), 'high' (1-2M rows,
+# ~64 MiB shards) or 'extreme' (10-30M rows, ~256 MiB shards). Sharded profiles always stream from the batch generator
+VOLUME_PROFILE = os.environ.get('VOLUME_PROFILE', 'standard')
+# Span timings and counters in the per-invocation summary; counters are skipped when false
+METRICS = os.environ.get('METRICS', 'true').lower() == 'true'
+# Root seed for the run; every partition's sales and inventory come from streams derived from it.
+# A fresh seed is drawn (and logged in the summary) when neither SEED nor ?seed= is set
+SEED = os.environ.get('SEED', '')
+# Days before today checked for missing partitions
+WINDOW_DAYS = int(os.environ.get('WINDOW_DAYS', 2))
+# Hourly sales totals by product, category and order country, written under sales_rollup/ with each new sales partition
+SALES_ROLLUP = os.environ.get('SALES_ROLLUP', 'true').lower() == 'true'
+# Per-dataset output format, e.g. 'sales_data=parquet,inventory_data=csv_gzip'; unlisted datasets are CSV
+OUTPUT_FORMATS = os.environ.get('OUTPUT_FORMATS', '')
+# Open each hour's inventory with the previous hour's final stock, checkpointed under inventory_checkpoints/,
+# instead of a random draw; hours whose previous hour has no checkpoint still start from random stock
+INVENTORY_CARRY_OVER = os.environ.get('INVENTORY_CARRY_OVER', 'false').lower() == 'true'
 
 # product_catalog = create_static_product_catalog(NUM_PRODUCTS,STATIC_PRODUCT_ARCHETYPES,'2025-01-01', '13')
 # pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, '2025-01-01', '13')
@@ -36,9 +103,25 @@ topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
 # product_inventory = update_inventory(product_sales,pre_sales_inventory) 
 
 def generate_data(request:Request):
+    # One structured JSON summary per invocation instead of a line per blob; ?profile=true adds cProfile stats
+    metrics_enabled = request.args.get('metrics', str(METRICS)).lower() == 'true' if request else METRICS
+    profile = request.args.get('profile', 'false').lower() == 'true' if request else False
+    metrics = RunMetrics('generate_data', enabled=metrics_enabled)
+    with profiled(metrics, profile):
+        body, status = run_generation(request, metrics)
+    metrics.set(status=status)
+    metrics.emit('INFO' if status == 200 else 'ERROR')
+    return body, status
+
+def run_generation(request:Request, metrics:RunMetrics):
 
     STATIC_PRODUCT_ARCHETYPES = generate_static_products()
-    NUM_PRODUCTS = random.randint(50,100)
+    seed = request.args.get('seed', SEED) if request else SEED
+    root_seed = int(seed) if seed else new_root_seed()
+    NUM_PRODUCTS = num_products_for(root_seed)
+    if request and 'products' in request.args:
+        NUM_PRODUCTS = int(request.args['products'])
+    num_sales = int(request.args['sales']) if request and 'sales' in request.args else None # Random per hour when not set
 
     # --- Dates Configuration ---
     pacific_tz = pytz.timezone('America/Los_Angeles') 
@@ -47,57 +130,196 @@ def generate_data(request:Request):
     today_date_object = pacific_time_now - timedelta(hours=1) # To get complete data from prev hour
     TODAY = today_date_object.strftime('%Y-%m-%d')
     TODAY_LATEST_FULL_HOUR = today_date_object.strftime('%H')
-    print(f'Max date: {TODAY} and max hour: {TODAY_LATEST_FULL_HOUR}')
 
-    start_date_obj = today_date_object - timedelta(days=2)  # Change for backfill or run check on more dates
+    window_days = int(request.args.get('window_days', WINDOW_DAYS)) if request else WINDOW_DAYS
+    start_date_obj = today_date_object - timedelta(days=window_days)  # Change for backfill or run check on more dates
     START_DATE = start_date_obj.strftime('%Y-%m-%d')
     dates = generate_date_list(START_DATE,TODAY)
     hours = [ f"{h:02d}" for h in range(24)]
+    metrics.set(start_date=START_DATE, max_date=TODAY, max_hour=TODAY_LATEST_FULL_HOUR, seed=root_seed, num_products=NUM_PRODUCTS)
+
+    upload_workers = int(request.args.get('upload_workers', UPLOAD_WORKERS)) if request else UPLOAD_WORKERS
+    sales_generator = request.args.get('generator', SALES_GENERATOR) if request else SALES_GENERATOR
+    stream_uploads = request.args.get('stream', str(STREAM_UPLOADS)).lower() == 'true' if request else STREAM_UPLOADS
+    volume_profile = get_volume_profile(request.args.get('volume', VOLUME_PROFILE) if request else VOLUME_PROFILE)
+    sales_row_bytes = None # Encoded size of a sales row, measured once per run for shard planning
+    metrics.set(volume_profile=volume_profile.name)
+    sales_rollup = request.args.get('rollup', str(SALES_ROLLUP)).lower() == 'true' if request else SALES_ROLLUP
+    # The rollup has a format of its own but is not part of the manifest check: a missing rollup never regenerates an hour
+    dataset_formats = parse_dataset_formats(request.args.get('formats', OUTPUT_FORMATS) if request else OUTPUT_FORMATS,
+                                            DATASET_PREFIXES + ('sales_rollup',))
+    extensions = {dataset: output_format.extension for dataset, output_format in dataset_formats.items()}
+    alert_flush = request.args.get('alert_flush', ALERT_FLUSH) if request else ALERT_FLUSH
+    carry_over = request.args.get('carry_over', str(INVENTORY_CARRY_OVER)).lower() == 'true' if request else INVENTORY_CARRY_OVER
+    alert_publisher = None
+    upload_executor = None
 
     try:
-        for date in dates:
-            for hour in hours:
-                if date == TODAY and hour > TODAY_LATEST_FULL_HOUR:
-                    pass
-                else:
-                    catalog_blob_name = f'product_catalog/date={date}/hour={hour}/product_catalog_for_{date}-{hour}.csv'
-                    sales_blob_name = f'sales_data/date={date}/hour={hour}/sales_data_for_{date}-{hour}.csv'
-                    inventory_blob_name = f'inventory_data/date={date}/hour={hour}/sales_data_for_{date}-{hour}.csv'
+        # One listing per dataset prefix instead of three exists() calls per date/hour
+        with metrics.span('existence_check'):
+            partition_manifest = PartitionManifest(get_storage_backend()).load(START_DATE)
+            pending_partitions = [(date, hour) for date in dates for hour in hours
+                                  if not (date == TODAY and hour > TODAY_LATEST_FULL_HOUR)
+                                  and not all(partition_manifest.exists(prefix, date, hour) for prefix in DATASET_PREFIXES)]
+        metrics.set(pending_partitions=len(pending_partitions))
+        if not pending_partitions:
+            return 'Data generated and uploaded succesfully', 200
 
-                    catalog_blob = bucket_instance.blob(catalog_blob_name)
-                    sales_blob = bucket_instance.blob(sales_blob_name)
-                    inventory_blob = bucket_instance.blob(inventory_blob_name)
+        from utils.batch_generators import generate_sales_data_batch, iter_sales_data_batch
+        from utils.inventory_engine import InventoryState
+        from utils.sales_rollup import SalesRollup, rollup_blob_name
+        from utils.inventory_checkpoint import InventoryCarryOver, InventoryCheckpointStore
+        # Pending hours are processed in order, so each one usually opens from the hour just generated
+        inventory_carry_over = InventoryCarryOver(InventoryCheckpointStore(get_storage_backend())) if carry_over else None
+        generate_sales = generate_sales_data_batch if sales_generator == 'batch' else generate_sales_data
+        iter_sales = iter_sales_data_batch if sales_generator == 'batch' else iter_sales_data
+        # Uploads run in the background while the next hour is generated. Partition files are only created
+        # (if_generation_match=0), so a retry or an overlapping run never replaces one that landed
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=min(4, upload_workers), max_limit=upload_workers) if UPLOAD_ADAPTIVE_CONCURRENCY else None
+        upload_policy = UploadPolicy(RetryPolicy(UPLOAD_MAX_ATTEMPTS, UPLOAD_INITIAL_BACKOFF, UPLOAD_MAX_BACKOFF, 2.0, 'full'),
+                                     RetryBudget(UPLOAD_RETRY_BUDGET), limiter, create_only=True)
+        upload_executor = UploadExecutor(get_storage_backend(), max_workers=upload_workers, metrics=metrics, policy=upload_policy)
 
-                    # Product Catalog
-                    if catalog_blob.exists():
-                        print(f'{catalog_blob_name}  exist, no taking actions')
-                    else:
-                        print(f'{catalog_blob_name} does not exists, creating file')
-                        product_catalog = create_static_product_catalog(NUM_PRODUCTS,STATIC_PRODUCT_ARCHETYPES,date, hour)
-                        pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, date, hour)  # Fake an initial inventory                    
-                        upload_tuples_to_gcs_as_csv(STORAGE_BUCKET, bucket_instance, catalog_blob_name, product_catalog) # Upload Product Catalog
-
-                    # Sales data
-                    if sales_blob.exists():
-                        print(f'{sales_blob_name} exist, no taking actions') 
-                    else:
-                        print(f'{sales_blob_name} does not exists, creating file')
-                        product_sales = generate_sales_data(product_catalog, date, hour)                    
-                        upload_tuples_to_gcs_as_csv(STORAGE_BUCKET, bucket_instance, sales_blob_name, product_sales) # Upload Sales Catalog
+        for date, hour in pending_partitions:
+            blob_names = partition_blob_names(date, hour, extensions)
+            catalog_blob_name = blob_names['product_catalog']
+            sales_blob_name = blob_names['sales_data']
+            inventory_blob_name = blob_names['inventory_data']
 
-                    # Inventory Data
-                    if inventory_blob.exists():
-                        print(f'{inventory_blob_name} exist, no taking actions') 
-                    else:
-                        print(f'{inventory_blob_name} does not exists, creating file')
-                        product_inventory = update_inventory(product_sales,pre_sales_inventory) 
-                        upload_tuples_to_gcs_as_csv(STORAGE_BUCKET, bucket_instance, inventory_blob_name, product_inventory) # Upload Inventory Catalog
-                        # Send message to Pub/Sub for negative stock --> Straming Data Flow Pipeline
-                        publish_message_to_pub_sub(product_inventory, publisher, topic_path)
+            catalog_exists = partition_manifest.exists('product_catalog', date, hour)
+            sales_exists = partition_manifest.exists('sales_data', date, hour)
+            inventory_exists = partition_manifest.exists('inventory_data', date, hour)
+            # Cached catalog view, also used when only the sales or inventory partition is missing
+            with metrics.span('generate_catalog'):
+                product_catalog = catalog_cache.catalog_for(NUM_PRODUCTS, STATIC_PRODUCT_ARCHETYPES, date, hour)
+            if not (sales_exists and inventory_exists):
+                with metrics.span('update_inventory'):
+                    pre_sales_inventory = InventoryState.random_pre_sales(product_catalog, date, hour, partition_rng(root_seed, 'inventory_data', date, hour))  # Fake an initial inventory
+                    if inventory_carry_over is not None and not inventory_exists:
+                        carried = inventory_carry_over.open(pre_sales_inventory)
+                        metrics.incr('inventory_carried' if carried else 'inventory_random_opening')
+            # Inventory whose sales partition is already in storage is rebuilt against those sales (see below)
+            product_sales = None
+            aggregated_units_sold = {}
+            sales_uploaded = True  # False when this hour's sales failed to upload: its inventory and rollup would count unsold units
+            rollup = SalesRollup(product_catalog) if sales_rollup and not sales_exists else None
+            # The row generator draws from a random.Random stream, the batch generator from a NumPy one
+            sales_rng = (partition_rng if sales_generator == 'batch' else partition_random)(root_seed, 'sales_data', date, hour)
 
-                   
+            # Product Catalog
+            if catalog_exists:
+                metrics.incr('product_catalog_skipped')
+            else:
+                metrics.incr('product_catalog_created')
+                metrics.incr('product_catalog_rows', len(product_catalog) - 1)
+                upload_executor.submit(catalog_blob_name, product_catalog, dataset_formats['product_catalog']) # Upload Product Catalog
+
+            # Sales data
+            if sales_exists:
+                metrics.incr('sales_data_skipped')
+            else:
+                metrics.incr('sales_data_created')
+                if volume_profile.target_shard_bytes:
+                    # High volume: the hour is split into shards of about target_shard_bytes, uploaded in parallel
+                    if sales_row_bytes is None:
+                        sales_row_bytes = estimate_row_bytes(dataset_formats['sales_data'], generate_sales_data_batch(
+                            product_catalog, date, hour, ROW_SIZE_SAMPLE, partition_rng(0, 'row_size_sample', date, hour)))
+                    sales_count = num_sales or sales_for_hour(volume_profile, partition_random(root_seed, 'sales_volume', date, hour))
+                    shard_rows = plan_shards(sales_count, sales_row_bytes, volume_profile.target_shard_bytes)
+                    shard_names = shard_blob_names(sales_blob_name, dataset_formats['sales_data'].extension, len(shard_rows))
+                    shard_results, units_sold_totals = upload_sales_shards(upload_executor, product_catalog, date, hour, shard_rows,
+                                                                           shard_names, dataset_formats['sales_data'], root_seed,
+                                                                           volume_profile.batch_size, rollup)
+                    # Shard 0 is missing from the results when an earlier shard failed
+                    sales_uploaded = len(shard_results) == len(shard_rows) and all(result.success for result in shard_results)
+                    pre_sales_inventory.apply_units_sold(units_sold_totals)
+                    metrics.incr('sales_data_rows', sales_count)
+                    metrics.incr('sales_data_shards', len(shard_rows))
+                elif stream_uploads:
+                    # Rows are generated while they upload (timed under stream_upload); units sold are tallied on the way through
+                    sales_rows = tally_units_sold(iter_sales(product_catalog, date, hour, num_sales, sales_rng), aggregated_units_sold, rollup)
+                    sales_uploaded = upload_executor.submit_stream(sales_blob_name, sales_rows, output_format=dataset_formats['sales_data']).result().success # Upload Sales Catalog
+                else:
+                    with metrics.span('generate_sales'):
+                        product_sales = generate_sales(product_catalog, date, hour, num_sales, sales_rng)
+                    metrics.incr('sales_data_rows', len(product_sales) - 1)
+                    sales_future = upload_executor.submit(sales_blob_name, product_sales, dataset_formats['sales_data']) # Upload Sales Catalog
+                    if rollup is not None:
+                        with metrics.span('rollup'):
+                            rollup.add_rows(product_sales)
+                    # The rollup is built while the upload runs; the inventory below needs to know it landed
+                    sales_uploaded = sales_future.result().success
+                if not sales_uploaded:
+                    # The failed upload is reported with the run's failed_uploads; the next run regenerates the whole hour
+                    metrics.incr('sales_upload_failed_hours')
+                elif rollup is not None:
+                    # Totals are complete once every row of the hour has gone through the rollup
+                    with metrics.span('rollup'):
+                        rollup_rows = rollup.to_rows(date, hour)
+                    metrics.incr('sales_rollup_created')
+                    metrics.incr('sales_rollup_rows', len(rollup_rows) - 1)
+                    # Replaces a rollup left by an earlier run whose sales upload failed
+                    upload_executor.submit(rollup_blob_name(date, hour, dataset_formats['sales_rollup'].extension),
+                                           rollup_rows, dataset_formats['sales_rollup'], create_only=False)
+
+            # Inventory Data
+            if inventory_exists:
+                metrics.incr('inventory_data_skipped')
+            elif not sales_uploaded:
+                metrics.incr('inventory_data_skipped_failed_sales')
+            else:
+                metrics.incr('inventory_data_created')
+                with metrics.span('update_inventory'):
+                    if sales_exists:
+                        # Only the inventory is missing: its units sold are read back from the stored sales, whatever seed wrote them
+                        from utils.compaction import stored_units_sold
+                        aggregated_units_sold = stored_units_sold(get_storage_backend(), date, hour)
+                        metrics.incr('inventory_from_stored_sales')
+                    if product_sales is None:
+                        pre_sales_inventory.apply_sales_totals(aggregated_units_sold)
+                    else:
+                        pre_sales_inventory.apply_sales_rows(product_sales)
+                    product_inventory = pre_sales_inventory.to_rows()
+                metrics.incr('inventory_data_rows', len(product_inventory) - 1)
+                inventory_future = upload_executor.submit(inventory_blob_name, product_inventory, dataset_formats['inventory_data']) # Upload Inventory Catalog
+                if inventory_carry_over is not None:
+                    # The checkpoint is uploaded once the inventory file has landed, in this or a later hour or at the end of the run
+                    with metrics.span('checkpoint'):
+                        inventory_carry_over.close(pre_sales_inventory, inventory_future)
+                        inventory_carry_over.submit_checkpoints(upload_executor)
+                # Send message to Pub/Sub for negative stock --> Straming Data Flow Pipeline
+                if alert_publisher is None:
+                    alert_publisher = AlertPublisher(get_publisher(), TOPIC_PATH)
+                with metrics.span('publish'):
+                    metrics.incr('alerts_queued', alert_publisher.publish_negative_stock(product_inventory))
+                    if alert_flush == 'hour':
+                        alert_publisher.wait()
 
+        with metrics.span('upload_wait'):
+            if inventory_carry_over is not None:
+                inventory_carry_over.submit_checkpoints(upload_executor, wait=True)
+            upload_results = upload_executor.wait()
+        metrics.set(upload_policy=upload_executor.policy.summary())
+        if alert_publisher is not None:
+            with metrics.span('publish'):
+                alert_publisher.wait()
+            metrics.incr('alerts_published', alert_publisher.published)
+            metrics.incr('alerts_failed', len(alert_publisher.failures))
+            if alert_publisher.failures:
+                metrics.set(alert_failures=[{'message': failure.message, 'error': failure.error}
+                                            for failure in alert_publisher.failures[:10]])
+        failed_uploads = [result for result in upload_results if not result.success]
+        metrics.incr('files_uploaded', len(upload_results) - len(failed_uploads))
+        metrics.incr('bytes_written', sum(result.bytes_written for result in upload_results))
+        metrics.set(storage=get_storage_backend().uri)
+        if failed_uploads:
+            metrics.set(failed_uploads=[{'blob_name': result.blob_name, 'error': result.error} for result in failed_uploads])
+            return f"❌ {len(failed_uploads)} uploads failed: {', '.join(result.blob_name for result in failed_uploads)}", 500
 
         return 'Data generated and uploaded succesfully', 200
     except Exception as e:
-        return  f"❌ Errors encountered plase review, {e} rows", 500
\ No newline at end of file
+        metrics.set(error=repr(e))
+        return  f"❌ Errors encountered plase review, {e} rows", 500
+    finally:
+        if upload_executor is not None:
+            upload_executor.shutdown()
@@ -0,0 +1,74 @@
+# Incremental load planner, run between generation and the BigQuery managed tables.
+#
+#   python plan_partitions.py plan --state load_state.json --out merge_plan/
+#   (run merge_plan/<dataset>.sql with the parameters in merge_plan/<dataset>.params.json, then)
+#   python plan_partitions.py mark-loaded --state load_state.json --out merge_plan/
+import argparse
+import json
+import os
+
+from utils.partition_planner import PartitionLoadState, PartitionPlanner, merge_statement, partition_key, PLANNED_DATASETS
+from utils.storage_backends import storage_backend_from_uri
+
+STORAGE_BUCKET = 'retail_data_v1'
+PLAN_FILE = 'plan.json'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Plan MERGE statements for partitions that are new or changed since the last load.')
+    parser.add_argument('command', choices=('plan', 'mark-loaded'),
+                        help="'plan' writes the statements, 'mark-loaded' records a plan once its statements have run")
+    parser.add_argument('--state', required=True, help='JSON file of partitions already loaded into the managed tables')
+    parser.add_argument('--out', required=True, help='Plan directory: <dataset>.sql, <dataset>.params.json and plan.json')
+    parser.add_argument('--storage', default=f'gs://{STORAGE_BUCKET}',
+                        help="'gs://<bucket>' or a local directory to read partitions from")
+    parser.add_argument('--datasets', default=','.join(PLANNED_DATASETS), help='Comma-separated datasets to plan')
+    parser.add_argument('--lookback-hours', type=int, default=None,
+                        help="Only compare partitions from this many hours before each dataset's watermark")
+    return parser.parse_args()
+
+
+def write_plan(args, load_state):
+    planner = PartitionPlanner(storage_backend_from_uri(args.storage), load_state, args.datasets.split(','))
+    os.makedirs(args.out, exist_ok=True)
+    summary, planned_versions = {}, {}
+    for plan in planner.plan_all(args.lookback_hours):
+        summary[plan.dataset] = {'new': len(plan.new), 'changed': len(plan.changed)}
+        statement = merge_statement(plan)
+        sql_path = os.path.join(args.out, f'{plan.dataset}.sql')
+        params_path = os.path.join(args.out, f'{plan.dataset}.params.json')
+        if statement is None:
+            # A previous plan's statement would reload partitions that are already loaded
+            for stale_path in (sql_path, params_path):
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            continue
+        with open(sql_path, 'w') as sql_file:
+            sql_file.write(statement.sql + ';\n')
+        with open(params_path, 'w') as params_file:
+            json.dump(statement.parameters, params_file, indent=1)
+        planned_versions[plan.dataset] = {partition_key(date, hour): version for (date, hour), version in sorted(plan.versions.items())}
+    # The versions planned here are what mark-loaded records, even if storage changes in between
+    with open(os.path.join(args.out, PLAN_FILE), 'w') as plan_file:
+        json.dump(planned_versions, plan_file, indent=1)
+    return summary
+
+
+def mark_loaded(args, load_state):
+    with open(os.path.join(args.out, PLAN_FILE)) as plan_file:
+        planned_versions = json.load(plan_file)
+    for dataset, versions in planned_versions.items():
+        load_state.mark_loaded(dataset, {tuple(key.split('/')): version for key, version in versions.items()})
+    load_state.save()
+    return {dataset: {'marked_loaded': len(versions)} for dataset, versions in planned_versions.items()}
+
+
+def main():
+    args = parse_args()
+    load_state = PartitionLoadState.load(args.state)
+    summary = write_plan(args, load_state) if args.command == 'plan' else mark_loaded(args, load_state)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+from utils.alert_consumer import WindowedDeduplicator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_duplicates_within_the_window_are_rejected():
+    clock = FakeClock()
+    deduplicator = WindowedDeduplicator(10.0, clock=clock)
+    assert deduplicator.accept('a')
+    clock.now = 9.9
+    assert not deduplicator.accept('a')
+    assert deduplicator.accept('b')
+
+
+def test_keys_expire_after_the_window():
+    clock = FakeClock()
+    deduplicator = WindowedDeduplicator(10.0, clock=clock)
+    deduplicator.accept('a')
+    clock.now = 5.0
+    deduplicator.accept('b')
+    clock.now = 10.0
+    # 'a' expires counting from its first acceptance, not from the rejected duplicate
+    assert deduplicator.accept('a')
+    assert not deduplicator.accept('b')
+    clock.now = 15.0
+    assert deduplicator.accept('c')
+    assert len(deduplicator) == 2  # 'b' expired; memory holds one window of keys
+
+
+def test_forget_lets_a_redelivery_through():
+    deduplicator = WindowedDeduplicator(10.0, clock=FakeClock())
+    deduplicator.accept('a')
+    deduplicator.forget('a')
+    deduplicator.forget('never seen')
+    assert deduplicator.accept('a')
@@ -0,0 +1,103 @@
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from utils.compaction import compact_day, compacted_blob_names
+from utils.output_formats import OUTPUT_FORMATS
+from utils.partition_manifest import HOURS, PartitionManifest, compaction_manifest_name, partition_blob_names
+from utils.partition_planner import MANAGED_COLUMNS, PartitionLoadState, PartitionPlanner
+from utils.storage_backends import LocalDirStorageBackend
+
+DATE = '2025-06-30'
+MANIFEST_NAME = compaction_manifest_name('inventory_data', DATE)
+
+
+class RecordingStorageBackend(LocalDirStorageBackend):
+    # Records writes and deletes in order; the (operation, name) in `fail_on` raises instead of running
+    def __init__(self, root, fail_on=None):
+        super().__init__(root)
+        self.operations = []
+        self.fail_on = fail_on
+
+    def _record(self, operation, name):
+        self.operations.append((operation, name))
+        if (operation, name) == self.fail_on:
+            raise OSError(f'{operation} {name} failed')
+
+    def write_bytes(self, name, payload, *args, **kwargs):
+        self._record('write', name)
+        super().write_bytes(name, payload, *args, **kwargs)
+
+    def delete(self, name):
+        self._record('delete', name)
+        super().delete(name)
+
+
+def hourly_names():
+    return [partition_blob_names(DATE, hour)['inventory_data'] for hour in HOURS]
+
+
+@pytest.fixture
+def loaded_day(tmp_path):
+    # 24 hourly inventory partitions of 3 products, recorded as merged into the managed table
+    storage_backend = LocalDirStorageBackend(tmp_path / 'bucket')
+    for hour, name in zip(HOURS, hourly_names()):
+        rows = [MANAGED_COLUMNS['inventory_data']] + [(DATE, hour, f'product-{product}', 10, 5, -1, -int(hour), 14 - int(hour))
+                                                       for product in (2, 0, 1)]
+        storage_backend.write_bytes(name, OUTPUT_FORMATS['csv'].encode(rows))
+    load_state = PartitionLoadState(str(tmp_path / 'load_state.json'))
+    load_state.mark_loaded('inventory_data', PartitionPlanner(storage_backend, load_state, ('inventory_data',))
+                           .plan('inventory_data').versions)
+    return tmp_path / 'bucket', load_state
+
+
+def test_daily_files_then_manifest_then_deletes(loaded_day):
+    root, load_state = loaded_day
+    storage_backend = RecordingStorageBackend(root)
+    result = compact_day(storage_backend, 'inventory_data', DATE, load_state, max_rows_per_file=30)
+
+    assert result.status == 'compacted' and result.rows == 72
+    daily_names = compacted_blob_names('inventory_data', DATE, 3)
+    assert storage_backend.operations == ([('write', name) for name in daily_names] + [('write', MANIFEST_NAME)]
+                                          + [('delete', name) for name in hourly_names()])
+    assert json.loads(storage_backend.read_bytes(MANIFEST_NAME))['files'] == daily_names
+    day = pq.read_table(str(root / 'daily' / 'inventory_data' / f'date={DATE}')).to_pydict()
+    assert day['product_id'] == sorted(day['product_id'])
+    assert list(storage_backend.list_prefix('inventory_data/')) == []
+    assert len(PartitionManifest(storage_backend).load().partitions['inventory_data']) == 24
+
+
+def test_failed_manifest_write_keeps_the_hourly_objects(loaded_day):
+    root, load_state = loaded_day
+    storage_backend = RecordingStorageBackend(root, fail_on=('write', MANIFEST_NAME))
+    with pytest.raises(OSError):
+        compact_day(storage_backend, 'inventory_data', DATE, load_state)
+    assert not any(operation == 'delete' for operation, _ in storage_backend.operations)
+    assert list(storage_backend.list_prefix('inventory_data/')) == hourly_names()
+
+    # The next run starts over and commits
+    assert compact_day(LocalDirStorageBackend(root), 'inventory_data', DATE, load_state).status == 'compacted'
+
+
+def test_interrupted_cleanup_is_finished_by_the_next_run(loaded_day):
+    root, load_state = loaded_day
+    with pytest.raises(OSError):
+        compact_day(RecordingStorageBackend(root, fail_on=('delete', hourly_names()[2])), 'inventory_data', DATE, load_state)
+    storage_backend = LocalDirStorageBackend(root)
+    assert len(list(storage_backend.list_prefix('inventory_data/'))) == 22
+    # Committed: readers already count the whole day from the manifest
+    assert len(PartitionManifest(storage_backend).load().partitions['inventory_data']) == 24
+
+    result = compact_day(storage_backend, 'inventory_data', DATE, load_state)
+    assert result.status == 'already_compacted' and result.rows == 72
+    assert list(storage_backend.list_prefix('inventory_data/')) == []
+
+
+def test_day_with_an_unloaded_hour_is_left_alone(loaded_day):
+    root, load_state = loaded_day
+    storage_backend = RecordingStorageBackend(root)
+    storage_backend.write_bytes(hourly_names()[5], OUTPUT_FORMATS['csv'].encode([MANAGED_COLUMNS['inventory_data']]))
+    storage_backend.operations.clear()
+    assert compact_day(storage_backend, 'inventory_data', DATE, load_state).status == 'not_loaded'
+    assert storage_backend.operations == []
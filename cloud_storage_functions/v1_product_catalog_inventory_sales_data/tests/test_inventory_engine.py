@@ -0,0 +1,67 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from utils.batch_generators import generate_sales_columns
+from utils.catalog_cache import CatalogCache
+from utils.csv_stream import tally_units_sold
+from utils.inventory_engine import InventoryState
+from utils.supporting_functions import (generate_random_pre_sales_inventory, generate_sales_data, generate_static_products,
+                                        update_inventory)
+
+DATE, HOUR = '2025-06-30', '12'
+
+
+@pytest.fixture(scope='module')
+def product_catalog():
+    return CatalogCache().catalog_for(50, generate_static_products(), DATE, HOUR)
+
+
+def state_from(pre_sales_inventory):
+    details = list(pre_sales_inventory.values())
+    return InventoryState(DATE, HOUR, list(pre_sales_inventory), [detail['in_stock'] for detail in details],
+                          [detail['new_product'] for detail in details], [detail['returned_product'] for detail in details])
+
+
+def expected_and_state(product_catalog, seed):
+    # update_inventory's rows for one hour, and an InventoryState opening from the same stock
+    rng = random.Random(seed)
+    # Only part of the catalog is stocked, so some sales are of products missing from the inventory
+    pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog[:41], DATE, HOUR, rng)
+    sales = generate_sales_data(product_catalog, DATE, HOUR, 500, rng)
+    state = state_from(pre_sales_inventory)
+    return sales, update_inventory(sales, copy.deepcopy(pre_sales_inventory)), state
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_sales_rows_match_update_inventory(product_catalog, seed):
+    sales, expected, state = expected_and_state(product_catalog, seed)
+    state.apply_sales_rows(sales)
+    assert state.to_rows() == expected
+
+
+def test_sales_totals_match_update_inventory(product_catalog):
+    sales, expected, state = expected_and_state(product_catalog, 3)
+    aggregated_units_sold = {}
+    list(tally_units_sold(iter(sales), aggregated_units_sold))
+    state.apply_sales_totals(aggregated_units_sold)
+    assert state.to_rows() == expected
+
+
+def test_sales_columns_match_update_inventory(product_catalog):
+    columns = generate_sales_columns(product_catalog, 500, np.random.default_rng(4))
+    product_ids = np.array([row[2] for row in product_catalog[1:]])[columns['product_index']]
+    sales = [('header',)] + [(None,) * 5 + (product_id, None, int(units_sold))
+                             for product_id, units_sold in zip(product_ids.tolist(), columns['units_sold'].tolist())]
+    pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, DATE, HOUR, random.Random(4))
+    state = state_from(pre_sales_inventory)
+    state.apply_sales_columns(columns)
+    assert state.to_rows() == update_inventory(sales, copy.deepcopy(pre_sales_inventory))
+
+
+def test_no_sales_keeps_the_opening_stock(product_catalog):
+    pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, DATE, HOUR, random.Random(5))
+    state = state_from(pre_sales_inventory)
+    assert state.to_rows() == update_inventory([('header',)], copy.deepcopy(pre_sales_inventory))
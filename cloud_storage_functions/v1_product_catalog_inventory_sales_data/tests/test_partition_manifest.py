@@ -0,0 +1,42 @@
+from utils.partition_manifest import PartitionManifest, compaction_manifest_name, partition_blob_names, shard_blob_names
+from utils.storage_backends import LocalDirStorageBackend
+
+
+def write_sales(storage_backend, date, hour, shards, num_shards):
+    blob_names = shard_blob_names(partition_blob_names(date, hour)['sales_data'], '.csv', num_shards)
+    for shard in shards:
+        storage_backend.write_bytes(blob_names[shard], b'header\nrow\n')
+
+
+def test_sharded_partition_counts_once_shard_0_exists(tmp_path):
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    write_sales(storage_backend, '2025-06-30', '00', [1, 2, 3], 4)
+    assert not PartitionManifest(storage_backend).load().exists('sales_data', '2025-06-30', '00')
+
+    write_sales(storage_backend, '2025-06-30', '00', [0], 4)
+    assert PartitionManifest(storage_backend).load().exists('sales_data', '2025-06-30', '00')
+
+
+def test_shard_0_alone_and_unsharded_partitions_count(tmp_path):
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    write_sales(storage_backend, '2025-06-30', '01', [0], 4)
+    write_sales(storage_backend, '2025-06-30', '02', [0], 1)
+    partition_manifest = PartitionManifest(storage_backend).load()
+    assert partition_manifest.partitions['sales_data'] == {('2025-06-30', '01'), ('2025-06-30', '02')}
+    assert partition_manifest.missing('sales_data', [('2025-06-30', '01'), ('2025-06-30', '03')]) == [('2025-06-30', '03')]
+
+
+def test_compacted_day_counts_every_hour(tmp_path):
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    storage_backend.write_bytes(compaction_manifest_name('sales_data', '2025-06-30'), b'{}')
+    partition_manifest = PartitionManifest(storage_backend).load()
+    assert len(partition_manifest.partitions['sales_data']) == 24
+    assert not partition_manifest.exists('inventory_data', '2025-06-30', '00')
+
+
+def test_start_date_skips_older_partitions(tmp_path):
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    write_sales(storage_backend, '2025-06-29', '23', [0], 1)
+    write_sales(storage_backend, '2025-06-30', '00', [0], 1)
+    partition_manifest = PartitionManifest(storage_backend).load('2025-06-30')
+    assert partition_manifest.partitions['sales_data'] == {('2025-06-30', '00')}
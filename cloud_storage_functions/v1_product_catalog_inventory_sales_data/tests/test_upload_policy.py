@@ -0,0 +1,68 @@
+import pytest
+
+from utils.storage_backends import LocalDirStorageBackend, PreconditionFailed
+from utils.upload_policy import RetryPolicy, UploadPolicy
+
+NO_BACKOFF = RetryPolicy(max_attempts=3, initial_backoff=0.0, max_backoff=0.0, multiplier=2.0, jitter='none')
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+def upload_policy(create_only):
+    return UploadPolicy(NO_BACKOFF, create_only=create_only, sleep=lambda seconds: None)
+
+
+def test_create_only_412_counts_as_existing(tmp_path):
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    storage_backend.write_bytes('sales_data/a.csv', b'first')
+    policy = upload_policy(create_only=True)
+    attempts, existed = policy.call(lambda if_generation_match: storage_backend.write_bytes(
+        'sales_data/a.csv', b'second', if_generation_match=if_generation_match))
+    assert (attempts, existed) == (1, True)
+    assert storage_backend.read_bytes('sales_data/a.csv') == b'first'
+    assert policy.stats['already_exists'] == 1 and policy.stats['failed'] == 0
+
+
+def test_retry_after_lost_response_does_not_overwrite(tmp_path):
+    # The first attempt lands but its response is lost; the retry's 412 means the write already succeeded
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    payloads = iter([b'first', b'second'])
+
+    def write(if_generation_match):
+        storage_backend.write_bytes('sales_data/a.csv', next(payloads), if_generation_match=if_generation_match)
+        raise Unavailable('response lost')
+
+    policy = upload_policy(create_only=True)
+    assert policy.call(write) == (2, True)
+    assert storage_backend.read_bytes('sales_data/a.csv') == b'first'
+    assert policy.stats['retries'] == 1 and policy.stats['already_exists'] == 1
+
+
+def test_412_without_create_only_is_an_error():
+    def write(if_generation_match):
+        assert if_generation_match is None
+        raise PreconditionFailed('generation mismatch')
+
+    policy = upload_policy(create_only=False)
+    with pytest.raises(PreconditionFailed):
+        policy.call(write)
+    assert policy.stats['attempts'] == 1 and policy.stats['failed'] == 1 and policy.stats['already_exists'] == 0
+
+
+def test_create_only_per_call_override(tmp_path):
+    storage_backend = LocalDirStorageBackend(tmp_path)
+    storage_backend.write_bytes('sales_rollup/a.csv', b'first')
+    preconditions = []
+
+    def write(if_generation_match):
+        preconditions.append(if_generation_match)
+        storage_backend.write_bytes('sales_rollup/a.csv', b'second', if_generation_match=if_generation_match)
+
+    policy = upload_policy(create_only=True)
+    assert policy.call(write, create_only=False) == (1, False)
+    assert preconditions == [None]
+    assert storage_backend.read_bytes('sales_rollup/a.csv') == b'second'
+    policy.call(write)
+    assert preconditions == [None, 0]
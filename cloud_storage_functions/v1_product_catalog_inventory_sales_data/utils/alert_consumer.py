@@ -0,0 +1,191 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+ALERT_FIELDS = ('inventory_date', 'inventory_hour', 'product_id', 'in_stock', 'new_product', 'returned_product',
+                'units_sold', 'final_stock')
+
+
+def alert_key(alert:dict):
+    # A partition rewrite re-publishes the same alert; this triple identifies it
+    return alert['inventory_date'], alert['inventory_hour'], alert['product_id']
+
+
+class WindowedDeduplicator:
+    """Remembers alert keys for `window_seconds` after they were first accepted.
+
+    Keys are kept in arrival order, so expiring old ones only looks at the
+    front of the dict and memory stays bounded by the alerts of one window.
+    """
+
+    def __init__(self, window_seconds, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._first_seen = OrderedDict()
+
+    def accept(self, key):
+        # True the first time a key is seen within the window
+        now = self.clock()
+        while self._first_seen:
+            oldest_key, seen_at = next(iter(self._first_seen.items()))
+            if now - seen_at < self.window_seconds:
+                break
+            del self._first_seen[oldest_key]
+        if key in self._first_seen:
+            return False
+        self._first_seen[key] = now
+        return True
+
+    def forget(self, key):
+        # Lets a redelivery of an alert that could not be written through again
+        self._first_seen.pop(key, None)
+
+    def __len__(self):
+        return len(self._first_seen)
+
+
+class SqliteAlertSink:
+    """Alerts upserted into a SQLite table keyed on (inventory_date, inventory_hour, product_id).
+
+    Each micro-batch is one transaction, so redelivered alerts overwrite
+    their earlier row instead of duplicating it.
+    """
+
+    def __init__(self, path, table='negative_stock_alerts'):
+        self.table = table
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+            inventory_date TEXT, inventory_hour TEXT, product_id TEXT, in_stock INTEGER, new_product INTEGER,
+            returned_product INTEGER, units_sold INTEGER, final_stock INTEGER, received_at REAL,
+            PRIMARY KEY (inventory_date, inventory_hour, product_id))""")
+        self.connection.commit()
+
+    def write(self, alerts:list, received_at:float):
+        with self.connection:
+            self.connection.executemany(f'INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        [tuple(alert[field] for field in ALERT_FIELDS) + (received_at,) for alert in alerts])
+
+    def count(self):
+        return self.connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+class JsonLinesAlertSink:
+    # Appends one JSON line per alert; each micro-batch is a single write and flush
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, alerts:list, received_at:float):
+        self.file.write(''.join(json.dumps({**alert, 'received_at': received_at}) + '\n' for alert in alerts))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class AlertConsumer:
+    """Consumes inventory-updates-streaming messages into an alert sink.
+
+    `handle` is the subscriber callback and may be called from several
+    threads. Messages are parsed, duplicates of an alert accepted within
+    `dedup_window` seconds are acked and dropped, and the rest are buffered
+    until `max_batch` alerts are waiting or `max_latency` seconds have passed
+    since the first one. The batch is then written to the sink in one call
+    and its messages acked; if the write fails they are nacked for
+    redelivery. Latency is measured from each message's publish time to the
+    sink write. Nothing here depends on the Pub/Sub client: any message with
+    data, publish_time, ack() and nack() will do.
+    """
+
+    def __init__(self, sink, max_batch=500, max_latency=0.5, dedup_window=6 * 3600, clock=time.monotonic):
+        self.sink = sink
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.deduplicator = WindowedDeduplicator(dedup_window, clock)
+        self.stats = {'received': 0, 'duplicates': 0, 'malformed': 0, 'written': 0, 'batches': 0, 'failed': 0}
+        self.latencies = deque(maxlen=100_000)  # most recent alerts only, for the percentiles in summary()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._batch = []
+        self._timer = None
+
+    def handle(self, message):
+        try:
+            alert = json.loads(message.data)
+            key = alert_key(alert)
+        except (ValueError, KeyError, TypeError):
+            with self._lock:
+                self.stats['received'] += 1
+                self.stats['malformed'] += 1
+            message.ack()  # Redelivering it would not make it parse
+            return
+        with self._lock:
+            self.stats['received'] += 1
+            if not self.deduplicator.accept(key):
+                self.stats['duplicates'] += 1
+                message.ack()
+                return
+            self._batch.append((alert, message))
+            if len(self._batch) >= self.max_batch:
+                batch = self._take_batch_locked()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_latency, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._write(batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._take_batch_locked()
+        if batch:
+            self._write(batch)
+
+    def _take_batch_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        return batch
+
+    def _write(self, batch):
+        # One writer at a time keeps SQLite transactions and file appends ordered
+        with self._write_lock:
+            received_at = time.time()
+            try:
+                self.sink.write([alert for alert, _ in batch], received_at)
+                written_at = time.time()
+            except Exception:
+                with self._lock:
+                    self.stats['failed'] += len(batch)
+                    for alert, _ in batch:
+                        self.deduplicator.forget(alert_key(alert))
+                for _, message in batch:
+                    message.nack()
+                return
+        for _, message in batch:
+            message.ack()
+        with self._lock:
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            self.latencies.extend(written_at - message.publish_time.timestamp() for _, message in batch)
+
+    def close(self):
+        # Writes whatever is still buffered; the sink is left open for the caller to close
+        self.flush()
+
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            summary = dict(self.stats, dedup_keys=len(self.deduplicator))
+        if latencies:
+            summary.update({f'latency_p{q}': round(latencies[min(len(latencies) - 1, int(len(latencies) * q / 100))], 4)
+                            for q in (50, 95, 99)})
+        return summary
@@ -0,0 +1,54 @@
+import json
+from collections import namedtuple
+
+AlertFailure = namedtuple('AlertFailure', ['message', 'error'])
+
+
+def inventory_alert_message(event):
+    return {'inventory_date': event[0],
+            'inventory_hour': event[1],
+            'product_id': event[2],
+            'in_stock': event[3],
+            'new_product' : event[4],
+            'returned_product': event[5],
+            'units_sold': event[6],
+            'final_stock': event[7]}
+
+
+class AlertPublisher:
+    """Publishes negative-stock alerts without waiting on each message.
+
+    Messages are handed to the publisher client, which batches them according
+    to its BatchSettings (max messages, bytes and latency); the futures are
+    kept and resolved together in `wait`, which records every failed message.
+    """
+
+    def __init__(self, publisher_object, topic_path):
+        self.publisher_object = publisher_object
+        self.topic_path = topic_path
+        self.published = 0
+        self.failures = []
+        self._pending = []
+
+    def publish_negative_stock(self, inventory_updates:list):
+        queued = 0
+        for event in inventory_updates[1:]:  # skip headers
+            if event[7] < 0:
+                message = inventory_alert_message(event)
+                future = self.publisher_object.publish(self.topic_path, json.dumps(message).encode("utf-8"))
+                self._pending.append((message, future))
+                queued += 1
+        return queued
+
+    def wait(self, timeout=None):
+        # Blocks until every queued alert is acknowledged or failed; returns the number acknowledged
+        pending, self._pending = self._pending, []
+        acknowledged = 0
+        for message, future in pending:
+            try:
+                future.result(timeout=timeout)
+                acknowledged += 1
+            except Exception as e:
+                self.failures.append(AlertFailure(message, repr(e)))
+        self.published += acknowledged
+        return acknowledged
@@ -0,0 +1,144 @@
+import time
+
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.supporting_functions import generate_static_products, generate_sales_data
+from utils.seeding import partition_random, partition_rng, num_products_for
+from utils.inventory_engine import InventoryState
+from utils.catalog_cache import CatalogCache
+from utils.partition_manifest import PartitionManifest, DATASET_PREFIXES, partition_blob_names
+from utils.output_formats import parse_dataset_formats
+from utils.upload_executor import UploadExecutor
+from utils.upload_policy import UploadPolicy, RetryBudget, AdaptiveConcurrencyLimiter
+from utils.sales_rollup import SalesRollup, ROLLUP_PREFIX, rollup_blob_name
+from utils.inventory_checkpoint import InventoryCarryOver, InventoryCheckpointStore
+
+# One cache per worker process; the product body is identical for every partition of a backfill
+catalog_cache = CatalogCache()
+
+
+def build_hour_grid(start_date, end_date):
+    # Every (date, hour) between start_date 00 and end_date 23, both inclusive
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(hours=23)
+    date_hours = []
+    while start <= end:
+        date_hours.append((start.strftime('%Y-%m-%d'), start.strftime('%H')))
+        start += timedelta(hours=1)
+    return date_hours
+
+
+def build_work_units(date_hours, unit_size=6):
+    return [date_hours[i:i + unit_size] for i in range(0, len(date_hours), unit_size)]
+
+
+def generate_partition(date, hour, num_products, seed, dataset_formats, carry_inventory=False):
+    """Generate and encode the three datasets of one date/hour, plus the sales rollup.
+
+    Sales and inventory draw from their own (seed, dataset, date, hour)
+    streams, so the output does not depend on which process runs the
+    partition or in what order. With carry_inventory the inventory is
+    returned unencoded, as the InventoryState with the hour's sales applied:
+    its opening stock depends on the previous hour, so it is finished in
+    hour order by upload_backfill_results.
+    """
+    product_catalog = catalog_cache.catalog_for(num_products, generate_static_products(), date, hour)
+    pre_sales_inventory = InventoryState.random_pre_sales(product_catalog, date, hour, partition_rng(seed, 'inventory_data', date, hour))
+    product_sales = generate_sales_data(product_catalog, date, hour, rng=partition_random(seed, 'sales_data', date, hour))
+    pre_sales_inventory.apply_sales_rows(product_sales)
+    sales_rollup = SalesRollup(product_catalog)
+    sales_rollup.add_rows(product_sales)
+
+    datasets = {'product_catalog': product_catalog, 'sales_data': product_sales, ROLLUP_PREFIX: sales_rollup.to_rows(date, hour)}
+    payloads = {dataset: dataset_formats[dataset].encode(rows) for dataset, rows in datasets.items()}
+    payloads['inventory_data'] = pre_sales_inventory if carry_inventory else dataset_formats['inventory_data'].encode(pre_sales_inventory.to_rows())
+    return payloads
+
+
+def run_work_unit(work_unit, num_products, seed, dataset_formats, carry_inventory=False):
+    return [((date, hour), generate_partition(date, hour, num_products, seed, dataset_formats, carry_inventory))
+            for date, hour in work_unit]
+
+
+def run_backfill(storage_backend, start_date, end_date, seed=0, num_products=None,
+                 workers=None, unit_size=6, upload_workers=8, overwrite=False, output_formats=None, carry_inventory=False):
+    """Regenerate every missing partition between start_date and end_date.
+
+    Work units of `unit_size` hours are fanned out to a ProcessPoolExecutor
+    (workers=0 runs them serially in this process) and their CSV payloads are
+    uploaded through an UploadExecutor as they come back. With
+    carry_inventory each inventory hour opens with the previous hour's final
+    stock (utils/inventory_checkpoint.py) and is checkpointed in turn; hours
+    already in storage are skipped, so a rerun resumes from the last
+    checkpoint before the first missing hour.
+    """
+    if num_products is None:
+        num_products = num_products_for(seed)
+    dataset_formats = parse_dataset_formats(output_formats, DATASET_PREFIXES + (ROLLUP_PREFIX,))
+
+    date_hours = build_hour_grid(start_date, end_date)
+    partition_manifest = PartitionManifest(storage_backend).load(start_date)
+    if not overwrite:
+        date_hours = [(date, hour) for date, hour in date_hours
+                      if not all(partition_manifest.exists(prefix, date, hour) for prefix in DATASET_PREFIXES)]
+    work_units = build_work_units(date_hours, unit_size)
+
+    inventory_carry_over = InventoryCarryOver(InventoryCheckpointStore(storage_backend)) if carry_inventory else None
+
+    start = time.perf_counter()
+    # Without overwrite only missing objects are written, so they are created with if_generation_match=0
+    upload_policy = UploadPolicy(retry_budget=RetryBudget(), create_only=not overwrite,
+                                 limiter=AdaptiveConcurrencyLimiter(initial_limit=min(4, upload_workers), max_limit=upload_workers))
+    with UploadExecutor(storage_backend, max_workers=upload_workers, policy=upload_policy) as upload_executor:
+        if workers == 0:
+            unit_results = (run_work_unit(unit, num_products, seed, dataset_formats, carry_inventory) for unit in work_units)
+            upload_backfill_results(unit_results, partition_manifest, upload_executor, overwrite, dataset_formats, inventory_carry_over)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as process_pool:
+                # map returns the units in submission order, which keeps the inventory chain in hour order
+                unit_results = process_pool.map(run_work_unit, work_units, [num_products] * len(work_units),
+                                                [seed] * len(work_units), [dataset_formats] * len(work_units),
+                                                [carry_inventory] * len(work_units))
+                upload_backfill_results(unit_results, partition_manifest, upload_executor, overwrite, dataset_formats,
+                                        inventory_carry_over)
+        if inventory_carry_over is not None:
+            inventory_carry_over.submit_checkpoints(upload_executor, wait=True)
+        upload_results = upload_executor.wait()
+    elapsed = time.perf_counter() - start
+
+    summary = {'partitions': len(date_hours),
+               'work_units': len(work_units),
+               'uploaded': sum(result.success for result in upload_results),
+               'failed_uploads': [result.blob_name for result in upload_results if not result.success],
+               'seconds': round(elapsed, 3),
+               'partitions_per_second': round(len(date_hours) / elapsed, 2) if elapsed else 0.0,
+               'upload_policy': upload_policy.summary()}
+    if inventory_carry_over is not None:
+        summary['inventory'] = inventory_carry_over.stats
+    return summary
+
+
+def upload_backfill_results(unit_results, partition_manifest, upload_executor, overwrite, dataset_formats,
+                            inventory_carry_over=None):
+    extensions = {dataset: output_format.extension for dataset, output_format in dataset_formats.items()}
+    for partitions in unit_results:
+        for (date, hour), payloads in partitions:
+            # Only datasets missing from storage are written unless overwriting
+            for prefix, blob_name in partition_blob_names(date, hour, extensions).items():
+                if overwrite or not partition_manifest.exists(prefix, date, hour):
+                    payload = payloads[prefix]
+                    state = None
+                    if prefix == 'inventory_data' and inventory_carry_over is not None:
+                        state = payload
+                        inventory_carry_over.open(state)
+                        payload = dataset_formats[prefix].encode(state.to_rows())
+                    upload_future = upload_executor.submit(blob_name, payload, dataset_formats[prefix])
+                    if state is not None:
+                        # Checkpointed once the inventory file has landed
+                        inventory_carry_over.close(state, upload_future)
+                        inventory_carry_over.submit_checkpoints(upload_executor)
+                    if prefix == 'sales_data':
+                        # The rollup follows the sales partition it summarizes
+                        upload_executor.submit(rollup_blob_name(date, hour, extensions[ROLLUP_PREFIX]),
+                                               payloads[ROLLUP_PREFIX], dataset_formats[ROLLUP_PREFIX], create_only=False)
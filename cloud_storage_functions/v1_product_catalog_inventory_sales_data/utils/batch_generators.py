@@ -0,0 +1,179 @@
+import numpy as np
+
+from utils.supporting_functions import CUSTOMER_ID_POOL, ORDER_COUNTRY_POOL
+
+SALES_HEADERS = ('transaction_date', 'transaction_hour', 'transaction_id', 'customer_id', 'order_country', 'product_id', 'unit_price', 'units_sold', 'discount_applied', 'total_ammount_paid')
+
+# Value pools are formatted once and indexed by integer codes
+CUSTOMER_IDS = np.array(CUSTOMER_ID_POOL)
+ORDER_COUNTRIES = np.array(ORDER_COUNTRY_POOL)
+
+HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype='S1')
+UUID_DASH_POSITIONS = (8, 13, 18, 23)
+UUID_HEX_POSITIONS = np.array([i for i in range(36) if i not in UUID_DASH_POSITIONS])
+
+
+def uuid4_bytes(rng, count):
+    # Random version-4 UUIDs as 16 raw bytes each; formatted only when rows are serialized
+    raw = np.frombuffer(rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return raw
+
+
+def uuid4_chars(raw):
+    # (count, 36) ASCII characters of the canonical UUID form, without a per-row Python loop
+    nibbles = np.empty((len(raw), 32), dtype=np.uint8)
+    nibbles[:, 0::2] = raw >> 4
+    nibbles[:, 1::2] = raw & 0x0F
+
+    chars = np.full((len(raw), 36), b'-', dtype='S1')
+    chars[:, UUID_HEX_POSITIONS] = HEX_DIGITS[nibbles]
+    return chars
+
+
+def uuid4_strings(rng, count):
+    # Random version-4 UUIDs formatted as 36-character strings
+    return uuid4_chars(uuid4_bytes(rng, count)).view('S36').ravel().astype('U36')
+
+
+def catalog_arrays(product_catalog:list):
+    # Product ids and unit prices; kept with a CatalogView's cache entry (CatalogView.derived) so batches skip rebuilding them
+    derived = getattr(product_catalog, 'derived', None)
+    if derived is not None and 'catalog_arrays' in derived:
+        return derived['catalog_arrays']
+    catalog_rows = product_catalog[1:]
+    arrays = (np.array([row[2] for row in catalog_rows]), np.array([row[8] for row in catalog_rows], dtype=np.float64))
+    if derived is not None:
+        derived['catalog_arrays'] = arrays
+    return arrays
+
+
+def generate_sales_columns(product_catalog:list, num_sales=None, rng=None):
+    """Generate one hour of sales as NumPy columns.
+
+    Same distributions as generate_sales_data (150-1000 sales, 1-2000 units,
+    5-20% discount above 500 units) drawn in bulk. Products are drawn
+    uniformly from the catalog. Strings stay as integer codes into the value
+    pools (and raw UUID bytes) until the columns are turned into rows or an
+    Arrow table.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if num_sales is None:
+        num_sales = int(rng.integers(150, 1001))
+
+    product_ids, unit_prices = catalog_arrays(product_catalog)
+
+    product_index = rng.integers(0, len(product_ids), size=num_sales)
+    units_sold = rng.integers(1, 2001, size=num_sales)
+    discount_mask = units_sold > 500
+    discount_applied = np.where(discount_mask, rng.integers(5, 21, size=num_sales) / 100, 0.0)
+    unit_price = unit_prices[product_index]
+
+    return {'transaction_uuid': uuid4_bytes(rng, num_sales),
+            'customer_index': rng.integers(0, len(CUSTOMER_IDS), size=num_sales),
+            'country_index': rng.integers(0, len(ORDER_COUNTRIES), size=num_sales),
+            'product_index': product_index,
+            'product_ids': product_ids,
+            'unit_price': unit_price,
+            'units_sold': units_sold,
+            'discount_applied': discount_applied,
+            'total_ammount_paid': unit_price * (1 - discount_applied) * units_sold}
+
+
+def sales_columns_to_rows(columns:dict, sales_date, sales_hour):
+    # Yields the header followed by rows in the generate_sales_data schema
+    yield SALES_HEADERS
+    num_sales = len(columns['units_sold'])
+    yield from zip([sales_date] * num_sales,
+                   [sales_hour] * num_sales,
+                   uuid4_chars(columns['transaction_uuid']).view('S36').ravel().astype('U36').tolist(),
+                   CUSTOMER_IDS[columns['customer_index']].tolist(),
+                   ORDER_COUNTRIES[columns['country_index']].tolist(),
+                   columns['product_ids'][columns['product_index']].tolist(),
+                   columns['unit_price'].tolist(),
+                   columns['units_sold'].tolist(),
+                   columns['discount_applied'].tolist(),
+                   columns['total_ammount_paid'].tolist())
+
+
+def sales_columns_to_table(columns:dict, sales_date, sales_hour):
+    """Arrow table of the columns in the generate_sales_data schema.
+
+    Date, hour, customer, country and product are dictionary arrays over the
+    value pools, so each distinct string exists once per table and Parquet
+    writes them dictionary-encoded. Transaction ids are built straight into
+    an Arrow string buffer.
+    """
+    import pyarrow as pa
+
+    num_sales = len(columns['units_sold'])
+    constant = np.zeros(num_sales, dtype=np.int32)
+    transaction_ids = pa.StringArray.from_buffers(num_sales, pa.py_buffer(np.arange(0, 36 * (num_sales + 1), 36, dtype=np.int32)),
+                                                  pa.py_buffer(uuid4_chars(columns['transaction_uuid']).tobytes()))
+    arrays = [pa.DictionaryArray.from_arrays(constant, pa.array([sales_date])),
+              pa.DictionaryArray.from_arrays(constant, pa.array([sales_hour])),
+              transaction_ids,
+              pa.DictionaryArray.from_arrays(columns['customer_index'].astype(np.int32), pa.array(CUSTOMER_ID_POOL)),
+              pa.DictionaryArray.from_arrays(columns['country_index'].astype(np.int32), pa.array(ORDER_COUNTRY_POOL)),
+              pa.DictionaryArray.from_arrays(columns['product_index'].astype(np.int32), pa.array(columns['product_ids'])),
+              pa.array(columns['unit_price']),
+              pa.array(columns['units_sold'], type=pa.int64()),
+              pa.array(columns['discount_applied']),
+              pa.array(columns['total_ammount_paid'])]
+    return pa.table(arrays, names=list(SALES_HEADERS))
+
+
+def generate_sales_data_batch(product_catalog:list, sales_date, sales_hour, num_sales=None, rng=None):
+    # Drop-in replacement for generate_sales_data backed by generate_sales_columns
+    columns = generate_sales_columns(product_catalog, num_sales, rng)
+    return list(sales_columns_to_rows(columns, sales_date, sales_hour))
+
+
+class SalesBatches:
+    """Lazily generated sales of one partition, iterable once either as rows or as Arrow tables.
+
+    Iterating gives the header then row tuples, as iter_sales_data did;
+    tables() gives one dictionary-encoded table per batch for the Parquet
+    writer, so rows are never built. Either way at most batch_size rows of
+    columns exist at a time and units_sold_totals/rollup see every batch.
+    """
+
+    def __init__(self, product_catalog:list, sales_date, sales_hour, num_sales, rng, batch_size, units_sold_totals, rollup):
+        self.headers = SALES_HEADERS
+        self.sales_date = sales_date
+        self.sales_hour = sales_hour
+        self._columns = self._iter_columns(product_catalog, num_sales, rng, batch_size, units_sold_totals, rollup)
+
+    @staticmethod
+    def _iter_columns(product_catalog, num_sales, rng, batch_size, units_sold_totals, rollup):
+        for batch_start in range(0, num_sales, batch_size):
+            columns = generate_sales_columns(product_catalog, min(batch_size, num_sales - batch_start), rng)
+            if units_sold_totals is not None:
+                units_sold_totals += np.bincount(columns['product_index'], weights=columns['units_sold'],
+                                                 minlength=len(units_sold_totals)).astype(np.int64)
+            if rollup is not None:
+                rollup.add_columns(columns)
+            yield columns
+
+    def __iter__(self):
+        yield self.headers
+        for columns in self._columns:
+            rows = sales_columns_to_rows(columns, self.sales_date, self.sales_hour)
+            next(rows)  # headers already emitted
+            yield from rows
+
+    def tables(self):
+        for columns in self._columns:
+            yield sales_columns_to_table(columns, self.sales_date, self.sales_hour)
+
+
+def iter_sales_data_batch(product_catalog:list, sales_date, sales_hour, num_sales=None, rng=None, batch_size=100_000,
+                          units_sold_totals=None, rollup=None):
+    # Lazy columnar generation: at most batch_size rows of columns exist at any time.
+    # units_sold_totals (int64 array, one slot per catalog product) accumulates units sold per product as batches are made;
+    # rollup (utils.sales_rollup.SalesRollup) gets each batch's columns
+    rng = rng if rng is not None else np.random.default_rng()
+    if num_sales is None:
+        num_sales = int(rng.integers(150, 1001))
+    return SalesBatches(product_catalog, sales_date, sales_hour, num_sales, rng, batch_size, units_sold_totals, rollup)
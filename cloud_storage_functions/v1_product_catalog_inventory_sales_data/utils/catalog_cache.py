@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from utils.supporting_functions import create_static_product_catalog
+
+CATALOG_HEADERS = ['ingestion_date', 'ingestion_hour','product_id', 'product_name', 'category_id','category_name', 'brand', 'description', 'unit_price', 'supplier_name', 'tags']
+
+
+class CatalogView(Sequence):
+    """Per-hour product catalog backed by a shared, cached product body.
+
+    Behaves like the list returned by create_static_product_catalog (header
+    first, then one tuple per product) but only stamps the ingestion date and
+    hour onto a row when it is read. `derived` holds values computed from the
+    body (e.g. batch_generators.catalog_arrays), shared by every view of the
+    same CatalogCache entry.
+    """
+
+    def __init__(self, product_body:tuple, ingestion_date, ingestion_hour, derived=None):
+        self.product_body = product_body
+        self.ingestion_date = ingestion_date
+        self.ingestion_hour = ingestion_hour
+        self.derived = derived if derived is not None else {}
+
+    def __len__(self):
+        return len(self.product_body) + 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index == 0:
+            return CATALOG_HEADERS
+        return (self.ingestion_date, self.ingestion_hour) + self.product_body[index - 1]
+
+    def __iter__(self):
+        yield CATALOG_HEADERS
+        stamp = (self.ingestion_date, self.ingestion_hour)
+        for product in self.product_body:
+            yield stamp + product
+
+
+class CatalogCache:
+    """Builds the static product body once per (num_products, archetypes).
+
+    Kept at module level it survives across warm Cloud Function invocations.
+    The least recently used entry is evicted once `max_entries` parameter
+    sets have been seen.
+    """
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._bodies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(num_products, prod_archetypes):
+        return (num_products, tuple(tuple(sorted(archetype.items())) for archetype in prod_archetypes))
+
+    def entry(self, num_products, prod_archetypes):
+        # (product body, derived values); values derived from a body are evicted along with it
+        key = self.cache_key(num_products, prod_archetypes)
+        if key in self._bodies:
+            self.hits += 1
+            self._bodies.move_to_end(key)
+            return self._bodies[key]
+
+        self.misses += 1
+        # Build without ingestion columns; CatalogView stamps them per hour
+        product_body = tuple(row[2:] for row in create_static_product_catalog(num_products, prod_archetypes, None, None)[1:])
+        self._bodies[key] = (product_body, {})
+        if len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+        return self._bodies[key]
+
+    def product_body(self, num_products, prod_archetypes):
+        return self.entry(num_products, prod_archetypes)[0]
+
+    def catalog_for(self, num_products, prod_archetypes, ingestion_date, ingestion_hour):
+        product_body, derived = self.entry(num_products, prod_archetypes)
+        return CatalogView(product_body, ingestion_date, ingestion_hour, derived)
+
+    def __len__(self):
+        return len(self._bodies)
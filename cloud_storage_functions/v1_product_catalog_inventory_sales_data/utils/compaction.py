@@ -0,0 +1,155 @@
+import gzip
+import io
+import json
+import math
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from utils.output_formats import OUTPUT_FORMATS
+from utils.partition_manifest import (PARTITION_PATTERN, SHARD_PATTERN, COMPACTED_PREFIX, HOURS,
+                                      compaction_manifest_name, shard_blob_names)
+from utils.partition_planner import MANAGED_COLUMNS, PLANNED_DATASETS, PartitionLoadState, partition_versions
+
+# Rows per daily file; a day of the 'standard' volume profile fits in one
+MAX_ROWS_PER_FILE = 5_000_000
+
+CompactionResult = namedtuple('CompactionResult', ['dataset', 'date', 'status', 'objects_before', 'objects_after',
+                                                   'rows', 'bytes_before', 'bytes_after', 'seconds'])
+
+
+def compacted_blob_names(dataset, date, num_files):
+    return shard_blob_names(f'{COMPACTED_PREFIX}/{dataset}/date={date}/{dataset}_for_{date}.parquet', '.parquet', num_files)
+
+
+def hourly_objects(storage_backend, dataset, date):
+    # {hour: [object names]} of the day's complete hourly partitions (sharded hours count once shard 0 exists)
+    objects, complete = {}, set()
+    for name in storage_backend.list_prefix(f'{dataset}/date={date}/'):
+        match = PARTITION_PATTERN.search(name)
+        if not match:
+            continue
+        hour = match.group(2)
+        objects.setdefault(hour, []).append(name)
+        shard = SHARD_PATTERN.search(name)
+        if not shard or int(shard.group(1)) == 0:
+            complete.add(hour)
+    return {hour: sorted(names) for hour, names in objects.items() if hour in complete}
+
+
+def read_hourly_table(payload, name, schema, columns=None):
+    # Any output format, typed like the Parquet output; `columns` reads only those
+    if name.endswith('.parquet'):
+        return pq.read_table(io.BytesIO(payload), schema=schema, columns=columns)
+    if name.endswith('.gz'):
+        payload = gzip.decompress(payload)
+    return pa_csv.read_csv(io.BytesIO(payload), convert_options=pa_csv.ConvertOptions(column_types=schema,
+                                                                                      include_columns=columns))
+
+
+def stored_units_sold(storage_backend, date, hour):
+    """{product_id: units sold} of one sales hour already in storage.
+
+    Reads every shard of the hourly partition, or the hour's rows of the
+    compacted day once the hourly objects are gone. Lets an inventory hour
+    whose sales partition exists be rebuilt against the sales in storage.
+    """
+    columns = ['product_id', 'units_sold']
+    names = hourly_objects(storage_backend, 'sales_data', date).get(hour)
+    if names is not None:
+        schema = OUTPUT_FORMATS['parquet'].schema(MANAGED_COLUMNS['sales_data'])
+        table = pa.concat_tables([read_hourly_table(storage_backend.read_bytes(name), name, schema, columns) for name in names])
+    else:
+        manifest_name = compaction_manifest_name('sales_data', date)
+        if not storage_backend.exists(manifest_name):
+            raise FileNotFoundError(f'No sales partition for {date} hour {hour}')
+        table = pa.concat_tables([pq.read_table(io.BytesIO(storage_backend.read_bytes(name)), columns=columns,
+                                                filters=[('hour', '=', hour)])
+                                  for name in json.loads(storage_backend.read_bytes(manifest_name))['files']])
+    totals = table.group_by('product_id').aggregate([('units_sold', 'sum')])
+    return dict(zip(totals['product_id'].to_pylist(), totals['units_sold_sum'].to_pylist()))
+
+
+def loaded_hours(storage_backend, load_state:PartitionLoadState, dataset, date):
+    # Hours of the day whose current objects are the ones recorded as merged into the managed table
+    versions = partition_versions(storage_backend.list_versions(f'{dataset}/date={date}/'))
+    return {hour for (_, hour), version in versions.items() if load_state.version(dataset, date, hour) == version}
+
+
+def compact_day(storage_backend, dataset, date, load_state:PartitionLoadState, max_rows_per_file=MAX_ROWS_PER_FILE,
+                compression='zstd'):
+    """Roll the 24 hourly partitions of one dataset and day into daily Parquet files.
+
+    Rows keep their partition hour in an `hour` column and are sorted by
+    product_id (the managed tables' CLUSTER BY), then hour. The daily files
+    are written first, then the day's _manifest.json, whose single write is
+    the commit point: from then on readers use the daily files and the
+    generator counts the day as complete. Only then are the hourly objects
+    deleted; a run interrupted before that finishes the cleanup next time.
+    Days with a missing hour are left alone, and so are days with an hour
+    not recorded in `load_state` at its current version: the load planner
+    only lists hourly partitions, so a day compacted before its MERGE would
+    never be loaded.
+    """
+    start = time.perf_counter()
+    manifest_name = compaction_manifest_name(dataset, date)
+    objects = hourly_objects(storage_backend, dataset, date)
+    hourly_names = [name for hour in sorted(objects) for name in objects[hour]]
+
+    if storage_backend.exists(manifest_name):
+        manifest = json.loads(storage_backend.read_bytes(manifest_name))
+        replaced = set(manifest['replaced'])
+        for name in hourly_names:
+            if name in replaced:
+                storage_backend.delete(name)
+        return CompactionResult(dataset, date, 'already_compacted', len(hourly_names), len(manifest['files']),
+                                manifest['rows'], 0, 0, time.perf_counter() - start)
+    if len(objects) < len(HOURS):
+        return CompactionResult(dataset, date, 'incomplete', len(hourly_names), len(hourly_names), 0, 0, 0,
+                                time.perf_counter() - start)
+    if loaded_hours(storage_backend, load_state, dataset, date) != set(HOURS):
+        return CompactionResult(dataset, date, 'not_loaded', len(hourly_names), len(hourly_names), 0, 0, 0,
+                                time.perf_counter() - start)
+
+    schema = OUTPUT_FORMATS['parquet'].schema(MANAGED_COLUMNS[dataset])
+    tables, bytes_before = [], 0
+    for hour in HOURS:
+        for name in objects[hour]:
+            payload = storage_backend.read_bytes(name)
+            bytes_before += len(payload)
+            table = read_hourly_table(payload, name, schema)
+            tables.append(table.append_column('hour', pa.array([hour] * table.num_rows, pa.string())))
+    day = pa.concat_tables(tables).sort_by([('product_id', 'ascending'), ('hour', 'ascending')])
+
+    num_files = max(1, math.ceil(day.num_rows / max_rows_per_file))
+    daily_names = compacted_blob_names(dataset, date, num_files)
+    bytes_after = 0
+    for file_index, daily_name in enumerate(daily_names):
+        buffer = io.BytesIO()
+        pq.write_table(day.slice(file_index * max_rows_per_file, max_rows_per_file), buffer, compression=compression)
+        storage_backend.write_bytes(daily_name, buffer.getvalue(), content_type=OUTPUT_FORMATS['parquet'].content_type)
+        bytes_after += buffer.tell()
+
+    manifest = {'dataset': dataset, 'date': date, 'files': daily_names, 'rows': day.num_rows,
+                'sorted_by': ['product_id', 'hour'], 'replaced': hourly_names}
+    storage_backend.write_bytes(manifest_name, json.dumps(manifest, indent=1), content_type='application/json')
+    for name in hourly_names:
+        storage_backend.delete(name)
+    return CompactionResult(dataset, date, 'compacted', len(hourly_names), len(daily_names), day.num_rows,
+                            bytes_before, bytes_after, time.perf_counter() - start)
+
+
+def compact_days(storage_backend, start_date, end_date, load_state:PartitionLoadState, datasets=PLANNED_DATASETS,
+                 max_rows_per_file=MAX_ROWS_PER_FILE):
+    # Every dataset of every day from start_date to end_date, both inclusive
+    results = []
+    day = datetime.strptime(start_date, '%Y-%m-%d')
+    while day <= datetime.strptime(end_date, '%Y-%m-%d'):
+        for dataset in datasets:
+            results.append(compact_day(storage_backend, dataset, day.strftime('%Y-%m-%d'), load_state, max_rows_per_file))
+        day += timedelta(days=1)
+    return results
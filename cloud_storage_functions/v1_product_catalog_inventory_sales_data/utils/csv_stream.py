@@ -0,0 +1,72 @@
+from utils.output_formats import OUTPUT_FORMATS
+
+# GCS resumable uploads require chunk sizes that are multiples of 256 KiB
+CHUNK_SIZE_MULTIPLE = 256 * 1024
+DEFAULT_CHUNK_SIZE = 4 * CHUNK_SIZE_MULTIPLE
+
+
+class CountingWriter:
+    # Minimal binary file-like wrapper that counts the bytes passed to the blob writer
+
+    def __init__(self, binary_writer):
+        self.binary_writer = binary_writer
+        self.bytes_written = 0
+        self.closed = False
+
+    def write(self, data):
+        self.binary_writer.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.bytes_written
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def stream_rows_to_blob(storage_backend, destination_blob_name: str, rows, chunk_size=DEFAULT_CHUNK_SIZE,
+                        output_format=None, if_generation_match=None):
+    """Write an iterable of rows (header first) to a blob without materializing the file.
+
+    Rows are pulled lazily, encoded in batches by `output_format` (CSV by
+    default) and pushed through the backend's file-like writer, which on GCS sends them
+    as a resumable upload `chunk_size` bytes at a time. Peak memory is about
+    one chunk regardless of row count. Returns the number of bytes written.
+    """
+    if chunk_size % CHUNK_SIZE_MULTIPLE:
+        raise ValueError(f'chunk_size must be a multiple of {CHUNK_SIZE_MULTIPLE} bytes, got {chunk_size}')
+    output_format = output_format or OUTPUT_FORMATS['csv']
+
+    open_kwargs = {} if if_generation_match is None else {'if_generation_match': if_generation_match}
+    with storage_backend.open_write(destination_blob_name, output_format.content_type,
+                                    output_format.content_encoding, chunk_size, **open_kwargs) as blob_writer:
+        counting_writer = CountingWriter(blob_writer)
+        output_format.write_stream(rows, counting_writer)
+
+    return counting_writer.bytes_written
+
+
+ROLLUP_BATCH_ROWS = 50_000
+
+
+def tally_units_sold(sales_rows, aggregated_units_sold:dict, rollup=None):
+    # Passes sales rows through unchanged while summing units_sold per product,
+    # so a streamed sales partition can still feed InventoryState.apply_sales_totals.
+    # With a SalesRollup the rows are also added to it, in batches
+    sales_rows = iter(sales_rows)
+    yield next(sales_rows)  # headers
+    pending = []
+    for record in sales_rows:
+        aggregated_units_sold[record[5]] = aggregated_units_sold.get(record[5], 0) + record[7]
+        if rollup is not None:
+            pending.append(record)
+            if len(pending) == ROLLUP_BATCH_ROWS:
+                rollup.add_records(pending)
+                pending = []
+        yield record
+    if pending:
+        rollup.add_records(pending)
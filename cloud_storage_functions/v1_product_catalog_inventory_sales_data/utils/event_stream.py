@@ -0,0 +1,228 @@
+import json
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from datetime import datetime, timedelta
+
+from utils.alert_publisher import inventory_alert_message
+from utils.supporting_functions import generate_random_pre_sales_inventory, generate_sales_data, update_inventory
+from utils.seeding import partition_random
+
+SALES_EVENT_FIELDS = ('transaction_date', 'transaction_hour', 'transaction_id', 'customer_id', 'order_country', 'product_id',
+                      'unit_price', 'units_sold', 'discount_applied', 'total_ammount_paid')
+# Seconds of events published per scheduler tick; batches are this long at the current rate, capped by batch_size
+SCHEDULER_TICK = 0.01
+# Seconds of lateness (oversleeping, a slow publish call) the scheduler makes up for; longer stalls are dropped, not replayed as a burst
+CATCH_UP_SECONDS = 0.25
+
+
+class RateProfile(namedtuple('RateProfile', ['kind', 'rate', 'peak_rate', 'ramp_seconds', 'burst_every', 'burst_seconds'])):
+    """Target events per second over the run.
+
+    'constant' holds `rate`; 'ramp' goes linearly from `rate` to `peak_rate`
+    over `ramp_seconds` and stays there; 'burst' holds `rate` but jumps to
+    `peak_rate` for `burst_seconds` at the start of every `burst_every`
+    seconds.
+    """
+
+    def rate_at(self, elapsed):
+        if self.kind == 'ramp':
+            return self.rate + (self.peak_rate - self.rate) * min(1.0, elapsed / self.ramp_seconds) if self.ramp_seconds else self.peak_rate
+        if self.kind == 'burst':
+            return self.peak_rate if elapsed % self.burst_every < self.burst_seconds else self.rate
+        return self.rate
+
+
+RATE_PROFILE_KINDS = ('constant', 'ramp', 'burst')
+
+
+def rate_profile(kind='constant', rate=1000.0, peak_rate=None, ramp_seconds=60.0, burst_every=10.0, burst_seconds=1.0):
+    if kind not in RATE_PROFILE_KINDS:
+        raise ValueError(f"Unknown rate profile '{kind}', expected one of {list(RATE_PROFILE_KINDS)}")
+    if rate <= 0 or (peak_rate is not None and peak_rate <= 0):
+        raise ValueError('Event rates must be positive')
+    return RateProfile(kind, float(rate), float(peak_rate if peak_rate is not None else rate), ramp_seconds, burst_every, burst_seconds)
+
+
+class TokenBucket:
+    """Paces events at `rate` per second, allowing bursts of up to `capacity`.
+
+    Tokens accrue continuously; acquire(n) takes n of them, sleeping first
+    when there are not enough. Sleeping for the whole shortfall at once
+    instead of polling keeps the scheduler cheap at high rates, and the
+    bucket may go into debt by a fraction of a token, which the next call
+    pays back, so rounding does not accumulate into drift.
+    """
+
+    def __init__(self, rate, capacity=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = 0.0
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate, capacity=None):
+        self._refill()
+        self.rate = rate
+        if capacity is not None:
+            self.capacity = capacity
+
+    def acquire(self, tokens=1):
+        # Returns the seconds spent waiting
+        self._refill()
+        waited = 0.0
+        if self.tokens < tokens:
+            waited = (tokens - self.tokens) / self.rate
+            self.sleep(waited)
+            self._refill()
+        self.tokens -= tokens
+        return waited
+
+
+def iter_events(product_catalog:list, start_date, start_hour, seed=0, num_sales=None):
+    """Endless (event_type, message) stream, one simulated hour after another.
+
+    Each hour's sales come from generate_sales_data. Every sale is emitted
+    as a 'sale' event followed by an 'inventory' event with the product's
+    stock after it, counted down from the hour's pre-sales inventory. The
+    hour closes with update_inventory, whose negative final stock becomes
+    'alert' events in the negative-stock alert schema.
+    """
+    current = datetime.strptime(f'{start_date} {start_hour}', '%Y-%m-%d %H')
+    while True:
+        date, hour = current.strftime('%Y-%m-%d'), current.strftime('%H')
+        pre_sales_inventory = generate_random_pre_sales_inventory(product_catalog, date, hour,
+                                                                  partition_random(seed, 'inventory_data', date, hour))
+        sales = generate_sales_data(product_catalog, date, hour, num_sales, partition_random(seed, 'sales_data', date, hour))
+        stock = {product_id: detail['in_stock'] + detail['new_product'] + detail['returned_product']
+                 for product_id, detail in pre_sales_inventory.items()}
+        for sale in sales[1:]:
+            yield 'sale', dict(zip(SALES_EVENT_FIELDS, sale))
+            product_id = sale[5]
+            if product_id in stock:
+                stock[product_id] -= sale[7]
+                yield 'inventory', {'inventory_date': date, 'inventory_hour': hour, 'product_id': product_id,
+                                    'transaction_id': sale[2], 'units_sold': -sale[7], 'stock': stock[product_id]}
+        for row in update_inventory(sales, pre_sales_inventory)[1:]:
+            if row[7] < 0:
+                yield 'alert', inventory_alert_message(row)
+        current += timedelta(hours=1)
+
+
+class LoadGenerator:
+    """Publishes an event stream at a RateProfile's target rate for load tests.
+
+    A TokenBucket paces the stream in batches of about SCHEDULER_TICK
+    seconds of events (at most `batch_size`), making up for up to
+    CATCH_UP_SECONDS of lateness, and the publisher client batches the
+    messages themselves. Events go to `topics[event_type]`
+    (or `topics['default']`) with their type as a message attribute. At most
+    `max_outstanding` messages wait for a publish result; beyond that the
+    generator blocks, so a slow publisher shows up as drift from the target
+    rather than unbounded memory. Publish latency is measured from publish()
+    to the future's result. Works with PublisherClient or any object with
+    the same publish(topic, data, **attributes) -> future call.
+    """
+
+    def __init__(self, publisher_object, topics:dict, profile:RateProfile, batch_size=500, max_outstanding=10_000,
+                 report_interval=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.publisher_object = publisher_object
+        self.topics = topics
+        self.profile = profile
+        self.batch_size = batch_size
+        self.max_outstanding = max_outstanding
+        self.report_interval = report_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.counts = Counter()
+        self.failures = 0
+        self.latencies = deque(maxlen=200_000)  # most recent messages only, for the percentiles
+        self.intervals = []
+        self._outstanding = 0
+        self._max_outstanding_seen = 0
+        self._condition = threading.Condition()
+
+    def _done(self, sent_at, future):
+        latency = time.perf_counter() - sent_at
+        failed = future.exception() is not None
+        with self._condition:
+            self._outstanding -= 1
+            if failed:
+                self.failures += 1
+            else:
+                self.latencies.append(latency)
+            self._condition.notify_all()
+
+    def _publish(self, event_type, message):
+        with self._condition:
+            while self._outstanding >= self.max_outstanding:
+                self._condition.wait()
+            self._outstanding += 1
+            self._max_outstanding_seen = max(self._max_outstanding_seen, self._outstanding)
+        topic = self.topics.get(event_type, self.topics.get('default'))
+        sent_at = time.perf_counter()
+        future = self.publisher_object.publish(topic, json.dumps(message).encode('utf-8'), event_type=event_type)
+        future.add_done_callback(lambda done, sent_at=sent_at: self._done(sent_at, done))
+        self.counts[event_type] += 1
+
+    def run(self, events, duration=None, max_events=None, wait_timeout=30.0):
+        """Publish from `events` until `duration` seconds or `max_events` have passed, or Ctrl-C; returns summary()."""
+        start = self.clock()
+        bucket = TokenBucket(self.profile.rate_at(0), clock=self.clock, sleep=self.sleep)
+        published = 0
+        target = 0.0
+        last = interval_start = start
+        interval_published = 0
+        interval_target = 0.0
+        try:
+            while (duration is None or last - start < duration) and (max_events is None or published < max_events):
+                rate = self.profile.rate_at(last - start)
+                batch = max(1, min(self.batch_size, round(rate * SCHEDULER_TICK)))
+                if max_events is not None:
+                    batch = min(batch, max_events - published)
+                bucket.set_rate(rate, capacity=max(batch, rate * CATCH_UP_SECONDS))
+                bucket.acquire(batch)
+                for _ in range(batch):
+                    self._publish(*next(events))
+                    published += 1
+                interval_published += batch
+
+                now = self.clock()
+                target += rate * (now - last)  # the target integrates the profile, so ramps and bursts count exactly
+                interval_target += rate * (now - last)
+                last = now
+                if now - interval_start >= self.report_interval:
+                    self.intervals.append({'second': round(interval_start - start, 2),
+                                           'target_rate': round(interval_target / (now - interval_start), 1),
+                                           'achieved_rate': round(interval_published / (now - interval_start), 1)})
+                    interval_start, interval_published, interval_target = now, 0, 0.0
+        except KeyboardInterrupt:
+            pass
+        seconds = self.clock() - start
+        with self._condition:
+            self._condition.wait_for(lambda: self._outstanding == 0, timeout=wait_timeout)
+        return self.summary(published, target, seconds)
+
+    def summary(self, published, target, seconds):
+        with self._condition:
+            latencies = sorted(self.latencies)
+            summary = {'profile': self.profile.kind, 'events': published, 'by_type': dict(self.counts),
+                       'failed': self.failures, 'unresolved': self._outstanding, 'seconds': round(seconds, 3),
+                       'target_events': round(target), 'achieved_rate': round(published / seconds, 1) if seconds else 0.0,
+                       'target_rate': round(target / seconds, 1) if seconds else 0.0,
+                       'drift_pct': round(100 * (published - target) / target, 2) if target else 0.0,
+                       'max_outstanding': self._max_outstanding_seen}
+        if self.intervals:
+            summary['max_interval_drift_pct'] = round(max(abs(interval['achieved_rate'] - interval['target_rate']) / interval['target_rate']
+                                                          for interval in self.intervals if interval['target_rate']) * 100, 2)
+        if latencies:
+            summary.update({f'latency_p{q}_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * q / 100))] * 1000, 2)
+                            for q in (50, 95, 99)})
+        summary['intervals'] = self.intervals
+        return summary
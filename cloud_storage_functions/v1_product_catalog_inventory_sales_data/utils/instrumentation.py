@@ -0,0 +1,102 @@
+import contextlib
+import io
+import json
+import threading
+import time
+from collections import Counter
+
+
+class Span:
+    # Times one block and adds it to the owning RunMetrics; safe to use from upload threads
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.add_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class RunMetrics:
+    """Span timings and counters for one invocation, logged as a single JSON line.
+
+    `span(name)` accumulates call count and seconds per stage, `incr` bumps a
+    counter and `set` attaches plain fields. With enabled=False spans and
+    counters are no-ops; `emit` still writes the summary with its fields.
+    The line carries a `severity` so Cloud Logging parses it as a structured entry.
+    """
+
+    def __init__(self, function_name, enabled=True):
+        self.function_name = function_name
+        self.enabled = enabled
+        self.spans = {}
+        self.counters = Counter()
+        self.fields = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def span(self, name):
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            count, total = self.spans.get(name, (0, 0.0))
+            self.spans[name] = (count + 1, total + seconds)
+
+    def incr(self, name, value=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += value
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def summary(self, severity='INFO'):
+        return {'severity': severity,
+                'message': f'{self.function_name} summary',
+                'wall_seconds': round(time.perf_counter() - self._start, 4),
+                'spans': {name: {'count': count, 'seconds': round(total, 4)} for name, (count, total) in sorted(self.spans.items())},
+                'counters': dict(sorted(self.counters.items())),
+                **self.fields}
+
+    def emit(self, severity='INFO'):
+        print(json.dumps(self.summary(severity), default=str))
+
+
+@contextlib.contextmanager
+def profiled(metrics, enabled, top=25):
+    # cProfile around the block; the top functions by cumulative time go into the summary.
+    # Only the calling thread is profiled, upload and publisher threads are not.
+    if not enabled:
+        yield
+        return
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        stats_stream = io.StringIO()
+        pstats.Stats(profiler, stream=stats_stream).sort_stats('cumulative').print_stats(top)
+        metrics.set(profile=stats_stream.getvalue())
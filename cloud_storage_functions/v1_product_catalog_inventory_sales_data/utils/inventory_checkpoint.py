@@ -0,0 +1,136 @@
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+
+CHECKPOINT_PREFIX = 'inventory_checkpoints'
+CHECKPOINT_CONTENT_TYPE = 'application/octet-stream'
+
+
+def checkpoint_blob_name(date, hour, prefix=CHECKPOINT_PREFIX):
+    return f'{prefix}/date={date}/hour={hour}/final_stock.npy'
+
+
+def previous_hour(date, hour):
+    previous = datetime.strptime(f'{date} {hour}', '%Y-%m-%d %H') - timedelta(hours=1)
+    return previous.strftime('%Y-%m-%d'), previous.strftime('%H')
+
+
+def encode_checkpoint(snapshot):
+    buffer = io.BytesIO()
+    np.save(buffer, snapshot, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_checkpoint(payload):
+    return np.load(io.BytesIO(payload), allow_pickle=False)
+
+
+class CheckpointFormat:
+    # Lets UploadExecutor.submit write a snapshot as a checkpoint object
+    name = 'npy'
+    extension = '.npy'
+    content_type = CHECKPOINT_CONTENT_TYPE
+    content_encoding = None
+
+    def encode(self, snapshot):
+        return encode_checkpoint(snapshot)
+
+
+CHECKPOINT_FORMAT = CheckpointFormat()
+
+
+class InventoryCheckpointStore:
+    """Final stock of each inventory hour, kept as one .npy object per date/hour.
+
+    A checkpoint is a structured array of (product_id, final_stock), as made
+    by InventoryState.snapshot(), so it stays readable when the catalog
+    grows. Objects go through a storage backend: the bucket in production,
+    a LocalDirStorageBackend as the local stand-in, whose files are opened
+    memory-mapped instead of read.
+    """
+
+    def __init__(self, storage_backend, prefix=CHECKPOINT_PREFIX):
+        self.storage_backend = storage_backend
+        self.prefix = prefix
+
+    def save(self, date, hour, snapshot):
+        self.storage_backend.write_bytes(checkpoint_blob_name(date, hour, self.prefix), encode_checkpoint(snapshot),
+                                         content_type=CHECKPOINT_CONTENT_TYPE)
+
+    def load(self, date, hour):
+        # None when the hour has no checkpoint
+        name = checkpoint_blob_name(date, hour, self.prefix)
+        local_path = getattr(self.storage_backend, 'local_path', None)
+        if local_path is not None:
+            try:
+                return np.load(local_path(name), mmap_mode='r', allow_pickle=False)
+            except FileNotFoundError:
+                return None
+        if not self.storage_backend.exists(name):
+            return None
+        return decode_checkpoint(self.storage_backend.read_bytes(name))
+
+
+class InventoryCarryOver:
+    """Chains inventory hours: each hour opens with the previous hour's final stock.
+
+    The previous hour comes from memory when it was closed by this object,
+    otherwise from its checkpoint, so an hour costs one O(products) load and
+    save whatever the length of the history before it. An hour whose
+    predecessor has no checkpoint keeps its random opening stock and starts
+    a new chain. Hours must be opened in order for the in-memory shortcut to
+    apply; out of order they still read the right checkpoint. Given the
+    future of the hour's inventory upload, close() holds the checkpoint back
+    until submit_checkpoints() sees that upload succeed, so a checkpoint
+    never stands for an inventory hour missing from storage.
+    """
+
+    def __init__(self, checkpoint_store:InventoryCheckpointStore):
+        self.checkpoint_store = checkpoint_store
+        self.stats = {'carried': 0, 'random': 0, 'checkpoints_read': 0, 'checkpoints_written': 0, 'checkpoints_skipped': 0}
+        self._last_date_hour = None
+        self._last_snapshot = None
+        self._pending = []  # (inventory upload future, date, hour, snapshot)
+
+    def open(self, state):
+        # Replaces state.in_stock with the previous hour's final stock; False when there is none
+        date_hour = previous_hour(state.inventory_date, state.inventory_hour)
+        if date_hour == self._last_date_hour:
+            snapshot = self._last_snapshot
+        else:
+            snapshot = self.checkpoint_store.load(*date_hour)
+            self.stats['checkpoints_read'] += snapshot is not None
+        if snapshot is None:
+            self.stats['random'] += 1
+            return False
+        state.carry_over(snapshot)
+        self.stats['carried'] += 1
+        return True
+
+    def close(self, state, upload_future=None):
+        # Checkpoints the hour once its sales are applied; with upload_future the checkpoint waits for submit_checkpoints
+        snapshot = state.snapshot()
+        if upload_future is None:
+            self.checkpoint_store.save(state.inventory_date, state.inventory_hour, snapshot)
+            self.stats['checkpoints_written'] += 1
+        else:
+            self._pending.append((upload_future, state.inventory_date, state.inventory_hour, snapshot))
+        self._last_date_hour = (state.inventory_date, state.inventory_hour)
+        self._last_snapshot = snapshot
+
+    def submit_checkpoints(self, upload_executor, wait=False):
+        # Submits the held checkpoints whose inventory upload succeeded; wait=True first waits for every upload
+        pending = []
+        for upload_future, date, hour, snapshot in self._pending:
+            if not (wait or upload_future.done()):
+                pending.append((upload_future, date, hour, snapshot))
+            elif upload_future.result().success:
+                # Replaces the checkpoint of an earlier run, like the inventory hour it stands for
+                upload_executor.submit(checkpoint_blob_name(date, hour, self.checkpoint_store.prefix), snapshot,
+                                       CHECKPOINT_FORMAT, create_only=False)
+                self.stats['checkpoints_written'] += 1
+            else:
+                # The next run regenerates the hour and checkpoints it then
+                self.stats['checkpoints_skipped'] += 1
+        self._pending = pending
@@ -0,0 +1,104 @@
+import numpy as np
+
+INVENTORY_HEADERS = ('inventory_date', 'inventory_hour', 'product_id', 'in_stock', 'new_product', 'returned_product', 'units_sold', 'final_stock')
+
+
+class InventoryState:
+    """Inventory for one date/hour as parallel NumPy arrays indexed by catalog position.
+
+    Replaces the dict-of-dicts built by generate_random_pre_sales_inventory:
+    units sold are aggregated with one bincount per sales batch and final
+    stock is computed for every product at once. `units_sold` is stored
+    negative, as in update_inventory.
+    """
+
+    __slots__ = ('inventory_date', 'inventory_hour', 'product_ids', 'product_index',
+                 'in_stock', 'new_product', 'returned_product', 'units_sold')
+
+    def __init__(self, inventory_date, inventory_hour, product_ids, in_stock, new_product, returned_product):
+        self.inventory_date = inventory_date
+        self.inventory_hour = inventory_hour
+        self.product_ids = np.asarray(product_ids)
+        self.product_index = {product_id: i for i, product_id in enumerate(self.product_ids.tolist())}
+        self.in_stock = np.asarray(in_stock, dtype=np.int64)
+        self.new_product = np.asarray(new_product, dtype=np.int64)
+        self.returned_product = np.asarray(returned_product, dtype=np.int64)
+        self.units_sold = np.zeros(len(self.product_ids), dtype=np.int64)
+
+    @classmethod
+    def random_pre_sales(cls, product_catalog:list, inventory_date, inventory_hour, rng=None):
+        # Same ranges as generate_random_pre_sales_inventory, drawn for all products at once
+        rng = rng if rng is not None else np.random.default_rng()
+        num_products = len(product_catalog) - 1
+        return cls(inventory_date, inventory_hour,
+                   [row[2] for row in product_catalog[1:]],
+                   rng.integers(2000, 7001, size=num_products),
+                   rng.integers(2000, 7001, size=num_products),
+                   rng.integers(-2000, 1, size=num_products))
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def carry_over(self, snapshot):
+        # Opening stock from a previous hour's snapshot(); products it does not know keep their current in_stock
+        snapshot_ids = np.asarray(snapshot['product_id']).astype(self.product_ids.dtype)
+        if len(snapshot) == len(self) and np.array_equal(snapshot_ids, self.product_ids):
+            self.in_stock[:] = snapshot['final_stock']  # same catalog, the usual case
+            return
+        snapshot_index = {product_id: i for i, product_id in enumerate(snapshot_ids.tolist())}
+        positions = np.fromiter((snapshot_index.get(product_id, -1) for product_id in self.product_ids.tolist()),
+                                dtype=np.int64, count=len(self))
+        known = positions >= 0
+        self.in_stock[known] = np.asarray(snapshot['final_stock'])[positions[known]]
+
+    def snapshot(self):
+        # (product_id, final_stock) per product, the checkpoint the next hour opens from; ids are stored as ASCII bytes
+        product_ids = self.product_ids.astype(np.bytes_)
+        snapshot = np.empty(len(self), dtype=[('product_id', product_ids.dtype), ('final_stock', np.int64)])
+        snapshot['product_id'] = product_ids
+        snapshot['final_stock'] = self.final_stock
+        return snapshot
+
+    def apply_sales_index(self, product_index, units_sold):
+        # product_index holds catalog positions (as produced by generate_sales_columns); -1 marks unknown products
+        product_index = np.asarray(product_index)
+        known = product_index >= 0
+        sold = np.bincount(product_index[known], weights=np.asarray(units_sold)[known], minlength=len(self))
+        self.units_sold -= sold.astype(np.int64)
+
+    def apply_sales_columns(self, columns:dict):
+        self.apply_sales_index(columns['product_index'], columns['units_sold'])
+
+    def apply_sales_rows(self, sales_data:list):
+        # Rows in the generate_sales_data schema, header first; products missing from the inventory are ignored
+        num_sales = len(sales_data) - 1
+        product_index = np.fromiter((self.product_index.get(record[5], -1) for record in sales_data[1:]),
+                                    dtype=np.int64, count=num_sales)
+        units_sold = np.fromiter((record[7] for record in sales_data[1:]), dtype=np.int64, count=num_sales)
+        self.apply_sales_index(product_index, units_sold)
+
+    def apply_sales_totals(self, aggregated_units_sold:dict):
+        # {product_id: units sold}, e.g. from tally_units_sold
+        for product_id, units_sold in aggregated_units_sold.items():
+            if product_id in self.product_index:
+                self.units_sold[self.product_index[product_id]] -= units_sold
+
+    def apply_units_sold(self, units_sold_totals):
+        # Units sold per catalog position, e.g. accumulated by iter_sales_data_batch
+        self.units_sold -= np.asarray(units_sold_totals, dtype=np.int64)
+
+    @property
+    def final_stock(self):
+        return self.in_stock + self.new_product + self.returned_product + self.units_sold
+
+    def to_rows(self):
+        # Header plus one tuple per product, in the update_inventory output schema
+        num_products = len(self)
+        return [INVENTORY_HEADERS] + list(zip([self.inventory_date] * num_products,
+                                              [self.inventory_hour] * num_products,
+                                              self.product_ids.tolist(),
+                                              self.in_stock.tolist(),
+                                              self.new_product.tolist(),
+                                              self.returned_product.tolist(),
+                                              self.units_sold.tolist(),
+                                              self.final_stock.tolist()))
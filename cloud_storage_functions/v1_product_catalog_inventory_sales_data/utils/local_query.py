@@ -0,0 +1,158 @@
+import os
+import time
+from collections import namedtuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+
+from utils.output_formats import OUTPUT_FORMATS
+from utils.partition_manifest import COMPACTED_PREFIX, COMPACTION_MANIFEST
+from utils.partition_planner import MANAGED_COLUMNS
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string()), ('hour', pa.string())]), flavor='hive')
+# Compacted days (utils/compaction.py) are partitioned by date only and carry hour as a column
+DAILY_PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+QueryStats = namedtuple('QueryStats', ['dataset', 'files_scanned', 'files_pruned', 'rows_scanned', 'rows_pruned', 'seconds'])
+QueryResult = namedtuple('QueryResult', ['table', 'scans', 'seconds'])
+
+
+def partition_filter(start_date=None, end_date=None, hours=None):
+    # date=/hour= predicate; only partition columns, so it prunes whole files before anything is read
+    expression = None
+    for condition in (ds.field('date') >= start_date if start_date else None,
+                      ds.field('date') <= end_date if end_date else None,
+                      ds.field('hour').isin(list(hours)) if hours else None):
+        if condition is not None:
+            expression = condition if expression is None else expression & condition
+    return expression
+
+
+class LocalLake:
+    """Reads the date=/hour= layout written by the generators from a local directory with pyarrow.dataset.
+
+    Each dataset is opened per file format found under its prefix (.csv,
+    .csv.gz, .parquet), with the same column types as the Parquet output and
+    date/hour as Hive partition columns. Days that were compacted are read
+    from their daily files instead of the hourly ones. Scans filter on
+    date/hour before reading, so partitions outside the predicate are never
+    opened; in a daily file only the date prunes, the hour is a row filter. With
+    count_pruned the rows of pruned files are counted too, which for CSV
+    means reading them; that count is not part of the scan time.
+    """
+
+    def __init__(self, root, count_pruned=False):
+        self.root = os.path.abspath(root)
+        self.count_pruned = count_pruned
+        self._datasets = {}
+
+    def schema(self, name):
+        # Parquet output types for the dataset's columns, then the date/hour partition columns
+        return pa.unify_schemas([OUTPUT_FORMATS['parquet'].schema(MANAGED_COLUMNS[name]), PARTITIONING.schema])
+
+    def datasets(self, name):
+        if name not in self._datasets:
+            self._datasets[name] = self._open(name)
+        return self._datasets[name]
+
+    def _open(self, name):
+        base_dir = os.path.join(self.root, name)
+        daily_dir = os.path.join(self.root, COMPACTED_PREFIX, name)
+        compacted_dirs = set()
+        daily_paths = []
+        for directory, _, files in os.walk(daily_dir):
+            if COMPACTION_MANIFEST in files:
+                compacted_dirs.add(os.path.basename(directory))  # date=YYYY-MM-DD
+                daily_paths += [os.path.join(directory, file_name) for file_name in sorted(files) if file_name.endswith('.parquet')]
+        paths_by_format = {}
+        for directory, _, files in os.walk(base_dir):
+            if os.path.basename(os.path.dirname(directory)) in compacted_dirs:
+                continue  # hourly leftovers of a compacted day
+            for file_name in sorted(files):
+                if file_name.startswith('.'):
+                    continue  # in-progress writes
+                output_format = next((output_format for output_format in sorted(OUTPUT_FORMATS.values(), key=lambda f: -len(f.extension))
+                                      if file_name.endswith(output_format.extension)), None)
+                if output_format is not None:
+                    paths_by_format.setdefault(output_format.name, []).append(os.path.join(directory, file_name))
+        schema = self.schema(name)
+        datasets = []
+        for format_name, paths in sorted(paths_by_format.items()):
+            if format_name == 'parquet':
+                file_format = ds.ParquetFileFormat()
+            else:
+                # .csv.gz is decompressed by pyarrow from the file extension
+                file_format = ds.CsvFileFormat(convert_options=pa_csv.ConvertOptions(column_types=schema))
+            datasets.append(ds.dataset(paths, schema=schema, format=file_format,
+                                       partitioning=PARTITIONING, partition_base_dir=base_dir))
+        if daily_paths:
+            datasets.append(ds.dataset(daily_paths, schema=schema, format=ds.ParquetFileFormat(),
+                                       partitioning=DAILY_PARTITIONING, partition_base_dir=daily_dir))
+        return datasets
+
+    def scan(self, name, start_date=None, end_date=None, hours=None, columns=None):
+        # (table, QueryStats) for one dataset restricted to the date/hour predicate
+        expression = partition_filter(start_date, end_date, hours)
+        start = time.perf_counter()
+        tables, files_scanned, files_total = [], 0, 0
+        for dataset in self.datasets(name):
+            files_total += len(dataset.files)
+            files_scanned += sum(1 for _ in dataset.get_fragments(filter=expression)) if expression is not None else len(dataset.files)
+            tables.append(dataset.to_table(columns=columns, filter=expression))
+        if tables:
+            table = pa.concat_tables(tables)
+        else:
+            table = self.schema(name).empty_table()
+            table = table.select(columns) if columns else table
+        seconds = time.perf_counter() - start
+        rows_pruned = None
+        if self.count_pruned:
+            rows_pruned = sum(dataset.count_rows(filter=~expression) for dataset in self.datasets(name)) if expression is not None else 0
+        return table, QueryStats(name, files_scanned, files_total - files_scanned, table.num_rows, rows_pruned, seconds)
+
+
+def amount_per_category(lake:LocalLake, start_date=None, end_date=None, hours=None):
+    """Units and amount paid per date and category, as in basic_queries/ammount_per_cateogry.sql.
+
+    Sales are joined to the catalog of the same date, hour and product. The
+    BigQuery query joins on date and product only; the catalog has a row per
+    product for every hour, so there each sale is counted once per catalog
+    hour loaded for its date.
+    """
+    start = time.perf_counter()
+    sales, sales_stats = lake.scan('sales_data', start_date, end_date, hours,
+                                   ['date', 'hour', 'product_id', 'units_sold', 'total_ammount_paid'])
+    catalog, catalog_stats = lake.scan('product_catalog', start_date, end_date, hours,
+                                       ['date', 'hour', 'product_id', 'category_name'])
+    joined = sales.join(catalog, keys=['date', 'hour', 'product_id'], join_type='left outer')
+    joined = joined.filter(pc.is_valid(joined['category_name']))
+    table = aggregate_by_category(joined)
+    return QueryResult(table, [sales_stats, catalog_stats], time.perf_counter() - start)
+
+
+def amount_per_category_rollup(lake:LocalLake, start_date=None, end_date=None, hours=None):
+    # Same result from the hourly sales rollup (basic_queries/ammount_per_category_rollup.sql), no join needed
+    start = time.perf_counter()
+    rollup, rollup_stats = lake.scan('sales_rollup', start_date, end_date, hours,
+                                     ['date', 'category_name', 'units_sold', 'total_ammount_paid'])
+    return QueryResult(aggregate_by_category(rollup), [rollup_stats], time.perf_counter() - start)
+
+
+def aggregate_by_category(table):
+    aggregated = table.group_by(['date', 'category_name']).aggregate([('units_sold', 'sum'), ('total_ammount_paid', 'sum')])
+    aggregated = aggregated.select(['date', 'category_name', 'units_sold_sum', 'total_ammount_paid_sum'])
+    aggregated = aggregated.rename_columns(['date', 'category_name', 'units_sold', 'total_ammount_paid'])
+    return aggregated.sort_by([('date', 'ascending'), ('category_name', 'ascending')])
+
+
+def negative_stock_by_hour(lake:LocalLake, start_date=None, end_date=None, hours=None):
+    # Products ending each hour with negative stock, the events the Pub/Sub alerts are raised for
+    start = time.perf_counter()
+    inventory, inventory_stats = lake.scan('inventory_data', start_date, end_date, hours, ['date', 'hour', 'product_id', 'final_stock'])
+    negative = inventory.filter(pc.less(inventory['final_stock'], 0))
+    table = negative.group_by(['date', 'hour']).aggregate([('product_id', 'count'), ('final_stock', 'sum')])
+    table = table.select(['date', 'hour', 'product_id_count', 'final_stock_sum'])
+    table = table.rename_columns(['date', 'hour', 'products', 'final_stock']).sort_by([('date', 'ascending'), ('hour', 'ascending')])
+    return QueryResult(table, [inventory_stats], time.perf_counter() - start)
@@ -0,0 +1,149 @@
+import io
+import csv
+import gzip
+from itertools import islice
+
+# Column types for typed (Parquet) output; every column not listed is a string
+INTEGER_COLUMNS = {'units_sold', 'in_stock', 'new_product', 'returned_product', 'final_stock', 'transactions'}
+FLOAT_COLUMNS = {'unit_price', 'discount_applied', 'total_ammount_paid', 'gross_amount', 'discount_amount'}
+
+ROWS_PER_BATCH = 50_000
+# Unique per row, so a Parquet dictionary page would only add to them; every other column is dictionary-encoded
+UNIQUE_COLUMNS = {'transaction_id'}
+
+
+def iter_csv_chunks(rows, rows_per_batch=ROWS_PER_BATCH):
+    # Encodes rows (header first) to CSV bytes one batch at a time
+    rows = iter(rows)
+    text_buffer = io.StringIO()
+    csv_writer = csv.writer(text_buffer)
+    while True:
+        batch = list(islice(rows, rows_per_batch))
+        if not batch:
+            break
+        csv_writer.writerows(batch)
+        yield text_buffer.getvalue().encode('utf-8')
+        text_buffer.seek(0)
+        text_buffer.truncate()
+
+
+class CsvFormat:
+    name = 'csv'
+    extension = '.csv'
+    content_type = 'text/csv'
+    content_encoding = None
+
+    def encode(self, rows):
+        return b''.join(iter_csv_chunks(rows))
+
+    def write_stream(self, rows, binary_writer):
+        for chunk in iter_csv_chunks(rows):
+            binary_writer.write(chunk)
+
+
+class GzipCsvFormat(CsvFormat):
+    # Read by BigQuery external tables with compression = 'GZIP'
+    name = 'csv_gzip'
+    extension = '.csv.gz'
+    content_encoding = 'gzip'
+
+    def __init__(self, compresslevel=6):
+        self.compresslevel = compresslevel
+
+    def encode(self, rows):
+        return gzip.compress(super().encode(rows), compresslevel=self.compresslevel, mtime=0)
+
+    def write_stream(self, rows, binary_writer):
+        with gzip.GzipFile(fileobj=binary_writer, mode='wb', compresslevel=self.compresslevel, mtime=0) as gzip_writer:
+            super().write_stream(rows, gzip_writer)
+
+
+class ParquetFormat:
+    # Typed columns with zstd-compressed pages; pyarrow is imported on first use.
+    # Rows that come with a tables() method (utils.batch_generators.SalesBatches) are written as their Arrow tables
+    name = 'parquet'
+    extension = '.parquet'
+    content_type = 'application/vnd.apache.parquet'
+    content_encoding = None
+
+    def __init__(self, compression='zstd'):
+        self.compression = compression
+
+    def encode(self, rows):
+        buffer = io.BytesIO()
+        self.write_stream(rows, buffer)
+        return buffer.getvalue()
+
+    def write_stream(self, rows, binary_writer):
+        import pyarrow.parquet as pq
+
+        if hasattr(rows, 'tables'):
+            self.write_tables(rows.headers, rows.tables(), binary_writer)
+            return
+        rows = iter(rows)
+        schema = self.schema(next(rows))
+        with pq.ParquetWriter(binary_writer, schema, compression=self.compression,
+                              use_dictionary=self.dictionary_columns(schema)) as parquet_writer:
+            while True:
+                batch = list(islice(rows, ROWS_PER_BATCH))
+                if not batch:
+                    break
+                parquet_writer.write_table(self.to_table(batch, schema))
+
+    def write_tables(self, headers, tables, binary_writer):
+        # Dictionary columns of the tables are written as they are, without decoding them to strings first
+        import pyarrow.parquet as pq
+
+        tables = iter(tables)
+        first = next(tables, None)
+        # No rows: an empty file with the header's columns, as the row path writes
+        schema = first.schema if first is not None else self.schema(headers)
+        with pq.ParquetWriter(binary_writer, schema, compression=self.compression,
+                              use_dictionary=self.dictionary_columns(schema)) as parquet_writer:
+            if first is not None:
+                parquet_writer.write_table(first)
+            for table in tables:
+                parquet_writer.write_table(table)
+
+    def dictionary_columns(self, schema):
+        return [name for name in schema.names if name not in UNIQUE_COLUMNS]
+
+    def schema(self, headers):
+        import pyarrow as pa
+
+        fields = []
+        for column in headers:
+            if column in INTEGER_COLUMNS:
+                fields.append(pa.field(column, pa.int64()))
+            elif column in FLOAT_COLUMNS:
+                fields.append(pa.field(column, pa.float64()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        return pa.schema(fields)
+
+    def to_table(self, batch, schema):
+        import pyarrow as pa
+
+        columns = zip(*batch)
+        return pa.table([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+OUTPUT_FORMATS = {output_format.name: output_format for output_format in (CsvFormat(), GzipCsvFormat(), ParquetFormat())}
+
+
+def get_output_format(name):
+    try:
+        return OUTPUT_FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown output format '{name}', expected one of {sorted(OUTPUT_FORMATS)}")
+
+
+def parse_dataset_formats(spec, datasets):
+    # 'sales_data=parquet,inventory_data=csv_gzip' -> {dataset: output format}; unlisted datasets stay CSV
+    dataset_formats = {dataset: OUTPUT_FORMATS['csv'] for dataset in datasets}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        dataset, _, format_name = item.partition('=')
+        if dataset not in dataset_formats:
+            raise ValueError(f"Unknown dataset '{dataset}' in output formats, expected one of {list(datasets)}")
+        dataset_formats[dataset] = get_output_format(format_name)
+    return dataset_formats
@@ -0,0 +1,76 @@
+import re
+
+# Hive partition layout used by every dataset: <prefix>/date=YYYY-MM-DD/hour=HH/<file>
+PARTITION_PATTERN = re.compile(r'date=(\d{4}-\d{2}-\d{2})/hour=(\d{2})/')
+# Sharded partitions: <file>-00003-of-00008<extension>; shard 00000 is written last and marks the partition complete
+SHARD_PATTERN = re.compile(r'-(\d{5})-of-(\d{5})\.[^/]+$')
+
+DATASET_PREFIXES = ('product_catalog', 'sales_data', 'inventory_data')
+# Days compacted by utils/compaction.py: daily/<prefix>/date=YYYY-MM-DD/<files>, committed by a _manifest.json
+COMPACTED_PREFIX = 'daily'
+COMPACTION_MANIFEST = '_manifest.json'
+COMPACTED_DAY_PATTERN = re.compile(r'date=(\d{4}-\d{2}-\d{2})/_manifest\.json$')
+HOURS = tuple(f'{hour:02d}' for hour in range(24))
+
+
+def partition_blob_names(date, hour, extensions=None):
+    # Object name of each dataset for one date/hour; extensions maps dataset -> file extension (default .csv)
+    extensions = extensions or {}
+    return {'product_catalog': f'product_catalog/date={date}/hour={hour}/product_catalog_for_{date}-{hour}{extensions.get("product_catalog", ".csv")}',
+            'sales_data': f'sales_data/date={date}/hour={hour}/sales_data_for_{date}-{hour}{extensions.get("sales_data", ".csv")}',
+            'inventory_data': f'inventory_data/date={date}/hour={hour}/sales_data_for_{date}-{hour}{extensions.get("inventory_data", ".csv")}'}
+
+
+def compaction_manifest_name(prefix, date):
+    return f'{COMPACTED_PREFIX}/{prefix}/date={date}/{COMPACTION_MANIFEST}'
+
+
+def shard_blob_names(blob_name, extension, num_shards):
+    # Shard names keep the extension, so they still match the external tables' *.csv / *.csv.gz / *.parquet uris
+    if num_shards == 1:
+        return [blob_name]
+    stem = blob_name[:-len(extension)]
+    return [f'{stem}-{shard:05d}-of-{num_shards:05d}{extension}' for shard in range(num_shards)]
+
+
+class PartitionManifest:
+    """In-memory set of the date/hour partitions that already exist in storage.
+
+    Each dataset prefix is listed once with `list_prefix` instead of probing
+    every blob with `exists()`, so a run costs one listing per prefix
+    (plus pagination) rather than three round-trips per date/hour. The
+    compacted prefix is listed too: a day whose compaction manifest exists
+    has all 24 hours, even once its hourly objects are deleted.
+    """
+
+    def __init__(self, storage_backend, prefixes=DATASET_PREFIXES):
+        self.storage_backend = storage_backend
+        self.prefixes = tuple(prefixes)
+        self.partitions = {prefix: set() for prefix in self.prefixes}
+
+    def load(self, start_date=None):
+        # start_offset skips everything older than the window (names sort lexicographically by date)
+        for prefix in self.prefixes:
+            start_offset = f'{prefix}/date={start_date}' if start_date else None
+            for name in self.storage_backend.list_prefix(f'{prefix}/', start_offset):
+                shard = SHARD_PATTERN.search(name)
+                if shard and int(shard.group(1)) != 0:
+                    continue  # only shard 0 counts, so a partially written partition is regenerated
+                match = PARTITION_PATTERN.search(name)
+                if match:
+                    self.partitions[prefix].add(match.groups())
+            start_offset = f'{COMPACTED_PREFIX}/{prefix}/date={start_date}' if start_date else None
+            for name in self.storage_backend.list_prefix(f'{COMPACTED_PREFIX}/{prefix}/', start_offset):
+                match = COMPACTED_DAY_PATTERN.search(name)
+                if match:
+                    self.partitions[prefix].update((match.group(1), hour) for hour in HOURS)
+        return self
+
+    def exists(self, prefix, date, hour):
+        return (date, hour) in self.partitions[prefix]
+
+    def add(self, prefix, date, hour):
+        self.partitions[prefix].add((date, hour))
+
+    def missing(self, prefix, date_hours):
+        return [(date, hour) for date, hour in date_hours if not self.exists(prefix, date, hour)]
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from utils.partition_manifest import PARTITION_PATTERN, SHARD_PATTERN, DATASET_PREFIXES
+
+BIGQUERY_DATASET = 'bigquery-dataflow-460522.retail_ds'
+PLANNED_DATASETS = DATASET_PREFIXES + ('sales_rollup',)
+
+# External table columns copied into each <dataset>_managed table, which adds date, hour and date_tmsp
+MANAGED_COLUMNS = {
+    'product_catalog': ('ingestion_date', 'ingestion_hour', 'product_id', 'product_name', 'category_id', 'category_name',
+                        'brand', 'description', 'unit_price', 'supplier_name', 'tags'),
+    'sales_data': ('transaction_date', 'transaction_hour', 'transaction_id', 'customer_id', 'order_country', 'product_id',
+                   'unit_price', 'units_sold', 'discount_applied', 'total_ammount_paid'),
+    'inventory_data': ('inventory_date', 'inventory_hour', 'product_id', 'in_stock', 'new_product', 'returned_product',
+                       'units_sold', 'final_stock'),
+    'sales_rollup': ('rollup_date', 'rollup_hour', 'product_id', 'category_id', 'category_name', 'order_country',
+                     'transactions', 'units_sold', 'gross_amount', 'discount_amount', 'total_ammount_paid'),
+}
+
+MergeStatement = namedtuple('MergeStatement', ['dataset', 'sql', 'parameters', 'partitions'])
+
+
+class PartitionPlan(namedtuple('PartitionPlan', ['dataset', 'new', 'changed', 'versions'])):
+    """Partitions of one dataset to merge: `new` were never loaded, `changed` were
+    rewritten in storage since they were loaded. `versions` holds the storage
+    version of each planned partition, recorded in the load state once the
+    MERGE has run."""
+
+    @property
+    def partitions(self):
+        return sorted(self.new | self.changed)
+
+
+def partition_key(date, hour):
+    return f'{date}/{hour}'
+
+
+def partition_versions(listing):
+    # {(date, hour): version} of the complete partitions in a list_versions listing
+    objects = {}
+    complete = set()
+    for name, version in listing:
+        match = PARTITION_PATTERN.search(name)
+        if not match:
+            continue
+        objects.setdefault(match.groups(), []).append(f'{name}={version}')
+        shard = SHARD_PATTERN.search(name)
+        if not shard or int(shard.group(1)) == 0:
+            complete.add(match.groups())
+    return {date_hour: hashlib.blake2b('\n'.join(sorted(objects[date_hour])).encode('utf-8'), digest_size=8).hexdigest()
+            for date_hour in complete}
+
+
+class PartitionLoadState:
+    """Watermark/state file: the (date, hour) partitions already merged into each
+    managed table and the storage version they were loaded at.
+
+    Kept as a small JSON file, replaced atomically on save. A missing file
+    means nothing has been loaded yet.
+    """
+
+    def __init__(self, path, loaded=None):
+        self.path = path
+        self.loaded = {dataset: dict(versions) for dataset, versions in (loaded or {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as state_file:
+            return cls(path, json.load(state_file)['loaded'])
+
+    def version(self, dataset, date, hour):
+        return self.loaded.get(dataset, {}).get(partition_key(date, hour))
+
+    def watermark(self, dataset):
+        # Latest loaded (date, hour) of the dataset, None before the first load
+        keys = self.loaded.get(dataset)
+        return tuple(max(keys).split('/')) if keys else None
+
+    def mark_loaded(self, dataset, versions:dict):
+        # versions: {(date, hour): version} of partitions whose MERGE has succeeded, usually plan.versions
+        loaded = self.loaded.setdefault(dataset, {})
+        for (date, hour), version in versions.items():
+            loaded[partition_key(date, hour)] = version
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as state_file:
+            json.dump({'loaded': {dataset: dict(sorted(versions.items())) for dataset, versions in sorted(self.loaded.items())}},
+                      state_file, indent=1)
+        os.replace(temp_path, self.path)
+
+
+class PartitionPlanner:
+    """Compares the partitions in storage with a PartitionLoadState.
+
+    Each dataset prefix is listed once with object versions; a partition's
+    version is a digest of the names and versions of all its objects, so
+    rewriting any file (or shard) of an hour marks that hour as changed.
+    Sharded partitions are only planned once shard 0, written last, exists.
+    """
+
+    def __init__(self, storage_backend, load_state:PartitionLoadState, datasets=PLANNED_DATASETS):
+        self.storage_backend = storage_backend
+        self.load_state = load_state
+        self.datasets = tuple(datasets)
+
+    def list_partitions(self, dataset, start_date=None):
+        # {(date, hour): version} of every complete partition of the dataset from start_date on
+        start_offset = f'{dataset}/date={start_date}' if start_date else None
+        return partition_versions(self.storage_backend.list_versions(f'{dataset}/', start_offset))
+
+    def plan(self, dataset, lookback_hours=None):
+        """Plan one dataset.
+
+        With lookback_hours only partitions from that many hours before the
+        dataset's watermark are listed, which keeps the listing short but
+        misses rewrites of older hours; without it the whole prefix is compared.
+        """
+        start_date = None
+        watermark = self.load_state.watermark(dataset)
+        if lookback_hours is not None and watermark:
+            start = datetime.strptime(' '.join(watermark), '%Y-%m-%d %H') - timedelta(hours=lookback_hours)
+            start_date = start.strftime('%Y-%m-%d')
+        new, changed, versions = set(), set(), {}
+        for (date, hour), version in self.list_partitions(dataset, start_date).items():
+            loaded_version = self.load_state.version(dataset, date, hour)
+            if loaded_version == version:
+                continue
+            (new if loaded_version is None else changed).add((date, hour))
+            versions[(date, hour)] = version
+        return PartitionPlan(dataset, new, changed, versions)
+
+    def plan_all(self, lookback_hours=None):
+        return [self.plan(dataset, lookback_hours) for dataset in self.datasets]
+
+
+def merge_sql(dataset, bigquery_dataset=BIGQUERY_DATASET):
+    """MERGE that replaces exactly the partitions listed in @partition_keys.
+
+    Rows of the listed partitions already in the managed table are deleted and
+    the external table's rows for them inserted, in one atomic statement.
+    @partition_dates only serves partition pruning: the date filter limits the
+    Hive partitions read from the external table and the date_tmsp partitions
+    of the managed table.
+    """
+    columns = MANAGED_COLUMNS[dataset]
+    select_list = ',\n'.join(f'    ext.{column}' for column in columns)
+    return f"""MERGE `{bigquery_dataset}.{dataset}_managed` AS target
+USING (
+  SELECT
+{select_list},
+    CAST(ext.date AS STRING) AS date,
+    ext.hour AS hour,
+    TIMESTAMP(ext.date) AS date_tmsp
+  FROM `{bigquery_dataset}.{dataset}_ext` AS ext
+  WHERE ext.date IN UNNEST(@partition_dates)
+    AND CONCAT(CAST(ext.date AS STRING), '/', ext.hour) IN UNNEST(@partition_keys)
+) AS source
+ON FALSE
+WHEN NOT MATCHED BY SOURCE
+  AND DATE(target.date_tmsp) IN UNNEST(@partition_dates)
+  AND CONCAT(target.date, '/', target.hour) IN UNNEST(@partition_keys) THEN
+  DELETE
+WHEN NOT MATCHED THEN
+  INSERT ROW"""
+
+
+def query_parameters(partitions):
+    # Named parameters in the BigQuery REST format (jobs.insert queryParameters), no client library needed
+    dates = sorted({date for date, _ in partitions})
+    keys = [partition_key(date, hour) for date, hour in sorted(partitions)]
+    return [{'name': 'partition_dates',
+             'parameterType': {'type': 'ARRAY', 'arrayType': {'type': 'DATE'}},
+             'parameterValue': {'arrayValues': [{'value': date} for date in dates]}},
+            {'name': 'partition_keys',
+             'parameterType': {'type': 'ARRAY', 'arrayType': {'type': 'STRING'}},
+             'parameterValue': {'arrayValues': [{'value': key} for key in keys]}}]
+
+
+def merge_statement(plan:PartitionPlan, bigquery_dataset=BIGQUERY_DATASET):
+    # None when the dataset has nothing to load
+    partitions = plan.partitions
+    if not partitions:
+        return None
+    return MergeStatement(plan.dataset, merge_sql(plan.dataset, bigquery_dataset), query_parameters(partitions), partitions)
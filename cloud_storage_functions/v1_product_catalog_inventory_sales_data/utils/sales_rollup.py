@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+
+from utils.batch_generators import ORDER_COUNTRIES
+
+ROLLUP_PREFIX = 'sales_rollup'
+ROLLUP_HEADERS = ('rollup_date', 'rollup_hour', 'product_id', 'category_id', 'category_name', 'order_country',
+                  'transactions', 'units_sold', 'gross_amount', 'discount_amount', 'total_ammount_paid')
+
+
+def rollup_blob_name(date, hour, extension='.csv'):
+    return f'{ROLLUP_PREFIX}/date={date}/hour={hour}/{ROLLUP_PREFIX}_for_{date}-{hour}{extension}'
+
+
+class SalesRollup:
+    """Hourly sales totals by product and order country, built while the sales are generated.
+
+    One cell per (catalog product, country) holds transactions, units sold,
+    gross amount (unit price x units) and amount paid; category comes from
+    the catalog, so category, country and product rollups are all sums over
+    these cells. Sales are added in bulk with bincount, either as generator
+    columns or as rows; adding is safe from several upload threads.
+    """
+
+    def __init__(self, product_catalog:list):
+        catalog_rows = product_catalog[1:]
+        self.product_ids = [row[2] for row in catalog_rows]
+        self.categories = [(row[4], row[5]) for row in catalog_rows]
+        self.product_index = {product_id: i for i, product_id in enumerate(self.product_ids)}
+        self.countries = ORDER_COUNTRIES.tolist()
+        self.country_index = {country: i for i, country in enumerate(self.countries)}
+        size = len(catalog_rows) * len(self.countries)
+        self.transactions = np.zeros(size, dtype=np.int64)
+        self.units_sold = np.zeros(size, dtype=np.int64)
+        self.gross_amount = np.zeros(size, dtype=np.float64)
+        self.total_ammount_paid = np.zeros(size, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def add(self, product_index, country_index, units_sold, unit_price, total_ammount_paid):
+        # Parallel arrays, one entry per sale; -1 marks a product or country outside the catalog
+        product_index = np.asarray(product_index)
+        country_index = np.asarray(country_index)
+        known = (product_index >= 0) & (country_index >= 0)
+        cell = product_index[known] * len(self.countries) + country_index[known]
+        units_sold = np.asarray(units_sold)[known]
+        size = len(self.transactions)
+        transactions = np.bincount(cell, minlength=size)
+        units = np.bincount(cell, weights=units_sold, minlength=size).astype(np.int64)
+        gross = np.bincount(cell, weights=np.asarray(unit_price)[known] * units_sold, minlength=size)
+        paid = np.bincount(cell, weights=np.asarray(total_ammount_paid)[known], minlength=size)
+        with self._lock:
+            self.transactions += transactions
+            self.units_sold += units
+            self.gross_amount += gross
+            self.total_ammount_paid += paid
+
+    def add_columns(self, columns:dict):
+        # Columns from generate_sales_columns for the same catalog
+        self.add(columns['product_index'], columns['country_index'], columns['units_sold'],
+                 columns['unit_price'], columns['total_ammount_paid'])
+
+    def add_records(self, records:list):
+        # Sales tuples in the generate_sales_data schema, without the header
+        count = len(records)
+        self.add(np.fromiter((self.product_index.get(record[5], -1) for record in records), dtype=np.int64, count=count),
+                 np.fromiter((self.country_index.get(record[4], -1) for record in records), dtype=np.int64, count=count),
+                 np.fromiter((record[7] for record in records), dtype=np.int64, count=count),
+                 np.fromiter((record[6] for record in records), dtype=np.float64, count=count),
+                 np.fromiter((record[9] for record in records), dtype=np.float64, count=count))
+
+    def add_rows(self, sales_data:list):
+        self.add_records(sales_data[1:])
+
+    def to_rows(self, rollup_date, rollup_hour):
+        # Header first, then one row per (product, country) with at least one sale
+        rows = [ROLLUP_HEADERS]
+        num_countries = len(self.countries)
+        for cell in np.flatnonzero(self.transactions).tolist():
+            product, country = divmod(cell, num_countries)
+            category_id, category_name = self.categories[product]
+            gross_amount = round(float(self.gross_amount[cell]), 2)
+            total_ammount_paid = round(float(self.total_ammount_paid[cell]), 2)
+            rows.append((rollup_date, rollup_hour, self.product_ids[product], category_id, category_name,
+                         self.countries[country], int(self.transactions[cell]), int(self.units_sold[cell]),
+                         gross_amount, round(gross_amount - total_ammount_paid, 2), total_ammount_paid))
+        return rows
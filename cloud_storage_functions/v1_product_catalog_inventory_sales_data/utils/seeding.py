@@ -0,0 +1,35 @@
+import hashlib
+import random
+
+# Every random draw of a partition comes from a stream derived from
+# (root seed, dataset, date, hour), never from global state. A partition can
+# then be rebuilt bit-for-bit on any worker, in any order, alone or in a batch.
+
+
+def new_root_seed():
+    # Fresh root seed for runs that were not given one; logged so the run can be reproduced
+    return random.SystemRandom().getrandbits(63)
+
+
+def stream_seed(root_seed, *key):
+    # 64-bit seed for one named stream; blake2b keeps it stable across processes and Python versions
+    digest = hashlib.blake2b('/'.join(str(part) for part in (root_seed, *key)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def partition_random(root_seed, dataset, date, hour):
+    # random.Random stream for the per-row generators
+    return random.Random(stream_seed(root_seed, dataset, date, hour))
+
+
+def partition_rng(root_seed, dataset, date, hour, shard=None):
+    # NumPy Generator stream for the vectorized generators and InventoryState; each shard of a
+    # sharded partition gets its own stream so shards can be generated independently
+    import numpy as np
+    key = (dataset, date, hour) if shard is None else (dataset, date, hour, shard)
+    return np.random.default_rng(stream_seed(root_seed, *key))
+
+
+def num_products_for(root_seed):
+    # Catalog size is part of the run, not of a partition: one draw per root seed
+    return random.Random(stream_seed(root_seed, 'num_products')).randint(50, 100)
@@ -0,0 +1,208 @@
+import os
+import time
+import uuid
+
+# Every backend exposes the same operations on object names like
+# <prefix>/date=YYYY-MM-DD/hour=HH/<file>:
+#   exists(name), list_prefix(prefix, start_offset), list_versions(prefix, start_offset),
+#   read_bytes(name), write_bytes(name, payload, ...), open_write(name, ...), delete(name)
+# list_versions pairs each name with a version string that changes whenever the object is rewritten.
+# Writes accept if_generation_match=0 to only create the object; if it already exists they raise an
+# error whose `code` is 412, as google.api_core.exceptions.PreconditionFailed does
+
+
+class PreconditionFailed(Exception):
+    # Local stand-in for the GCS 412 response
+    code = 412
+
+
+class GcsStorageBackend:
+    """Storage backend over a google.cloud.storage Bucket (or any object with the same blob API)."""
+
+    def __init__(self, bucket_instance):
+        self.bucket_instance = bucket_instance
+        self.uri = f'gs://{bucket_instance.name}'
+
+    def exists(self, name):
+        return self.bucket_instance.blob(name).exists()
+
+    def list_prefix(self, prefix, start_offset=None):
+        # Object names under prefix in lexicographic order, starting at start_offset
+        list_kwargs = {'prefix': prefix}
+        if start_offset:
+            list_kwargs['start_offset'] = start_offset
+        for blob in self.bucket_instance.list_blobs(**list_kwargs):
+            yield blob.name
+
+    def list_versions(self, prefix, start_offset=None):
+        # GCS assigns a new generation number on every write of an object
+        list_kwargs = {'prefix': prefix}
+        if start_offset:
+            list_kwargs['start_offset'] = start_offset
+        for blob in self.bucket_instance.list_blobs(**list_kwargs):
+            yield blob.name, str(blob.generation)
+
+    def read_bytes(self, name):
+        # Stored bytes as written; gzip content-encoding is not decoded
+        return self.bucket_instance.blob(name).download_as_bytes(raw_download=True)
+
+    def write_bytes(self, name, payload, content_type=None, content_encoding=None, if_generation_match=None):
+        blob = self.bucket_instance.blob(name)
+        if content_encoding:
+            blob.content_encoding = content_encoding
+        # retry=None turns off the client library's own retries (up to ~120 s of 429/503 inside one call):
+        # UploadPolicy is the only retry layer, so its limiter sees the throttles and its budget counts every retry
+        blob.upload_from_string(payload, content_type=content_type, if_generation_match=if_generation_match, retry=None)
+
+    def open_write(self, name, content_type=None, content_encoding=None, chunk_size=None, if_generation_match=None):
+        # Resumable upload, sent chunk_size bytes at a time; no client-side retries, as in write_bytes
+        blob = self.bucket_instance.blob(name)
+        if content_encoding:
+            blob.content_encoding = content_encoding
+        return blob.open('wb', chunk_size=chunk_size, content_type=content_type, if_generation_match=if_generation_match,
+                         retry=None)
+
+    def delete(self, name):
+        self.bucket_instance.blob(name).delete()
+
+
+class LocalDirStorageBackend:
+    """Storage backend that keeps objects as files under a local directory.
+
+    Object names map to paths below `root`, so the date=/hour= layout is the
+    same as in the bucket. Every operation can be delayed by `latency` seconds
+    and writes throttled to `bandwidth` bytes per second to approximate GCS
+    from a laptop. Files are written to a temporary name and renamed on
+    close, so readers never see a partial object.
+    """
+
+    def __init__(self, root, latency=0.0, bandwidth=None):
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.uri = f'file://{self.root}'
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def local_path(self, name):
+        # Local only: lets readers memory-map an object instead of reading it into memory
+        return self._path(name)
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _transfer(self, size):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def exists(self, name):
+        self._round_trip()
+        return os.path.isfile(self._path(name))
+
+    def list_prefix(self, prefix, start_offset=None):
+        self._round_trip()
+        # Only the directory the prefix points into needs walking
+        walk_root = self._path(prefix.rsplit('/', 1)[0]) if '/' in prefix else self.root
+        names = []
+        for directory, _, files in os.walk(walk_root):
+            for file_name in files:
+                if file_name.startswith('.'):
+                    continue  # in-progress writes
+                name = os.path.relpath(os.path.join(directory, file_name), self.root).replace(os.sep, '/')
+                if name.startswith(prefix) and (start_offset is None or name >= start_offset):
+                    names.append(name)
+        yield from sorted(names)
+
+    def list_versions(self, prefix, start_offset=None):
+        # Modification time and size stand in for the GCS generation; writes replace the file, so both change
+        for name in self.list_prefix(prefix, start_offset):
+            stat = os.stat(self._path(name))
+            yield name, f'{stat.st_mtime_ns}-{stat.st_size}'
+
+    def read_bytes(self, name):
+        self._round_trip()
+        with open(self._path(name), 'rb') as stored_file:
+            return stored_file.read()
+
+    def write_bytes(self, name, payload, content_type=None, content_encoding=None, if_generation_match=None):
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        with self.open_write(name, content_type, content_encoding, if_generation_match=if_generation_match) as writer:
+            writer.write(payload)
+
+    def open_write(self, name, content_type=None, content_encoding=None, chunk_size=None, if_generation_match=None):
+        # content_type/content_encoding have no local equivalent; the bytes are stored as given.
+        # Only if_generation_match=0 (create only) is meaningful here: local files carry no generation
+        self._round_trip()
+        return LocalObjectWriter(self, self._path(name), create_only=if_generation_match == 0)
+
+    def delete(self, name):
+        self._round_trip()
+        os.remove(self._path(name))
+
+
+class LocalObjectWriter:
+    # Binary writer for LocalDirStorageBackend; the object appears under its final name only on a clean close
+
+    def __init__(self, backend, path, create_only=False):
+        self.backend = backend
+        self.path = path
+        self.create_only = create_only
+        directory, file_name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        self.temp_path = os.path.join(directory, f'.{file_name}.{uuid.uuid4().hex}')
+        self.file = open(self.temp_path, 'wb')
+        self.closed = False
+
+    def write(self, data):
+        self.backend._transfer(len(data))
+        return self.file.write(data)
+
+    def tell(self):
+        return self.file.tell()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+            self.closed = True
+            if self.create_only:
+                # link() fails if the name exists, so the check and the create are one step
+                try:
+                    os.link(self.temp_path, self.path)
+                except FileExistsError:
+                    raise PreconditionFailed(f'{self.path} already exists') from None
+                finally:
+                    os.remove(self.temp_path)
+            else:
+                os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        if not self.closed:
+            self.file.close()
+            os.remove(self.temp_path)
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+
+def storage_backend_from_uri(uri, latency=0.0, bandwidth=None):
+    # 'gs://bucket' -> GCS (client created here), 'file:///path' or a plain path -> local directory
+    if uri.startswith('gs://'):
+        from google.cloud import storage
+        return GcsStorageBackend(storage.Client().bucket(uri[len('gs://'):].strip('/')))
+    if uri.startswith('file://'):
+        uri = uri[len('file://'):]
+    return LocalDirStorageBackend(uri, latency=latency, bandwidth=bandwidth)
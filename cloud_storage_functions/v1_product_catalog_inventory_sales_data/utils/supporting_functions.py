@@ -1,16 +1,13 @@
 import math
 import random
+import uuid
 from io import StringIO
 import io
 import csv
-from faker import Faker
 from datetime import datetime, timedelta
 import json
 
-fake = Faker()
-
-def generate_static_products():
-    STATIC_PRODUCT_ARCHETYPES = [
+STATIC_PRODUCT_ARCHETYPES = [
     {
         "base_name": "UltraSmart",
         'category_id' : 'CAT-01',
@@ -103,6 +100,12 @@ def generate_static_products():
     }
     ]   
 
+# Value pools formatted once and shared with utils/batch_generators.py; per-row draws only pick from them
+CUSTOMER_ID_POOL = [f"CUST_{i:04d}" for i in range(1001, 5001)]
+ORDER_COUNTRY_POOL = ['United States', 'Canada', 'Mexico', 'Brazil', 'Argentina', 'UK', 'France', 'Germany', 'China', 'Spain']
+
+def generate_static_products():
+    # Archetypes are built once at import time and shared by every request
     return STATIC_PRODUCT_ARCHETYPES
 
 def generate_date_list(start_date_str, end_date_str):
@@ -131,9 +134,11 @@ def generate_date_list(start_date_str, end_date_str):
 def create_static_product_catalog(num_products, prod_archetypes, ingestion_date, ingestion_hour):
 
     all_products = []
-    headers = ['ingestion_date', 'ingestion_hour','product_id', 'product_name', 'category_id,','category_name', 'brand', 'description', 'unit_price', 'supplier_name', 'tags']
+    headers = ['ingestion_date', 'ingestion_hour','product_id', 'product_name', 'category_id','category_name', 'brand', 'description', 'unit_price', 'supplier_name', 'tags']
     all_products.append(headers)
     num_archetypes = len(prod_archetypes)
+    # One description string per archetype, shared by all of its products
+    descriptions = [f"A high-quality product. {archetype['description_suffix']}" for archetype in prod_archetypes]
 
     for i in range(num_products):
         product_id_num = i + 1
@@ -155,7 +160,7 @@ def create_static_product_catalog(num_products, prod_archetypes, ingestion_date,
             archetype["category_id"],
             archetype["category"],
             archetype["brand"],
-            f"A high-quality product. {archetype['description_suffix']}",
+            descriptions[archetype_index],
             archetype["unit_price"],            
             archetype["supplier"],
             archetype["tags"],
@@ -167,13 +172,14 @@ def create_static_product_catalog(num_products, prod_archetypes, ingestion_date,
 # Generate the static product dictionary
 
 
-def generate_random_pre_sales_inventory(product_catalog:list, inventory_date, inventory_hour):
+def generate_random_pre_sales_inventory(product_catalog:list, inventory_date, inventory_hour, rng=None):
+    rng = rng or random # random.Random stream from utils.seeding; the global generator if not given
     inventory = {}
     for prod_tup in product_catalog[1:]:
         product_id = prod_tup[2]
-        in_stock = random.randint(2000,7000)
-        new_product = random.randint(2000,7000)
-        returned_product = random.randint(-2000,0)
+        in_stock = rng.randint(2000,7000)
+        new_product = rng.randint(2000,7000)
+        returned_product = rng.randint(-2000,0)
         
         product_inventory_detail = {'inventory_date': inventory_date,
                                     'inventory_hour': inventory_hour,
@@ -189,43 +195,46 @@ def generate_random_pre_sales_inventory(product_catalog:list, inventory_date, in
 
 
 
-def generate_sales_data(product_catalog:list, sales_date, sales_hour):
-    sales_data = []
+def generate_sales_data(product_catalog:list, sales_date, sales_hour, num_sales=None, rng=None):
+    return list(iter_sales_data(product_catalog, sales_date, sales_hour, num_sales, rng))
+
+def iter_sales_data(product_catalog:list, sales_date, sales_hour, num_sales=None, rng=None):
+    # Lazy version of generate_sales_data: yields the headers, then one sale at a time
     headers = ('transaction_date', 'transaction_hour', 'transaction_id', 'customer_id', 'order_country', 'product_id', 'unit_price', 'units_sold', 'discount_applied', 'total_ammount_paid')
-    sales_data.append(headers)
-    num_sales = random.randint(150,1000) # A random number of sales
+    yield headers
+    rng = rng or random # random.Random stream from utils.seeding; the global generator if not given
+    if num_sales is None:
+        num_sales = rng.randint(150,1000) # A random number of sales
     product_catalog_rows = product_catalog[1:]
     for i in range(num_sales):
         transaction_date = sales_date
         transaction_hour = sales_hour
-        transaction_id = fake.uuid4()
-        customer_id = f"CUST_{random.randint(1001, 5000):04d}"
-        order_country = random.choice(['United States', 'Canada', 'Mexico', 'Brazil', 'Argentina', 'UK', 'France', 'Germany', 'China', 'Spain'])
-        product_sold_index = random.randint(0,len(product_catalog_rows))  # Tupple
+        transaction_id = str(uuid.UUID(int=rng.getrandbits(128), version=4)) # Same construction as Faker's uuid4, from the seeded stream
+        customer_id = CUSTOMER_ID_POOL[rng.randint(1001, 5000) - 1001]
+        order_country = rng.choice(ORDER_COUNTRY_POOL)
+        product_sold_index = rng.randint(0,len(product_catalog_rows))  # Tupple
         product_id = product_catalog_rows[product_sold_index-1][2]
         unit_price = product_catalog_rows[product_sold_index-1][8]
-        units_sold = random.randint(1, 2000)
+        units_sold = rng.randint(1, 2000)
 
         if units_sold > 500:
-            discount_applied = random.randint(5, 20) / 100
+            discount_applied = rng.randint(5, 20) / 100
         else:
             discount_applied = 0 
 
         total_ammount_paid = (unit_price *(1-discount_applied)) * units_sold
 
-        sales_data.append((transaction_date,
-                           transaction_hour,
-                           transaction_id,
-                           customer_id,
-                           order_country,
-                           product_id,
-                           unit_price,
-                           units_sold, 
-                           discount_applied,
-                           total_ammount_paid
-                        ))
-        
-    return sales_data 
+        yield (transaction_date,
+               transaction_hour,
+               transaction_id,
+               customer_id,
+               order_country,
+               product_id,
+               unit_price,
+               units_sold, 
+               discount_applied,
+               total_ammount_paid
+               )
 
 def update_inventory(sales_data:list, pre_sales_inventory:dict):
     aggregated_units_sold = {}
@@ -239,7 +248,7 @@ def update_inventory(sales_data:list, pre_sales_inventory:dict):
     # Inventory Update
     for product_id in aggregated_units_sold:
         if product_id not in pre_sales_inventory.keys():
-            pre_sales_inventory[product_id]['final_stock'] =  pre_sales_inventory[product_id]['in_stock'] + pre_sales_inventory[product_id]['new_product'] + pre_sales_inventory[product_id]['returned_product'] + 0
+            continue # Sold products missing from the inventory have no stock to update
         else:
             units_sold = aggregated_units_sold[product_id]
             pre_sales_inventory[product_id]['units_sold'] = units_sold * -1
@@ -269,34 +278,41 @@ def update_inventory(sales_data:list, pre_sales_inventory:dict):
     
     return updated_inventory
         
+def tuples_to_csv_string(data_tuples_with_headers: list):
+    csv_string_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_string_buffer)
+
+    # data_tuples_with_headers already contains the header row as its first element
+    csv_writer.writerows(data_tuples_with_headers)
+
+    csv_content = csv_string_buffer.getvalue()
+    csv_string_buffer.close()
+    return csv_content
+
 def upload_tuples_to_gcs_as_csv(
-    storage_bucket,
-    bucket_instance, 
+    storage_backend, # utils.storage_backends: GCS bucket or local directory
     destination_blob_name: str,
-    data_tuples_with_headers: list # Renamed for clarity
+    data_tuples_with_headers: list, # Renamed for clarity
+    upload_policy=None # utils.upload_policy.UploadPolicy: retries transient errors instead of giving up on the first
 ):
     try:
-        bucket = bucket_instance # Using global instance
-        blob = bucket.blob(destination_blob_name)
-
-        csv_string_buffer = io.StringIO()
-        csv_writer = csv.writer(csv_string_buffer)
-
-        # data_tuples_with_headers already contains the header row as its first element
-        csv_writer.writerows(data_tuples_with_headers) 
+        csv_content = tuples_to_csv_string(data_tuples_with_headers)
 
-        csv_content = csv_string_buffer.getvalue()
-        csv_string_buffer.close()
-
-        blob.upload_from_string(csv_content, content_type='text/csv')
-        print(f"Successfully uploaded data to gs://{storage_bucket}/{destination_blob_name}")
+        if upload_policy is None:
+            storage_backend.write_bytes(destination_blob_name, csv_content, content_type='text/csv')
+        else:
+            upload_policy.call(lambda if_generation_match: storage_backend.write_bytes(
+                destination_blob_name, csv_content, content_type='text/csv', if_generation_match=if_generation_match))
+        return True
 
-    except Exception as e:
-        print(f"An error occurred while uploading {destination_blob_name}: {e}")
+    except Exception:
+        # The caller reports failures (see UploadExecutor's UploadResult); no log line per blob
+        return False
 
 
 def publish_message_to_pub_sub(inventory_updates:list, publisher_object, topic_path):    
-    for event in inventory_updates:
+    # Blocking mode: waits for every message ID. See utils.alert_publisher.AlertPublisher for batched publishing
+    for event in inventory_updates[1:]:  # skip headers
         try:
             message = {'inventory_date': event[0],
                     'inventory_hour': event[1],
@@ -315,4 +331,3 @@ def publish_message_to_pub_sub(inventory_updates:list, publisher_object, topic_p
                 pass
         except Exception as e:
             print(f"Error publishing message for event {event}: {e}")
-        
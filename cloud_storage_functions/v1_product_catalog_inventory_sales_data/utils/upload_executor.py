@@ -0,0 +1,110 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.output_formats import OUTPUT_FORMATS
+from utils.csv_stream import stream_rows_to_blob, DEFAULT_CHUNK_SIZE
+from utils.instrumentation import RunMetrics
+from utils.upload_policy import UploadPolicy
+
+UploadResult = namedtuple('UploadResult', ['blob_name', 'success', 'bytes_written', 'error', 'attempts'], defaults=(1,))
+
+
+class UploadExecutor:
+    """Uploads partitions on a bounded thread pool while the caller keeps generating.
+
+    `submit` returns immediately, so generation for the next hour overlaps the
+    uploads of the previous one. At most `max_pending` payloads (queued or in
+    flight) are held in memory; once that many are outstanding `submit` blocks
+    until a worker finishes. Every upload produces an UploadResult instead of
+    printing and swallowing the error. Writes go through an UploadPolicy
+    (utils/upload_policy.py): transient errors are retried with backoff, and
+    an adaptive limiter, if the policy has one, keeps fewer than max_workers
+    writes in flight while storage throttles. Streamed uploads consume their
+    rows, so they get the limiter and precondition but a single attempt.
+    """
+
+    def __init__(self, storage_backend, max_workers=4, max_pending=None, metrics=None, policy=None):
+        self.storage_backend = storage_backend
+        self.policy = policy if policy is not None else UploadPolicy()
+        # Encode and write times are recorded as 'serialize'/'upload' spans (streamed files as 'stream_upload')
+        self.metrics = metrics if metrics is not None else RunMetrics('upload_executor', enabled=False)
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 2
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._futures = []
+
+    def submit(self, destination_blob_name, data_tuples_with_headers, output_format=None, create_only=None):
+        # create_only overrides the policy's for one object, e.g. for files that must replace an older version
+        output_format = output_format or OUTPUT_FORMATS['csv']
+        return self._submit(self._upload, destination_blob_name, data_tuples_with_headers, output_format, create_only)
+
+    def submit_stream(self, destination_blob_name, rows, chunk_size=DEFAULT_CHUNK_SIZE, output_format=None, create_only=None):
+        # rows may be a lazy iterator; it is consumed on the worker thread as chunks are uploaded
+        return self._submit(self._upload_stream, destination_blob_name, rows, chunk_size, output_format, create_only)
+
+    def _submit(self, upload_function, *args):
+        self._slots.acquire()  # Backpressure: wait for a free slot before taking on another payload
+        try:
+            future = self._pool.submit(upload_function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return future
+
+    def _upload(self, destination_blob_name, data_tuples_with_headers, output_format, create_only):
+        attempts = 0  # write attempts, 0 if encoding failed
+        try:
+            # Payloads already encoded elsewhere (e.g. by backfill worker processes) go straight through
+            if isinstance(data_tuples_with_headers, (bytes, str)):
+                payload = data_tuples_with_headers
+            else:
+                with self.metrics.span('serialize'):
+                    payload = output_format.encode(data_tuples_with_headers)
+
+            def write(if_generation_match):
+                nonlocal attempts
+                attempts += 1
+                precondition = {} if if_generation_match is None else {'if_generation_match': if_generation_match}
+                self.storage_backend.write_bytes(destination_blob_name, payload, output_format.content_type,
+                                                 output_format.content_encoding, **precondition)
+
+            with self.metrics.span('upload'):
+                self.policy.call(write, create_only)
+            return UploadResult(destination_blob_name, True, len(payload), None, attempts)
+        except Exception as e:
+            return UploadResult(destination_blob_name, False, 0, repr(e), attempts)
+
+    def _upload_stream(self, destination_blob_name, rows, chunk_size, output_format, create_only):
+        bytes_written = 0
+        try:
+            def write(if_generation_match):
+                nonlocal bytes_written
+                bytes_written = stream_rows_to_blob(self.storage_backend, destination_blob_name, rows, chunk_size,
+                                                    output_format, if_generation_match)
+
+            with self.metrics.span('stream_upload'):
+                self.policy.call(write, create_only, retry=False)
+            return UploadResult(destination_blob_name, True, bytes_written, None)
+        except Exception as e:
+            return UploadResult(destination_blob_name, False, 0, repr(e))
+
+    def wait(self):
+        # Results in submission order; safe to call more than once
+        return [future.result() for future in self._futures]
+
+    def failures(self):
+        return [result for result in self.wait() if not result.success]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
@@ -0,0 +1,217 @@
+import random
+import threading
+import time
+from collections import namedtuple
+
+# HTTP statuses worth another attempt; 429 and 503 are GCS asking the client to slow down
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+PRECONDITION_FAILED = 412
+
+
+def status_code(error):
+    # google.api_core exceptions (and the local stand-ins) carry the HTTP status as `code`
+    code = getattr(error, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error):
+    return status_code(error) in RETRYABLE_STATUS_CODES or isinstance(error, (ConnectionError, TimeoutError))
+
+
+def is_throttle(error):
+    return status_code(error) in THROTTLE_STATUS_CODES
+
+
+def is_precondition_failed(error):
+    return status_code(error) == PRECONDITION_FAILED
+
+
+class RetryPolicy(namedtuple('RetryPolicy', ['max_attempts', 'initial_backoff', 'max_backoff', 'multiplier', 'jitter'])):
+    """Exponential backoff between attempts of one upload.
+
+    The n-th retry waits up to initial_backoff * multiplier**n seconds,
+    capped at max_backoff. With jitter='full' the wait is drawn uniformly
+    from [0, that bound], which spreads out the retries of uploads that were
+    throttled together; 'equal' keeps at least half of it, 'none' waits
+    exactly the bound.
+    """
+
+    def backoff(self, retry, rng=random):
+        bound = min(self.max_backoff, self.initial_backoff * self.multiplier ** retry)
+        if self.jitter == 'full':
+            return rng.uniform(0, bound)
+        if self.jitter == 'equal':
+            return bound / 2 + rng.uniform(0, bound / 2)
+        return bound
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=5, initial_backoff=0.5, max_backoff=32.0, multiplier=2.0, jitter='full')
+NO_RETRY_POLICY = RetryPolicy(max_attempts=1, initial_backoff=0.0, max_backoff=0.0, multiplier=1.0, jitter='none')
+
+
+class RetryBudget:
+    """Caps the retries of a whole run at `ratio` of its first attempts, plus `min_retries`.
+
+    Individual uploads keep their own attempt limit; the budget stops a run
+    whose storage is failing across the board from multiplying its load by
+    max_attempts. Once it is spent, failures are returned immediately.
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self):
+        # True (and counted) when one more retry fits in the budget
+        with self._lock:
+            if self.retries < self.min_retries + self.ratio * self.requests:
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase/multiplicative-decrease limit on concurrent uploads.
+
+    Every upload holds a slot while it runs. A throttled attempt (429/503)
+    multiplies the limit by `decrease_factor`, at most once per
+    `cooldown` seconds so one burst of rejections counts once. Each success
+    faster than `latency_target` adds `increase / limit`, about +increase per
+    limit's worth of healthy uploads, up to max_limit. Slow successes leave
+    the limit where it is. Starting below max_limit lets the limit find the
+    bucket's capacity from below instead of opening with a burst of 429s.
+    Other failures are released without a latency and leave the limit alone.
+    """
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64, increase=1.0, decrease_factor=0.5,
+                 latency_target=2.0, cooldown=1.0, clock=time.monotonic):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.clock = clock
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.decreases = 0
+        self.min_seen = self.max_seen = self.limit
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            now = self.clock()
+            if throttled:
+                if self._last_decrease is None or now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif latency is not None and latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            self.min_seen = min(self.min_seen, self.limit)
+            self.max_seen = max(self.max_seen, self.limit)
+            self._condition.notify_all()
+
+
+class UploadPolicy:
+    """Retries, retry budget, preconditions and concurrency for storage writes.
+
+    `call(write)` runs one write (a function taking the if_generation_match
+    precondition) under the limiter, retrying retryable errors with backoff
+    while the budget allows. With create_only the write carries
+    if_generation_match=0, so it only creates the object: a retry after a
+    lost response cannot overwrite, and a 412 on a retry means an earlier
+    attempt landed, which counts as success. Every part is optional; the
+    default policy retries but does not limit concurrency.
+    """
+
+    def __init__(self, retry_policy=DEFAULT_RETRY_POLICY, retry_budget=None, limiter=None, create_only=False,
+                 sleep=time.sleep, rng=None):
+        self.retry_policy = retry_policy
+        self.retry_budget = retry_budget
+        self.limiter = limiter
+        self.create_only = create_only
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.stats = {'attempts': 0, 'retries': 0, 'throttled': 0, 'recovered': 0, 'already_exists': 0,
+                      'budget_exhausted': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def call(self, write, create_only=None, retry=True):
+        """Run write(if_generation_match) until it succeeds or retrying stops.
+
+        Returns (attempts, already_existed) and raises the last error when
+        the upload fails for good. retry=False makes a single attempt, for
+        writes that cannot be repeated (streamed rows are consumed as they go).
+        """
+        create_only = self.create_only if create_only is None else create_only
+        max_attempts = self.retry_policy.max_attempts if retry else 1
+        if_generation_match = 0 if create_only else None
+        if self.retry_budget is not None:
+            self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._count('attempts')
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = time.perf_counter()
+            error = None
+            try:
+                write(if_generation_match)
+            except Exception as e:
+                error = e
+            finally:
+                if self.limiter is not None:
+                    # Only successes report a latency: a fast error must not grow the limit
+                    self.limiter.release(time.perf_counter() - start if error is None else None,
+                                         error is not None and is_throttle(error))
+            if error is None:
+                if attempt > 1:
+                    self._count('recovered')
+                return attempt, False
+            if create_only and is_precondition_failed(error):
+                # The object exists: written by an earlier attempt whose response was lost, or by another run
+                self._count('already_exists')
+                return attempt, True
+            if is_throttle(error):
+                self._count('throttled')
+            if not is_retryable(error) or attempt >= max_attempts:
+                self._count('failed')
+                raise error
+            if self.retry_budget is not None and not self.retry_budget.try_spend():
+                self._count('budget_exhausted')
+                self._count('failed')
+                raise error
+            self._count('retries')
+            self.sleep(self.retry_policy.backoff(attempt - 1, self.rng))
+
+    def summary(self):
+        with self._lock:
+            summary = dict(self.stats)
+        if self.limiter is not None:
+            summary.update(concurrency_limit=round(self.limiter.limit, 2), concurrency_min=round(self.limiter.min_seen, 2),
+                           concurrency_max=round(self.limiter.max_seen, 2), concurrency_decreases=self.limiter.decreases)
+        return summary
@@ -0,0 +1,77 @@
+import math
+from collections import namedtuple
+
+# Sales volume per hourly partition and how the sales file is split. target_shard_bytes=None writes a single
+# object per partition; otherwise sales are split into as many shards as needed to keep each near that size.
+VolumeProfile = namedtuple('VolumeProfile', ['name', 'min_sales', 'max_sales', 'target_shard_bytes', 'batch_size'])
+
+VOLUME_PROFILES = {
+    'standard': VolumeProfile('standard', 150, 1_000, None, 100_000),
+    'high': VolumeProfile('high', 1_000_000, 2_000_000, 64 * 2**20, 100_000),
+    'extreme': VolumeProfile('extreme', 10_000_000, 30_000_000, 256 * 2**20, 250_000),
+}
+
+ROW_SIZE_SAMPLE = 10_000
+
+
+def get_volume_profile(name):
+    try:
+        return VOLUME_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown volume profile '{name}', expected one of {sorted(VOLUME_PROFILES)}") from None
+
+
+def sales_for_hour(volume_profile, rng):
+    # rng is the partition's random.Random 'sales_volume' stream, so the count is reproducible
+    return rng.randint(volume_profile.min_sales, volume_profile.max_sales)
+
+
+def estimate_row_bytes(output_format, sample_rows):
+    # Encoded bytes per row, measured on a sample (header first); compression makes this format dependent
+    return max(len(output_format.encode(sample_rows)) / max(len(sample_rows) - 1, 1), 1.0)
+
+
+def plan_shards(num_rows, row_bytes, target_shard_bytes):
+    # Row count of each shard: as few shards as keep every one at or under the target size, rows spread evenly
+    if not target_shard_bytes:
+        return [num_rows]
+    num_shards = max(1, math.ceil(num_rows * row_bytes / target_shard_bytes))
+    base, extra = divmod(num_rows, num_shards)
+    return [base + (1 if shard < extra else 0) for shard in range(num_shards)]
+
+
+def upload_sales_shards(upload_executor, product_catalog, sales_date, sales_hour, shard_rows, blob_names,
+                        output_format, root_seed, batch_size, rollup=None):
+    """Stream every shard of one sales partition through the upload executor.
+
+    Shards are generated lazily on the upload threads, each from its own
+    seeded stream, so they upload in parallel with about one batch in memory
+    apiece. Shard 0 is submitted only after all others succeeded: the
+    manifest treats a sharded partition as present once shard 0 exists.
+    Before it is, every other object in the hour's directory is deleted:
+    a run interrupted at another shard count (or unsharded) leaves names
+    this one does not overwrite, and their rows would be read twice.
+    Returns the upload results and units sold per catalog product; a
+    SalesRollup, if given, receives every shard's sales.
+    """
+    import numpy as np
+    from utils.batch_generators import iter_sales_data_batch
+    from utils.seeding import partition_rng
+
+    units_sold_totals = [np.zeros(len(product_catalog) - 1, dtype=np.int64) for _ in shard_rows]
+
+    def submit(shard):
+        rows = iter_sales_data_batch(product_catalog, sales_date, sales_hour, shard_rows[shard],
+                                     partition_rng(root_seed, 'sales_data', sales_date, sales_hour, shard),
+                                     batch_size, units_sold_totals[shard], rollup)
+        # Shards left by an interrupted run with the same count may come from another seed, so they are replaced
+        return upload_executor.submit_stream(blob_names[shard], rows, output_format=output_format, create_only=False)
+
+    results = [future.result() for future in [submit(shard) for shard in range(1, len(shard_rows))]]
+    if all(result.success for result in results):
+        storage_backend = upload_executor.storage_backend
+        for name in list(storage_backend.list_prefix(blob_names[0].rsplit('/', 1)[0] + '/')):
+            if name not in blob_names:
+                storage_backend.delete(name)
+        results.insert(0, submit(0).result())
+    return results, sum(units_sold_totals)